@@ -0,0 +1,40 @@
+import argparse
+import os
+import time
+from tempfile import TemporaryDirectory
+
+from bench.generators import make_profiles_folder
+from service.models import Profiles
+
+
+# Compare serial and process pool cold loads of synthetic profile folders
+#
+#     python -m bench.bench_load --sizes 1000 10000 50000 --workers 4
+
+
+def time_cold_load(profiles_folder: str, workers: int) -> float:
+    """
+    Load every profile in a folder with an empty index and no cache
+
+    :param profiles_folder: profiles directory path
+    :param workers: number of processes to parse with
+    :return: elapsed seconds
+    """
+    start = time.perf_counter()
+    Profiles(profiles_folder, workers=workers).load()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    argp = argparse.ArgumentParser()
+    argp.add_argument('-s', '--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    argp.add_argument('-w', '--workers', type=int, default=os.cpu_count())
+    args = argp.parse_args()
+
+    print(f"{'profiles':>10} {'serial':>10} {f'{args.workers} workers':>12} {'speedup':>8}")
+    for size in args.sizes:
+        with TemporaryDirectory() as profiles_folder:
+            make_profiles_folder(profiles_folder, size)
+            serial_time = time_cold_load(profiles_folder, 0)
+            parallel_time = time_cold_load(profiles_folder, args.workers)
+        print(f"{size:>10} {serial_time:>9.3f}s {parallel_time:>11.3f}s {serial_time / parallel_time:>7.1f}x")
@@ -0,0 +1,127 @@
+import argparse
+import gc
+import random
+import tracemalloc
+
+from bench.generators import wad_names
+from service.models import Profile, ProfileStore
+
+
+# Compare the memory held per profile by dict backed profiles, slotted profiles and the columnar profile store
+#
+#     python -m bench.bench_memory --profiles 100000
+
+
+class DictProfile:
+    """
+    A profile as it used to be held, a __dict__ object that also kept the parsed YAML
+    """
+    def __init__(self, source_dict: dict) -> None:
+        """
+        Create a dict profile class
+
+        :param source_dict: parsed YAML
+        """
+        self.filename = ''
+        self.profile = source_dict
+        self.name = source_dict['name']
+        self.launch_opts = source_dict['launch_opts']
+        self.wads = source_dict['wads']
+
+
+def parsed_profiles(count: int, wads_per_profile: int, wad_pool: int, seed: int = 0):
+    """
+    Make profiles the way the YAML parser does, every string is a new object
+
+    :param count: number of profiles
+    :param wads_per_profile: number of WADs in each profile
+    :param wad_pool: number of distinct WAD names
+    :param seed: random seed, so runs are repeatable
+    :return: iterator of (file name, parsed YAML dict)
+    """
+    rng = random.Random(seed)
+    pool = wad_names(wad_pool, seed)
+    for i in range(count):
+        yield (f'profile-{i:06d}.yaml',
+               {'name': f'Synthetic profile {i:06d}',
+                'launch_opts': f'-skill {rng.randint(1, 5)}',
+                'wads': [wad.encode().decode() for wad in rng.sample(pool, min(wads_per_profile, wad_pool))]})
+
+
+def measure(build) -> int:
+    """
+    Bytes still allocated after building something
+
+    :param build: callable returning the thing to keep alive while measuring
+    :return: bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def build_dict_profiles(args) -> list:
+    """
+    Dict profiles that keep their parsed YAML
+
+    :param args: parsed command line
+    :return: list of DictProfile
+    """
+    profiles = []
+    for filename, source_dict in parsed_profiles(args.profiles, args.wads, args.wad_pool):
+        profile = DictProfile(source_dict)
+        profile.filename = filename
+        profiles.append(profile)
+    return profiles
+
+
+def build_slotted_profiles(args) -> list:
+    """
+    Slotted profiles with interned WAD names
+
+    :param args: parsed command line
+    :return: list of Profile
+    """
+    profiles = []
+    for filename, source_dict in parsed_profiles(args.profiles, args.wads, args.wad_pool):
+        profile = Profile().from_dict(source_dict)
+        profile.filename = filename
+        profiles.append(profile)
+    return profiles
+
+
+def build_profile_store(args) -> ProfileStore:
+    """
+    Profiles in a columnar store, each parsed profile is dropped once it is stored
+
+    :param args: parsed command line
+    :return: ProfileStore
+    """
+    store = ProfileStore()
+    for filename, source_dict in parsed_profiles(args.profiles, args.wads, args.wad_pool):
+        profile = Profile().from_dict(source_dict)
+        profile.filename = filename
+        store.append(profile)
+    return store
+
+
+if __name__ == "__main__":
+    argp = argparse.ArgumentParser()
+    argp.add_argument('-n', '--profiles', type=int, default=100000)
+    argp.add_argument('-w', '--wads', type=int, default=8)
+    argp.add_argument('-p', '--wad-pool', type=int, default=500)
+    args = argp.parse_args()
+
+    print(f"profiles: {args.profiles}, wads per profile: {args.wads}, distinct wads: {args.wad_pool}")
+    baseline = None
+    for label, build in (('dict profiles + YAML', build_dict_profiles),
+                         ('slotted profiles', build_slotted_profiles),
+                         ('profile store', build_profile_store)):
+        size = measure(lambda: build(args))
+        baseline = baseline or size
+        print(f"{label + ':':22} {size / args.profiles:8.0f} bytes/profile ({baseline / size:.1f}x)")
@@ -0,0 +1,45 @@
+import argparse
+import time
+from tempfile import TemporaryDirectory
+
+import yaml
+
+from bench.generators import make_profiles_folder
+from service.serialization import Loader
+
+
+# Compare the pure Python safe loader with the loader used by service.serialization
+#
+#     python -m bench.bench_yaml --profiles 5000
+
+
+def time_load(paths: list, loader: type) -> float:
+    """
+    Read and parse every profile with the given loader
+
+    :param paths: profile file paths
+    :param loader: PyYAML loader class
+    :return: elapsed seconds
+    """
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, 'r') as profile_yaml:
+            yaml.load(profile_yaml.read(), Loader=loader)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    argp = argparse.ArgumentParser()
+    argp.add_argument('-n', '--profiles', type=int, default=5000)
+    argp.add_argument('-w', '--wads', type=int, default=8)
+    args = argp.parse_args()
+
+    with TemporaryDirectory() as profiles_folder:
+        paths = make_profiles_folder(profiles_folder, args.profiles, wads_per_profile=args.wads)
+
+        python_time = time_load(paths, yaml.SafeLoader)
+        fast_time = time_load(paths, Loader)
+
+    print(f"profiles: {args.profiles}, wads per profile: {args.wads}")
+    print(f"yaml.SafeLoader:     {python_time:8.3f}s")
+    print(f"{Loader.__name__ + ':':20} {fast_time:8.3f}s ({python_time / fast_time:.1f}x)")
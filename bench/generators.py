@@ -0,0 +1,107 @@
+import os.path
+import random
+import struct
+import zipfile
+
+from service.serialization import dump_yaml
+
+
+# Synthetic library generators for the benchmarks, nothing in here touches the network
+
+
+def wad_names(count: int, seed: int = 0) -> list:
+    """
+    Make a pool of plausible WAD and PK3 file names
+
+    :param count: number of names to make
+    :param seed: random seed, so runs are repeatable
+    :return: list of file names
+    """
+    rng = random.Random(seed)
+    extensions = ['.wad', '.pk3']
+    return [f"wad-{i:05d}-{rng.randrange(16 ** 6):06x}{rng.choice(extensions)}" for i in range(count)]
+
+
+def make_profiles_folder(profiles_folder: str, count: int, wads_per_profile: int = 8, wad_pool: int = 500,
+                         seed: int = 0) -> list:
+    """
+    Fill a folder with synthetic profile YAML files
+    WADs are drawn from a shared pool so that, like a real library, the same files appear in many profiles
+
+    :param profiles_folder: directory to write the profiles to
+    :param count: number of profiles to make
+    :param wads_per_profile: number of WADs in each profile
+    :param wad_pool: number of distinct WAD names to draw from
+    :param seed: random seed, so runs are repeatable
+    :return: list of profile file paths
+    """
+    rng = random.Random(seed)
+    pool = wad_names(wad_pool, seed)
+    paths = []
+    for i in range(count):
+        profile = {
+            'name': f'Synthetic profile {i:06d}',
+            'launch_opts': f'-skill {rng.randint(1, 5)}',
+            'wads': rng.sample(pool, min(wads_per_profile, wad_pool))
+        }
+        path = os.path.join(profiles_folder, f'profile-{i:06d}.yaml')
+        with open(path, 'w') as profile_yaml:
+            dump_yaml(profile, profile_yaml)
+        paths.append(path)
+    return paths
+
+
+def make_wad(path: str, lumps: int = 4, lump_size: int = 64) -> None:
+    """
+    Write a small but well formed PWAD, its lumps are filled with zeros
+
+    :param path: file to write
+    :param lumps: number of lumps
+    :param lump_size: bytes in each lump
+    :return: None
+    """
+    header = struct.Struct('<4sii')
+    entry = struct.Struct('<ii8s')
+    directory_offset = header.size + lumps * lump_size
+    with open(path, 'wb') as wad:
+        wad.write(header.pack(b'PWAD', lumps, directory_offset))
+        wad.write(bytes(lumps * lump_size))
+        for i in range(lumps):
+            name = b'MAP%02d' % (i + 1) if i < 32 else b'LUMP%04d' % i
+            wad.write(entry.pack(header.size + i * lump_size, lump_size, name))
+
+
+def make_pk3(path: str, files: int = 4, file_size: int = 64) -> None:
+    """
+    Write a small PK3, a zip of map files filled with zeros
+
+    :param path: file to write
+    :param files: number of files in the archive
+    :param file_size: bytes in each file
+    :return: None
+    """
+    with zipfile.ZipFile(path, 'w') as pk3:
+        for i in range(files):
+            pk3.writestr(f'maps/MAP{i + 1:02d}.wad', bytes(file_size))
+
+
+def make_wads_folder(wads_folder: str, count: int = 500, lumps: int = 4, lump_size: int = 64, seed: int = 0) -> list:
+    """
+    Fill a folder with the WAD library that make_profiles_folder draws its WAD names from
+
+    :param wads_folder: directory to write the WADs to
+    :param count: number of distinct WADs, use the same wad_pool as for the profiles
+    :param lumps: number of lumps (or archive files) in each WAD
+    :param lump_size: bytes in each lump
+    :param seed: random seed, use the same seed as for the profiles
+    :return: list of WAD file paths
+    """
+    paths = []
+    for name in wad_names(count, seed):
+        path = os.path.join(wads_folder, name)
+        if name.endswith('.pk3'):
+            make_pk3(path, lumps, lump_size)
+        else:
+            make_wad(path, lumps, lump_size)
+        paths.append(path)
+    return paths
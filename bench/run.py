@@ -0,0 +1,226 @@
+import argparse
+import datetime
+import json
+import os
+import os.path
+import platform
+import statistics
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+from bench.bench_memory import measure
+from bench.generators import make_profiles_folder, make_wads_folder
+from service.launcher import Launcher
+from service.models import Profiles
+from service.serialization import Loader
+
+
+# Time the service layer hot paths against a synthetic library and keep the numbers as a JSON baseline
+#
+#     python -m bench.run --sizes 1000 10000 --save bench/baselines/my-machine.json
+#     python -m bench.run --sizes 1000 10000 --compare bench/baselines/my-machine.json
+#
+# With --compare the run exits with status 1 if any benchmark got slower, or bigger, by more than the threshold
+# Every benchmark runs at least --repeat times and for at least MIN_TIME seconds, so the fastest run of a quick one is
+# not down to luck, and benchmarks faster than MIN_GATED_SECONDS a run are too noisy to fail a comparison
+
+BASELINE_VERSION = 1
+MAX_WRITES = 500  # profiles written by the to_yaml benchmark, writes are fsynced so more only makes the run longer
+MIN_TIME = 0.2  # least total seconds spent running each benchmark
+MAX_RUNS = 1000  # most runs of a benchmark, however quick it is
+MIN_GATED_SECONDS = 0.001  # benchmarks with a faster run than this are reported but never fail a comparison
+
+
+def time_runs(run, repeat: int, setup=None, min_time: float = MIN_TIME) -> list:
+    """
+    Time a function a number of times, and more times if the runs took less than the minimum time altogether
+
+    :param run: callable to time, called with what setup returned
+    :param repeat: least number of runs
+    :param setup: optional callable run untimed before every run
+    :param min_time: least total seconds of timed runs
+    :return: list of elapsed seconds
+    """
+    times = []
+    while len(times) < repeat or (sum(times) < min_time and len(times) < MAX_RUNS):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def timing(times: list, items: int) -> dict:
+    """
+    Summarize the runs of a benchmark, the fastest run is the one compared between baselines
+
+    :param times: elapsed seconds of every run
+    :param items: number of things handled in a run
+    :return: dict
+    """
+    return {'items': items, 'runs': len(times), 'min_s': min(times), 'median_s': statistics.median(times),
+            'us_per_item': min(times) / items * 1e6}
+
+
+def bench_library(library: str, size: int, repeat: int) -> dict:
+    """
+    Run every benchmark against one synthetic library
+
+    :param library: directory to build the library in
+    :param size: number of profiles
+    :param repeat: number of runs of each benchmark
+    :return: dict of benchmark name -> result
+    """
+    profiles_folder = os.path.join(library, 'profiles')
+    wads_folder = os.path.join(library, 'wads')
+    output_folder = os.path.join(library, 'output')
+    cache_file = os.path.join(library, 'profiles.cache')
+    for folder in (profiles_folder, wads_folder, output_folder):
+        os.mkdir(folder)
+    make_profiles_folder(profiles_folder, size)
+    make_wads_folder(wads_folder)
+
+    results = {}
+    results['profiles.load.cold'] = timing(
+        time_runs(lambda _: Profiles(profiles_folder).load(), repeat), size)
+
+    Profiles(profiles_folder, cache_file=cache_file).load()
+    results['profiles.load.warm'] = timing(
+        time_runs(lambda _: Profiles(profiles_folder, cache_file=cache_file).load(), repeat), size)
+
+    loaded = Profiles(profiles_folder).load()
+    results['profiles.load.unchanged'] = timing(time_runs(lambda _: loaded.load(), repeat), size)
+
+    profiles = loaded.profiles
+    written = profiles[:MAX_WRITES]
+    results['profile.to_yaml'] = timing(
+        time_runs(lambda _: [profile.to_yaml(os.path.join(output_folder, os.path.basename(profile.filename)))
+                             for profile in written], repeat), len(written))
+
+    launcher = Launcher(config={'source_port': {'wads_folder': wads_folder}, 'service': {}})
+    results['launcher.build_argv'] = timing(
+        time_runs(lambda _: [launcher.build_argv(profile, 'gzdoom', '-warp 1 -skill 4') for profile in profiles],
+                  repeat), size)
+    results['launcher.validate'] = timing(
+        time_runs(lambda _: [launcher.validate(profile) for profile in profiles], repeat), size)
+
+    memory = measure(lambda: Profiles(profiles_folder).load())
+    results['profiles.memory'] = {'items': size, 'bytes': memory, 'bytes_per_item': memory / size}
+    return results
+
+
+def run(sizes: list, repeat: int) -> dict:
+    """
+    Run the benchmarks for every library size
+
+    :param sizes: numbers of profiles
+    :param repeat: number of runs of each benchmark
+    :return: baseline dict
+    """
+    results = {}
+    for size in sizes:
+        with TemporaryDirectory() as library:
+            for name, result in bench_library(library, size, repeat).items():
+                results[f'{name}/{size}'] = result
+    return {
+        'version': BASELINE_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpu_count': os.cpu_count(), 'yaml_loader': Loader.__name__},
+        'results': results
+    }
+
+
+def metric(result: dict) -> float:
+    """
+    The number compared between baselines, lower is better
+
+    :param result: benchmark result
+    :return: microseconds per item, or bytes per item for memory benchmarks
+    """
+    return result['bytes_per_item'] if 'bytes_per_item' in result else result['us_per_item']
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Compare a run against a saved baseline
+
+    :param baseline: saved baseline dict
+    :param current: baseline dict of this run
+    :param threshold: allowed slowdown, 0.2 is 20%
+    :return: list of (benchmark name, baseline value, current value, ratio, regressed, gated) for benchmarks in both,
+             benchmarks quicker than MIN_GATED_SECONDS a run are not gated and never regress
+    """
+    rows = []
+    for name, result in current['results'].items():
+        saved = baseline['results'].get(name)
+        if saved is None:
+            continue
+        before, after = metric(saved), metric(result)
+        ratio = after / before if before else 1.0
+        gated = min(saved.get('min_s', MIN_GATED_SECONDS), result.get('min_s', MIN_GATED_SECONDS)) >= MIN_GATED_SECONDS
+        rows.append((name, before, after, ratio, gated and ratio > 1 + threshold, gated))
+    return rows
+
+
+def format_results(current: dict) -> str:
+    """
+    Results of a run as a table
+
+    :param current: baseline dict of this run
+    :return: str
+    """
+    width = max(len(name) for name in current['results'])
+    lines = [f"{'benchmark':<{width}} {'items':>8} {'min s':>9} {'median s':>9} {'per item':>12}"]
+    for name, result in current['results'].items():
+        if 'bytes_per_item' in result:
+            lines.append(f"{name:<{width}} {result['items']:>8} {'':>9} {'':>9} {result['bytes_per_item']:>10.0f} B")
+        else:
+            lines.append(f"{name:<{width}} {result['items']:>8} {result['min_s']:>9.4f} {result['median_s']:>9.4f} "
+                         f"{result['us_per_item']:>9.2f} us")
+    return '\n'.join(lines)
+
+
+def format_comparison(rows: list) -> str:
+    """
+    A comparison against a baseline as a table
+
+    :param rows: rows returned by compare
+    :return: str
+    """
+    width = max([len(row[0]) for row in rows] + [9])
+    lines = [f"{'benchmark':<{width}} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, before, after, ratio, regressed, gated in rows:
+        note = '  REGRESSION' if regressed else '' if gated else '  (too quick to gate)'
+        lines.append(f"{name:<{width}} {before:>12.2f} {after:>12.2f} {(ratio - 1) * 100:>+7.1f}%{note}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    argp = argparse.ArgumentParser()
+    argp.add_argument('-s', '--sizes', type=int, nargs='+', default=[1000, 10000])
+    argp.add_argument('-r', '--repeat', type=int, default=5)
+    argp.add_argument('--save', metavar='BASELINE', help="write the results to a JSON baseline")
+    argp.add_argument('--compare', metavar='BASELINE', help="compare the results with a saved JSON baseline")
+    argp.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown before failing, default 0.2")
+    args = argp.parse_args()
+
+    current = run(args.sizes, args.repeat)
+    print(format_results(current))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as baseline_file:
+            json.dump(current, baseline_file, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('version') != BASELINE_VERSION:
+            sys.exit(f"{args.compare} is not a version {BASELINE_VERSION} baseline")
+        rows = compare(baseline, current, args.threshold)
+        print(format_comparison(rows))
+        if any(row[4] for row in rows):
+            sys.exit(1)
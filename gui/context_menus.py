@@ -24,12 +24,15 @@ class WADGridContextMenu(wx.Menu):
 
         self.delete_option = wx.MenuItem(self, wx.NewId(), 'Delete WAD')
         self.Append(self.delete_option)
+        self.uses_option = wx.MenuItem(self, wx.NewId(), 'Profiles using this WAD')
+        self.Append(self.uses_option)
+        self.uses_option.Enable(self.selected_row < len(self.selections_panel.my_profile.wads))
 
         self.Bind(wx.EVT_MENU, self.delete_wad, self.delete_option)
+        self.Bind(wx.EVT_MENU, self.show_uses, self.uses_option)
         mylog.info(f"Opened WAD grid context menu for row: {self.selected_row}")
 
     def delete_wad(self, event: wx.Event) -> None:
-        # TODO: Merge this with delete_wads in SelectionsPanel
         """
         Delete the WAD that spawned the context menu
         Post a WADs updated event if successful
@@ -37,16 +40,22 @@ class WADGridContextMenu(wx.Menu):
         :param event: not used
         :return: None
         """
-        old_wads = self.selections_panel.my_profile.wads
-        deleted_wads = []
-        new_wads = []
-        for i, wad in enumerate(old_wads):
-            if i != self.selected_row:
-                new_wads.append(wad)
-            else:
-                deleted_wads.append(wad)
-
-        if new_wads != old_wads:
+        deleted_wads = self.selections_panel.my_profile.delete_wads([self.selected_row])
+
+        if deleted_wads:
             mylog.info(f"Deleted WAD: {deleted_wads}")
-            self.selections_panel.my_profile.wads = new_wads
-            wx.PostEvent(self.selections_panel.main_frame, gui.events.WADsUpdated())
+            wx.PostEvent(self.selections_panel.main_frame, gui.events.WADsUpdated(first=self.selected_row))
+
+    def show_uses(self, event: wx.Event) -> None:
+        """
+        Show the profiles that load the WAD that spawned the context menu
+
+        :param event: not used
+        :return: None
+        """
+        wad = self.selections_panel.my_profile.wads[self.selected_row]
+        profiles = self.selections_panel.main_frame.profiles
+        names = profiles.uses(wad)
+        mylog.info(f"Profiles using {wad}: {names}")
+        message = '\n'.join(f"{profiles.get(name).name} ({name})" for name in names) or 'No saved profiles'
+        wx.MessageBox(message, f'Profiles using {wad}', wx.OK | wx.ICON_INFORMATION, self.selections_panel)
@@ -1,12 +1,15 @@
 import os
 
 import wx
-import yaml
 from logbook import Logger
 
 import gui.events
+from gui.profiles_list import ProfilesListCtrl
+from service.editing import ProfileEdit
 from service.launcher import Launcher
 from service.models import Profile
+from service.serialization import dump_yaml
+from service.tracing import traced
 
 
 mylog = Logger(__name__)
@@ -27,6 +30,7 @@ class ControlsPanel(wx.Panel):
 
         self.config = kwargs['config']
         kwargs['main_frame'] = self.main_frame  # TODO: This feels a bit scuffed
+        kwargs['close_hook'] = lambda: wx.CallAfter(self.main_frame.Destroy)
 
         # get a launcher for later
         self.launcher = Launcher(**kwargs)
@@ -57,9 +61,13 @@ class ControlsPanel(wx.Panel):
         # profiles selector
         self.profiles_sizer = wx.StaticBoxSizer(wx.VERTICAL, self, "Select launch profile")
 
-        self.list_box_sizer = wx.BoxSizer(wx.HORIZONTAL)
-        self.profiles_list_box = wx.ListBox(self, style=wx.LB_ALWAYS_SB)
+        self.list_box_sizer = wx.BoxSizer(wx.VERTICAL)
+        self.profiles_search = wx.SearchCtrl(self)
+        self.profiles_search.ShowCancelButton(True)
+        self.profiles_search.SetDescriptiveText('Search profiles')
+        self.profiles_list_box = ProfilesListCtrl(self, self.main_frame.profiles)
         wx.PostEvent(self.main_frame, gui.events.ProfilesUpdated())  # force the listbox to populate
+        self.list_box_sizer.Add(self.profiles_search, 0, wx.EXPAND | wx.BOTTOM, 5)
         self.list_box_sizer.Add(self.profiles_list_box, 1, wx.EXPAND)
 
         self.buttons_sizer = wx.BoxSizer(wx.HORIZONTAL)
@@ -78,8 +86,10 @@ class ControlsPanel(wx.Panel):
         self.launch_control_sizer = wx.BoxSizer(wx.HORIZONTAL)
         self.launch_auto_close = wx.CheckBox(self, label='Auto-close')
         self.launch_auto_close.SetValue(self.config['service']['auto_close_on_launch'])
+        self.launches_button = wx.Button(self, wx.ID_ANY, 'Launches')
         self.launch_button = wx.Button(self, wx.ID_ANY, 'Launch w/selected options')
         self.launch_control_sizer.Add(self.launch_auto_close, 0, wx.EXPAND | wx.RIGHT, 5)
+        self.launch_control_sizer.Add(self.launches_button, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
         self.launch_control_sizer.Add(self.launch_button, 1, wx.EXPAND | wx.LEFT, 5)
 
         # sizer cont
@@ -92,7 +102,10 @@ class ControlsPanel(wx.Panel):
         self.Bind(wx.EVT_BUTTON, self.refresh_profiles, self.refresh_profiles_button)
         self.Bind(wx.EVT_BUTTON, self.delete_profile, self.delete_profile_button)
         self.Bind(wx.EVT_BUTTON, self.launch, self.launch_button)
+        self.Bind(wx.EVT_BUTTON, self.show_launches, self.launches_button)
         self.Bind(wx.EVT_LISTBOX, self.profiles_list_box_select, self.profiles_list_box)
+        self.Bind(wx.EVT_TEXT, self.search_profiles, self.profiles_search)
+        self.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, self.clear_search, self.profiles_search)
         self.Bind(wx.EVT_FILEPICKER_CHANGED, self.source_port_changed, self.source_port_picker)
         self.Bind(wx.EVT_CHECKBOX, self.auto_close_changed, self.launch_auto_close)
 
@@ -105,23 +118,37 @@ class ControlsPanel(wx.Panel):
         self.SetSizer(self.panel_sizer)
         self.Show()
 
+    @traced('gui.populate_profiles')
     def populate_profiles(self, event: wx.Event) -> None:
         """
         Reload the profiles list box with the current list of profiles
+        If the event carries positions only those entries are updated or appended, so a background load can fill
+        the list box progressively
         Constrain the selected profile to the profiles list range
-        Post a profile selected event
+        Post a profile selected event, marked as a reload so the edit session on the profile is kept
 
-        :param event: not used
+        :param event: PROFILES_UPDATED, optionally with the positions of added or updated profiles
         :return: None
         """
-        mylog.info("Refresh profiles listbox")
+        profiles = self.main_frame.profiles.profiles
         previous_selection = self.profiles_list_box.GetSelection()
-        self.profiles_list_box.Set([p.name for p in self.main_frame.profiles.profiles])
+        positions = getattr(event, 'positions', None)
+
+        if positions is not None:
+            mylog.info(f"Update {len(positions)} profiles in the listbox")
+            self.profiles_list_box.update_profiles(positions)
 
-        if previous_selection >= len(self.main_frame.profiles.profiles):
+            if 0 <= previous_selection and previous_selection not in positions:
+                # the selected profile is untouched, leave the selection and the edits alone
+                return None
+        else:
+            mylog.info("Refresh profiles listbox")
+            self.profiles_list_box.set_profiles()
+
+        if previous_selection >= len(profiles):
             # a profile has been deleted and the selection is now out of range, constrain it to range
-            new_selection = len(self.main_frame.profiles.profiles) - 1
-        elif previous_selection < 0 and self.main_frame.profiles.profiles:
+            new_selection = len(profiles) - 1
+        elif previous_selection < 0 and profiles:
             # nothing was selected before, but there are profiles so pick the first one
             new_selection = 0
         else:
@@ -130,7 +157,7 @@ class ControlsPanel(wx.Panel):
 
         self.profiles_list_box.SetSelection(new_selection)
         self.last_selected_profile_index = new_selection
-        wx.PostEvent(self.main_frame, gui.events.SelectedProfile())
+        wx.PostEvent(self.main_frame, gui.events.SelectedProfile(reloaded=True))
         self.Layout()
 
     def add_profile(self, event: wx.Event) -> None:
@@ -148,9 +175,7 @@ class ControlsPanel(wx.Panel):
         if profile_name_dialog.ShowModal() == wx.ID_OK:  # TODO: what if the name is already being used? or empty
             # just so we dont lose any unsaved edits
             if self.last_selected_profile_index >= 0:
-                active_profile = self.main_frame.selections_panel.my_profile
-                last_profile = self.main_frame.profiles.profiles[self.last_selected_profile_index]
-                discard_changes = self.discard_unsaved_changes(active_profile, last_profile)
+                discard_changes = self.discard_unsaved_changes(self.main_frame.selections_panel.my_profile)
                 if not discard_changes:
                     return None
 
@@ -169,9 +194,7 @@ class ControlsPanel(wx.Panel):
         """
         # just so we dont lose any unsaved edits
         if self.last_selected_profile_index >= 0:
-            active_profile = self.main_frame.selections_panel.my_profile
-            last_profile = self.main_frame.profiles.profiles[self.last_selected_profile_index]
-            discard_changes = self.discard_unsaved_changes(active_profile, last_profile)
+            discard_changes = self.discard_unsaved_changes(self.main_frame.selections_panel.my_profile)
             if not discard_changes:
                 return None
 
@@ -184,18 +207,19 @@ class ControlsPanel(wx.Panel):
         :param event: not used
         :return: None
         """
+        selection = self.profiles_list_box.GetShownSelection()
+        if selection == wx.NOT_FOUND:
+            mylog.info("No profile shown as selected, nothing to delete")
+            return None
+
         # just so we dont lose any unsaved edits
         if self.last_selected_profile_index >= 0:
-            active_profile = self.main_frame.selections_panel.my_profile
-            last_profile = self.main_frame.profiles.profiles[self.last_selected_profile_index]
-            discard_changes = self.discard_unsaved_changes(active_profile, last_profile)
+            discard_changes = self.discard_unsaved_changes(self.main_frame.selections_panel.my_profile)
             if not discard_changes:
                 return None
 
-        # TODO: make sure a profile is selected first
-        profile_to_delete = self.main_frame.profiles.profiles[self.profiles_list_box.GetSelection()]
+        profile_to_delete = self.main_frame.profiles.profiles[selection]
         os.remove(f"{profile_to_delete.filename}")
-        self.main_frame.profiles.profiles.pop(self.profiles_list_box.GetSelection())
         mylog.info(f"Deleted {profile_to_delete.name} ({profile_to_delete.filename})")
 
         wx.PostEvent(self.main_frame, gui.events.ProfilesChanged())
@@ -203,14 +227,55 @@ class ControlsPanel(wx.Panel):
     def launch(self, event: wx.Event) -> None:
         """
         Package all of the launch options and call the launcher to start the game
+        Missing or changed WADs are reported first and the launch can be cancelled
+        Nothing is launched while the selected profile is filtered out of the profiles list
 
         :param event: not used
         :return: None
         """
-        self.launcher.launch(self.main_frame.profiles.profiles[self.profiles_list_box.GetSelection()],
+        selection = self.profiles_list_box.GetShownSelection()
+        if selection == wx.NOT_FOUND:
+            mylog.info("No profile shown as selected, nothing to launch")
+            return None
+
+        profile = self.main_frame.profiles.profiles[selection]
+        validation = self.launcher.validate(profile)
+        if validation.missing or validation.changed:
+            if validation.missing:
+                wads_dialog = wx.MessageDialog(self,
+                                               f'Profile "{profile.name}" has missing WADs:\n\n'
+                                               f'{validation.summary()}',
+                                               'Missing WADs',
+                                               wx.YES_NO | wx.NO_DEFAULT | wx.ICON_WARNING)
+                wads_dialog.SetYesNoLabels('Launch anyway', 'Cancel')
+            else:
+                # changed WADs are only a warning, so launching is the default
+                wads_dialog = wx.MessageDialog(self,
+                                               f'Profile "{profile.name}" has WADs that changed since they were last '
+                                               f'checked:\n\n{validation.summary()}',
+                                               'Changed WADs',
+                                               wx.YES_NO | wx.YES_DEFAULT | wx.ICON_INFORMATION)
+                wads_dialog.SetYesNoLabels('Launch', 'Cancel')
+            if wads_dialog.ShowModal() != wx.ID_YES:
+                mylog.info(f"Launch cancelled, missing WADs: {validation.missing} changed WADs: {validation.changed}")
+                return None
+
+        self.launcher.launch(profile,
                              self.source_port_picker.GetPath(),
                              params=self.additional_params_control.GetLineText(0))
 
+    def show_launches(self, event: wx.Event) -> None:
+        """
+        Show the most recent launches, with the exit code, run time and error output of crashed launches
+
+        :param event: not used
+        :return: None
+        """
+        records = self.launcher.supervisor.recent()
+        mylog.info(f"Showing {len(records)} recent launches")
+        message = '\n'.join(record.summary() for record in reversed(records)) or 'No launches recorded'
+        wx.MessageBox(message, 'Recent launches', wx.OK | wx.ICON_INFORMATION, self)
+
     def profiles_list_box_select(self, event: wx.Event) -> None:
         """
         New profile is selected in the list box
@@ -220,9 +285,7 @@ class ControlsPanel(wx.Panel):
         :return: None
         """
         if self.last_selected_profile_index >= 0:
-            active_profile = self.main_frame.selections_panel.my_profile
-            last_profile = self.main_frame.profiles.profiles[self.last_selected_profile_index]
-            discard_changes = self.discard_unsaved_changes(active_profile, last_profile)
+            discard_changes = self.discard_unsaved_changes(self.main_frame.selections_panel.my_profile)
             if not discard_changes:
                 event.GetEventObject().SetSelection(self.last_selected_profile_index)
                 return None
@@ -233,10 +296,28 @@ class ControlsPanel(wx.Panel):
         mylog.info(f"New profile selected: {new_profile.name}")
         wx.PostEvent(self.main_frame, gui.events.SelectedProfile())
 
+    def search_profiles(self, event: wx.Event) -> None:
+        """
+        Filter the profiles list as the search text changes
+
+        :param event: wx.EVT_TEXT
+        :return: None
+        """
+        self.profiles_list_box.filter(self.profiles_search.GetValue())
+
+    def clear_search(self, event: wx.Event) -> None:
+        """
+        Show every profile again
+
+        :param event: wx.EVT_SEARCHCTRL_CANCEL_BTN
+        :return: None
+        """
+        self.profiles_search.Clear()  # posts EVT_TEXT, which resets the filter
+
     def source_port_changed(self, event: wx.Event) -> None:
         """
         Record the source port path if it changed
-        Post a config changed event if successful
+        Post a config changed event if successful and show the timedemo history for the new source port
 
         :param event: not used
         :return: None
@@ -245,6 +326,9 @@ class ControlsPanel(wx.Panel):
             mylog.info(f"Source port changed to: {self.source_port_picker.GetPath()}")
             self.config['source_port']['binary'] = self.source_port_picker.GetPath()
             wx.PostEvent(self.main_frame, gui.events.ConfigChanged())
+            selections_panel = self.main_frame.selections_panel
+            if selections_panel.my_profile is not None:
+                selections_panel.show_timedemos(selections_panel.my_profile)
 
     def auto_close_changed(self, event: wx.Event) -> None:
         """
@@ -270,18 +354,17 @@ class ControlsPanel(wx.Panel):
 
         with open('config.yaml', 'w') as config_yaml:
             mylog.info(f"Config changed write to config.yaml")
-            yaml.dump(self.config, config_yaml)
+            dump_yaml(self.config, config_yaml)
 
-    def discard_unsaved_changes(self, active_profile: Profile, last_profile: Profile) -> bool:
+    def discard_unsaved_changes(self, active_profile: ProfileEdit | None) -> bool:
         """
         Check for unsaved changes and launch a modal for discard or cancel
 
-        :param active_profile: Current profile
-        :param last_profile: Last profile
+        :param active_profile: Current profile edit session
         :return: None
         """
 
-        if active_profile.asdict() != last_profile.asdict():
+        if active_profile is not None and active_profile.dirty:
             mylog.info(f"Active profile {active_profile.name} has unsaved changes!")
             discard_changes_dialog = wx.MessageDialog(self,
                                                    f'Profile "{active_profile.name}" has unsaved changes',
@@ -6,3 +6,7 @@ ProfilesChanged, PROFILES_CHANGED = wx.lib.newevent.NewEvent()
 ProfilesUpdated, PROFILES_UPDATED = wx.lib.newevent.NewEvent()
 WADsUpdated, WADS_UPDATED = wx.lib.newevent.NewEvent()
 ConfigChanged, CONFIG_CHANGED = wx.lib.newevent.NewEvent()
+ProfilesLoaded, PROFILES_LOADED = wx.lib.newevent.NewEvent()
+ProfileFileAdded, PROFILE_FILE_ADDED = wx.lib.newevent.NewEvent()
+ProfileFileUpdated, PROFILE_FILE_UPDATED = wx.lib.newevent.NewEvent()
+ProfileFileDeleted, PROFILE_FILE_DELETED = wx.lib.newevent.NewEvent()
@@ -0,0 +1,123 @@
+import wx
+import wx.grid
+from logbook import Logger
+
+
+mylog = Logger(__name__)
+
+
+class WADGridTable(wx.grid.GridTableBase):
+    """
+    Virtual table for the WAD grid, the grid reads the WAD names straight from the profile's WADs list
+    Nothing is copied into the grid, edits only tell the grid which rows have changed
+    """
+    def __init__(self, min_rows: int = 0, column_labels: list | None = None) -> None:
+        """
+        Create a WAD grid table
+
+        :param min_rows: rows to show even if there are fewer WADs, the rest are blank filler rows
+        :param column_labels: column labels
+        """
+        wx.grid.GridTableBase.__init__(self)
+        self.min_rows = min_rows
+        self.column_labels = column_labels or ['WAD Name']
+        self.wads = []
+        self.rows = self.GetNumberRows()  # the number of rows the grid knows about
+
+    def GetNumberRows(self) -> int:
+        """
+        The number of WADs, padded with filler rows up to the minimum
+
+        :return: int
+        """
+        return max(len(self.wads), self.min_rows)
+
+    def GetNumberCols(self) -> int:
+        """
+        The number of columns
+
+        :return: int
+        """
+        return len(self.column_labels)
+
+    def GetValue(self, row: int, col: int) -> str:
+        """
+        The WAD name in a row, filler rows are blank
+
+        :param row: row index
+        :param col: column index
+        :return: str
+        """
+        return self.wads[row] if row < len(self.wads) else ''
+
+    def SetValue(self, row: int, col: int, value: str) -> None:
+        """
+        The WAD grid is read only, WADs are changed through the profile
+
+        :param row: not used
+        :param col: not used
+        :param value: not used
+        :return: None
+        """
+        return None
+
+    def IsEmptyCell(self, row: int, col: int) -> bool:
+        """
+        True for filler rows
+
+        :param row: row index
+        :param col: column index
+        :return: bool
+        """
+        return row >= len(self.wads)
+
+    def GetColLabelValue(self, col: int) -> str:
+        """
+        The column label
+
+        :param col: column index
+        :return: str
+        """
+        return self.column_labels[col]
+
+    def Clear(self) -> None:
+        """
+        Forget the WADs, called by wx.grid.Grid.ClearGrid
+
+        :return: None
+        """
+        self.update([])
+
+    def update(self, wads: list, first: int = 0, last: int | None = None) -> None:
+        """
+        Point the table at a WADs list and tell the grid about the rows that changed
+        Rows are only added or removed at the end, every other change is a refresh of the changed range
+
+        :param wads: the WADs list to show, it is read in place and not copied
+        :param first: first changed row
+        :param last: last changed row, defaults to the last row
+        :return: None
+        """
+        self.wads = wads
+        grid = self.GetView()
+        rows = self.GetNumberRows()
+        if grid is None:
+            self.rows = rows
+            return None
+
+        grid.BeginBatch()
+        try:
+            if rows > self.rows:
+                grid.ProcessTableMessage(wx.grid.GridTableMessage(
+                    self, wx.grid.GRIDTABLE_NOTIFY_ROWS_APPENDED, rows - self.rows))
+            elif rows < self.rows:
+                grid.ProcessTableMessage(wx.grid.GridTableMessage(
+                    self, wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, rows, self.rows - rows))
+            self.rows = rows
+
+            last = rows - 1 if last is None else min(last, rows - 1)
+            if first <= last:
+                grid.RefreshBlock(first, 0, last, self.GetNumberCols() - 1)
+        finally:
+            grid.EndBatch()
+        mylog.debug("WAD grid rows: {} refreshed: {} to {}", rows, first, last)
@@ -1,3 +1,5 @@
+import threading
+
 import wx
 import wx.grid
 from logbook import Logger
@@ -6,6 +8,9 @@ import gui.events
 from gui.controls_panel import ControlsPanel
 from gui.selections_panel import SelectionsPanel
 from service.models import Profiles
+from service.persistence import ProfileWriter
+from service.tracing import tracer
+from service.watcher import DirectoryWatcher
 
 
 mylog = Logger(__name__)
@@ -16,6 +21,7 @@ class MainFrame(wx.Frame):
     Main frame class to contain the panels
     """
     __instance = None
+    PROFILES_BATCH_SIZE = 200
 
     @classmethod
     def get_instance(cls) -> type:
@@ -39,8 +45,16 @@ class MainFrame(wx.Frame):
         self.config = kwargs['config']
         self.SetIcon(wx.Icon(self.config['gui']['icon']))
 
-        # load the profiles
-        self.profiles = Profiles('profiles').load()
+        # profiles and the profiles cache are saved in the background, repeated saves of a file are written once
+        self.profile_writer = ProfileWriter(delay=self.config['service'].get('write_delay', 0.5)).start()
+
+        # restore the cached profiles now, the profiles folder is scanned in the background once the window is up
+        self.profiles = Profiles(self.config['service']['profiles_folder'],
+                                 cache_file=self.config['service'].get('profiles_cache'),
+                                 workers=self.config['service'].get('load_workers', 0),
+                                 writer=self.profile_writer).load_cache()
+        self.profiles_loader = None
+        self.profiles_reload_pending = False
 
         # main panel
         self.main_sizer = wx.BoxSizer(wx.HORIZONTAL)
@@ -58,21 +72,157 @@ class MainFrame(wx.Frame):
 
         # bindings
         self.Bind(gui.events.PROFILES_CHANGED, self.profiles_changed)
+        self.Bind(gui.events.PROFILES_LOADED, self.profiles_loaded)
+        self.Bind(gui.events.PROFILE_FILE_ADDED, self.profile_files_merged)
+        self.Bind(gui.events.PROFILE_FILE_UPDATED, self.profile_files_merged)
+        self.Bind(gui.events.PROFILE_FILE_DELETED, self.profile_files_deleted)
+        self.Bind(wx.EVT_CLOSE, self.close)
 
         # force the window to a fixed size specified in the config
         self.SetMinSize(wx.Size(self.config['gui']['size_x'], self.config['gui']['size_y']))
         self.SetMaxSize(wx.Size(self.config['gui']['size_x'], self.config['gui']['size_y']))
 
+        # watch the profiles folder so external edits show up without a refresh
+        self.profiles_watcher = None
+        if self.config['service'].get('watch_profiles', True):
+            self.profiles_watcher = DirectoryWatcher(self.profiles.profiles_source,
+                                                     self.profile_files_changed,
+                                                     debounce=self.config['service'].get('watch_debounce', 0.25))
+
         # display
         self.Show()
+        self.load_profiles()
+        if self.profiles_watcher:
+            self.profiles_watcher.start()
 
     def profiles_changed(self, event: wx.Event) -> None:
         """
-        Reload profiles from profiles source, posts a profile updated event
+        Reload profiles from profiles source in the background
 
         :param event: not used
         :return: None
         """
         mylog.info(f"Profiles changed, reload")
-        self.profiles.load()
-        wx.PostEvent(self, gui.events.ProfilesUpdated())
+        self.load_profiles()
+
+    def load_profiles(self) -> None:
+        """
+        Start scanning the profiles source on a worker thread
+        If a scan is already running another one is queued to start once it finishes
+
+        :return: None
+        """
+        if self.profiles_loader is not None and self.profiles_loader.is_alive():
+            self.profiles_reload_pending = True
+            return None
+
+        self.profiles_reload_pending = False
+        self.profiles_loader = threading.Thread(target=self.scan_profiles, name='profiles-loader', daemon=True)
+        self.profiles_loader.start()
+
+    def scan_profiles(self) -> None:
+        """
+        Worker thread, parse the changed profiles and post them back to the GUI in batches
+
+        :return: None
+        """
+        try:
+            with tracer.span('profiles.scan'):
+                entries = self.profiles.stat_profiles()
+                for batch in self.profiles.scan(entries, batch_size=self.PROFILES_BATCH_SIZE):
+                    wx.PostEvent(self, gui.events.ProfilesLoaded(batch=batch, entries=None))
+            wx.PostEvent(self, gui.events.ProfilesLoaded(batch=[], entries=entries))
+        except RuntimeError:
+            # the frame was destroyed mid-scan
+            pass
+
+    def profiles_loaded(self, event: wx.Event) -> None:
+        """
+        Merge a batch of profiles from the worker thread, posts a profiles updated event
+        The last batch of a scan carries the scanned entries, so deleted profiles can be pruned
+
+        :param event: PROFILES_LOADED
+        :return: None
+        """
+        positions = self.profiles.merge(event.batch)
+        if positions:
+            wx.PostEvent(self, gui.events.ProfilesUpdated(positions=positions))
+
+        if event.entries is not None:
+            if self.profiles.commit(event.entries):
+                wx.PostEvent(self, gui.events.ProfilesUpdated())  # profiles were removed, rebuild the whole list
+            if self.profiles_reload_pending:
+                self.load_profiles()
+
+    def profile_files_changed(self, names: set) -> None:
+        """
+        Watcher thread, hand the changed profile file names to the GUI thread
+        The profiles index is only ever read and changed on the GUI thread
+
+        :param names: changed profile file names
+        :return: None
+        """
+        wx.CallAfter(self.apply_profile_file_changes, set(names))
+
+    def apply_profile_file_changes(self, names: set) -> None:
+        """
+        Parse just the changed profile files and post them as added, updated or deleted
+        A burst of changes bigger than a batch is left to a full scan on the worker thread
+
+        :param names: changed profile file names
+        :return: None
+        """
+        if not self:
+            # the frame was destroyed before the change arrived
+            return None
+        if len(names) > self.PROFILES_BATCH_SIZE:
+            self.load_profiles()
+            return None
+
+        entries = self.profiles.stat_names(names)
+        deleted = [name for name in names if name not in entries and name in self.profiles.index]
+        for batch in self.profiles.scan(entries, batch_size=self.PROFILES_BATCH_SIZE):
+            added = [item for item in batch if item[0] not in self.profiles.index]
+            updated = [item for item in batch if item[0] in self.profiles.index]
+            if added:
+                wx.PostEvent(self, gui.events.ProfileFileAdded(batch=added))
+            if updated:
+                wx.PostEvent(self, gui.events.ProfileFileUpdated(batch=updated))
+        if deleted:
+            wx.PostEvent(self, gui.events.ProfileFileDeleted(names=deleted))
+
+    def profile_files_merged(self, event: wx.Event) -> None:
+        """
+        Merge added or updated profile files from the watcher, posts a profiles updated event
+
+        :param event: PROFILE_FILE_ADDED or PROFILE_FILE_UPDATED
+        :return: None
+        """
+        positions = self.profiles.merge(event.batch)
+        if self.profiles.cache_dirty:
+            self.profiles.save_cache()
+        if positions:
+            wx.PostEvent(self, gui.events.ProfilesUpdated(positions=positions))
+
+    def profile_files_deleted(self, event: wx.Event) -> None:
+        """
+        Remove deleted profile files reported by the watcher, posts a profiles updated event
+
+        :param event: PROFILE_FILE_DELETED
+        :return: None
+        """
+        if self.profiles.remove(event.names):
+            self.profiles.save_cache()
+            wx.PostEvent(self, gui.events.ProfilesUpdated())
+
+    def close(self, event: wx.Event) -> None:
+        """
+        Stop watching the profiles folder and finish any queued writes before the window closes
+
+        :param event: wx.EVT_CLOSE
+        :return: None
+        """
+        if self.profiles_watcher:
+            self.profiles_watcher.stop()
+        self.profile_writer.stop()
+        event.Skip()
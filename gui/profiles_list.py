@@ -0,0 +1,151 @@
+import wx
+from logbook import Logger
+
+from service.search import NameIndex
+
+
+mylog = Logger(__name__)
+
+
+class ProfilesListCtrl(wx.ListCtrl):
+    """
+    Virtual list of profile names, sorted by name and filtered by a search query
+    Rows are only drawn when they are scrolled into view, so the list costs the same for ten or ten thousand profiles
+    Selections are in profiles list positions like a wx.ListBox, and selecting a row posts EVT_LISTBOX
+    """
+    def __init__(self, parent, profiles) -> None:
+        """
+        Create a profiles list control
+
+        :param parent: ControlsPanel
+        :param profiles: Profiles to show
+        """
+        wx.ListCtrl.__init__(self, parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL | wx.LC_NO_HEADER)
+        self.profiles = profiles
+        self.index = NameIndex()
+        self.query = ''
+        self.rows = []  # profiles list position of each row
+        self.row_of = {}  # profiles list position -> row
+        self.selection = wx.NOT_FOUND  # profiles list position, it stays selected while filtered out
+        self.changing_selection = False
+
+        self.AppendColumn('Profile')
+        self.Bind(wx.EVT_LIST_ITEM_SELECTED, self.item_selected)
+        self.Bind(wx.EVT_SIZE, self.size_column)
+
+    def OnGetItemText(self, item: int, column: int) -> str:
+        """
+        The profile name in a row, called by wx for the visible rows only
+
+        :param item: row
+        :param column: not used
+        :return: str
+        """
+        return self.profiles.profiles[self.rows[item]].name or ''
+
+    def GetCount(self) -> int:
+        """
+        The number of profiles, shown or not
+
+        :return: int
+        """
+        return len(self.index)
+
+    def GetSelection(self) -> int:
+        """
+        The position of the selected profile in the profiles list
+
+        :return: int, wx.NOT_FOUND if nothing is selected
+        """
+        return self.selection
+
+    def GetShownSelection(self) -> int:
+        """
+        The position of the selected profile, only if it is not filtered out
+        Actions on the selected profile use this, so they never act on a profile the user can't see
+
+        :return: int, wx.NOT_FOUND if nothing is selected or the selected profile is filtered out
+        """
+        return self.selection if self.selection in self.row_of else wx.NOT_FOUND
+
+    def SetSelection(self, position: int) -> None:
+        """
+        Select a profile by its position in the profiles list, without posting an event
+
+        :param position: profiles list position, wx.NOT_FOUND to select nothing
+        :return: None
+        """
+        self.selection = position
+        self.changing_selection = True
+        try:
+            row = self.row_of.get(position, wx.NOT_FOUND)
+            selected_row = self.GetFirstSelected()
+            if row != selected_row and selected_row != wx.NOT_FOUND:
+                self.Select(selected_row, False)
+            if row != wx.NOT_FOUND:
+                self.Select(row)
+                self.Focus(row)
+        finally:
+            self.changing_selection = False
+
+    def set_profiles(self) -> None:
+        """
+        Rebuild the name index from the whole profiles list
+
+        :return: None
+        """
+        self.index.build([profile.name for profile in self.profiles.profiles])
+        self.filter()
+
+    def update_profiles(self, positions: list) -> None:
+        """
+        Add or rename the profiles at some positions
+
+        :param positions: sorted profiles list positions that were added or updated
+        :return: None
+        """
+        profiles = self.profiles.profiles
+        for position in positions:
+            self.index.set(position, profiles[position].name)
+        self.filter()
+
+    def filter(self, query: str | None = None) -> None:
+        """
+        Show only the profiles matching a search query, in name order
+
+        :param query: search text, defaults to the current query
+        :return: None
+        """
+        if query is not None:
+            self.query = query
+        self.rows = self.index.search(self.query)
+        self.row_of = {position: row for row, position in enumerate(self.rows)}
+        self.SetItemCount(len(self.rows))
+        self.SetSelection(self.selection)
+        self.Refresh()
+
+    def item_selected(self, event: wx.Event) -> None:
+        """
+        A row was clicked, record the profile and post EVT_LISTBOX for it
+
+        :param event: wx.EVT_LIST_ITEM_SELECTED
+        :return: None
+        """
+        if self.changing_selection:
+            return None
+        self.selection = self.rows[event.GetIndex()]
+
+        listbox_event = wx.CommandEvent(wx.wxEVT_LISTBOX, self.GetId())
+        listbox_event.SetEventObject(self)
+        listbox_event.SetInt(self.selection)
+        self.GetEventHandler().ProcessEvent(listbox_event)
+
+    def size_column(self, event: wx.Event) -> None:
+        """
+        Stretch the name column across the list
+
+        :param event: wx.EVT_SIZE
+        :return: None
+        """
+        self.SetColumnWidth(0, self.GetClientSize().GetWidth())
+        event.Skip()
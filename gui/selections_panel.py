@@ -1,4 +1,3 @@
-import copy
 import os.path
 
 import wx
@@ -7,6 +6,9 @@ from logbook import Logger
 
 import gui.events
 from gui.context_menus import WADGridContextMenu
+from gui.grid_tables import WADGridTable
+from service.editing import ProfileEdit
+from service.tracing import traced
 
 
 mylog = Logger(__name__)
@@ -48,27 +50,25 @@ class SelectionsPanel(wx.Panel):
         self.profile_name_sizer.Add(self.profile_name_label, 0, wx.ALIGN_CENTRE_VERTICAL | wx.ALL, 5)
         self.profile_name_sizer.Add(self.profile_name_control, 1, wx.ALL, 5)
 
+        self.timedemo_label = wx.StaticText(self, -1, '')
+
         self.profile_options_sizer.Add(self.profile_params_sizer, 0, wx.EXPAND)
         self.profile_options_sizer.Add(self.profile_name_sizer, 0, wx.EXPAND)
+        self.profile_options_sizer.Add(self.timedemo_label, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
 
         # WAD list
         self.wad_grid_max_displayed_rows = 9
         self.wad_grid = wx.grid.Grid(self, style=wx.VSCROLL)
         self.toggleable_elements.append(self.wad_grid)
-        self.wad_grid.CreateGrid(1, 0)
+        self.column_labels = ['WAD Name']
+        self.wad_table = WADGridTable(self.wad_grid_max_displayed_rows, self.column_labels)
+        self.wad_grid.SetTable(self.wad_table, True, wx.grid.Grid.GridSelectRows)
+        self.wad_grid.EnableEditing(False)
         self.wad_grid.ShowScrollbars(wx.SHOW_SB_NEVER, wx.SHOW_SB_ALWAYS)
         self.wad_grid.EnableDragRowMove(True)
-        self.wad_grid.SetSelectionMode(wx.grid.Grid.GridSelectRows)
         self.wad_grid.DisableDragGridSize()
         self.wad_grid.DisableDragRowSize()
 
-        self.column_labels = ['WAD Name']
-        for i, column_label in enumerate(self.column_labels):
-            self.wad_grid.AppendCols(1)
-            self.wad_grid.SetColLabelValue(i, column_label)
-        if self.wad_grid.GetNumberRows() < self.wad_grid_max_displayed_rows:
-            self.wad_grid.AppendRows(self.wad_grid_max_displayed_rows - self.wad_grid.GetNumberRows())
-
         self.wad_grid_sizer = wx.BoxSizer(wx.VERTICAL)
         self.wad_grid_sizer.Add(self.wad_grid, 1, wx.EXPAND)
 
@@ -105,13 +105,22 @@ class SelectionsPanel(wx.Panel):
         """
         self.Bind(wx.grid.EVT_GRID_CELL_RIGHT_CLICK, self.wad_right_click, self.wad_grid)
 
+        # undo and redo profile edits
+        self.undo_id = wx.NewIdRef()
+        self.redo_id = wx.NewIdRef()
+        self.SetAcceleratorTable(wx.AcceleratorTable([(wx.ACCEL_CTRL, ord('Z'), self.undo_id),
+                                                      (wx.ACCEL_CTRL, ord('Y'), self.redo_id),
+                                                      (wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord('Z'), self.redo_id)]))
+        self.Bind(wx.EVT_MENU, self.undo, id=self.undo_id)
+        self.Bind(wx.EVT_MENU, self.redo, id=self.redo_id)
+
         self.main_frame.Bind(gui.events.SELECTED_PROFILE, self.new_profile_selected)
         self.main_frame.Bind(gui.events.WADS_UPDATED, self.refresh_wad_grid)
 
         # display
         self.main_sizer.Add(self.panel_sizer, 1, wx.EXPAND | wx.ALL, 5)
 
-        # set safe working profile to none
+        # set the profile edit session to none
         self.my_profile = None
 
         self.SetSizer(self.main_sizer)
@@ -134,19 +143,13 @@ class SelectionsPanel(wx.Panel):
         :param event: not used
         :return: None
         """
-        old_wads = self.my_profile.wads
-        deleted_wads = []
-        new_wads = []
-        for i, wad in enumerate(old_wads):
-            if i not in self.wad_grid.GetSelectedRows():
-                new_wads.append(wad)
-            else:
-                deleted_wads.append(wad)
+        selected_rows = self.wad_grid.GetSelectedRows()
+        deleted_wads = self.my_profile.delete_wads(selected_rows)
 
-        if new_wads != old_wads:
+        if deleted_wads:
             mylog.info(f"Deleted WADs: {deleted_wads}")
-            self.my_profile.wads = new_wads
-            wx.PostEvent(self.main_frame, gui.events.WADsUpdated())
+            # everything from the first deleted WAD down shifts up
+            wx.PostEvent(self.main_frame, gui.events.WADsUpdated(first=min(selected_rows)))
 
     def wad_selected(self, event: wx.Event) -> None:
         """
@@ -163,7 +166,7 @@ class SelectionsPanel(wx.Panel):
         for row in selected_rows:
             if row >= wads_list_size:
                 self.wad_grid.DeselectRow(row)
-        mylog.info(f"Selected WADs: {[self.my_profile.wads[x] for x in self.wad_grid.GetSelectedRows()]}")
+        mylog.info("Selected WADs: {}", [self.my_profile.wads[x] for x in self.wad_grid.GetSelectedRows()])
         event.Skip()
 
     def launch_opts_changed(self, event: wx.Event) -> None:
@@ -173,7 +176,7 @@ class SelectionsPanel(wx.Panel):
         :param event: not used
         :return: None
         """
-        self.my_profile.launch_opts = self.profile_params_control.GetValue()
+        self.my_profile.set_text('launch_opts', self.profile_params_control.GetValue())
 
     def profile_name_changed(self, event: wx.Event) -> None:
         """
@@ -182,7 +185,7 @@ class SelectionsPanel(wx.Panel):
         :param event: not used
         :return: None
         """
-        self.my_profile.name = self.profile_name_control.GetValue()
+        self.my_profile.set_text('name', self.profile_name_control.GetValue())
 
     def wad_picker(self, event: wx.Event) -> None:
         """
@@ -206,10 +209,10 @@ class SelectionsPanel(wx.Panel):
             might be an issue in wxPython
             """
             wads = [wad.split(os.path.sep)[-1] for wad in wad_picker.GetPaths()]
-            self.my_profile.wads.extend(wads)
+            first = self.my_profile.add_wads(wads)
             mylog.info(f"WADs added: {wads}")
 
-            wx.PostEvent(self.main_frame, gui.events.WADsUpdated())
+            wx.PostEvent(self.main_frame, gui.events.WADsUpdated(first=first))
 
     def save_profile(self, event: wx.Event) -> None:
         """
@@ -220,31 +223,44 @@ class SelectionsPanel(wx.Panel):
         """
         selection = self.main_frame.controls_panel.profiles_list_box.GetSelection()
         old_profile = self.main_frame.profiles.profiles[selection]
-        if self.my_profile.asdict() != old_profile.asdict():
-            mylog.info(f"Profiles have diverged, write new profile to {old_profile.filename}")
-            self.my_profile.to_yaml(old_profile.filename)  # TODO: what if there isnt a filename?
-            wx.PostEvent(self.main_frame, gui.events.ProfilesChanged())  # force a refresh
+        if self.my_profile.dirty:
+            mylog.info(f"Profile has unsaved changes, write new profile to {old_profile.filename}")
+            # TODO: what if there isnt a filename?
+            # written in the background, the profiles watcher picks the new file up once it lands
+            self.main_frame.profile_writer.save(self.my_profile.to_profile(), old_profile.filename)
+            self.my_profile.mark_clean()
+            if self.main_frame.profiles_watcher is None:
+                self.main_frame.profile_writer.flush()
+                wx.PostEvent(self.main_frame, gui.events.ProfilesChanged())  # force a refresh
 
     def new_profile_selected(self, event: wx.Event) -> None:
         """
-        Change the selected profile, post a WADs updated event
+        Change the selected profile, open an edit session on it and post a WADs updated event
+        When the profiles are reloaded the session on the same profile carries on, rather than losing the edits made
+        since it was saved
         If no profiles remain set selected profile to None
 
-        :param event: not used
+        :param event: SELECTED_PROFILE, reloaded is set when the profiles list was reloaded
         :return: None
         """
         selection = self.main_frame.controls_panel.profiles_list_box.GetSelection()
         if selection >= 0:
-            # there is a selected profile, enable the controls and make a new safe copy
+            # there is a selected profile, enable the controls and start editing it
             self.enable_fields()
 
             new_profile = self.main_frame.profiles.profiles[selection]
-            self.my_profile = copy.deepcopy(new_profile)
+            if (getattr(event, 'reloaded', False) and self.my_profile is not None and
+                    self.my_profile.rebase(new_profile)):
+                mylog.info(f"Keeping the edit session on reloaded profile {new_profile.name}")
+                self.show_timedemos(new_profile)
+                return None
+            self.my_profile = ProfileEdit(new_profile)
 
             mylog.info(f"Reloading WADS and opts from new profile {new_profile.name}")
 
             self.profile_params_control.SetValue(self.my_profile.launch_opts)
             self.profile_name_control.SetValue(self.my_profile.name)
+            self.show_timedemos(new_profile)
 
             wx.PostEvent(self.main_frame, gui.events.WADsUpdated())
         else:
@@ -252,6 +268,27 @@ class SelectionsPanel(wx.Panel):
             mylog.info(f"No profiles left to load")
             self.disable_fields()
             self.my_profile = None
+            self.timedemo_label.SetLabel('')
+
+    def show_timedemos(self, profile) -> None:
+        """
+        Show the timedemo history of a profile for the selected source port
+
+        :param profile: the selected profile
+        :return: None
+        """
+        timedemos = self.main_frame.controls_panel.launcher.timedemos
+        summary = timedemos.summary(os.path.basename(profile.filename)) if timedemos else None
+        binary = self.main_frame.controls_panel.source_port_picker.GetPath()
+        if not summary:
+            self.timedemo_label.SetLabel('No timedemo runs')
+        elif binary in summary:
+            runs = summary[binary]
+            self.timedemo_label.SetLabel(f"Timedemo: {runs['runs']} runs, last {runs['last_fps']:.1f} fps, "
+                                         f"best {runs['best_fps']:.1f} fps, mean {runs['mean_fps']:.1f} fps")
+        else:
+            self.timedemo_label.SetLabel(f"Timedemo: {sum(runs['runs'] for runs in summary.values())} runs "
+                                         f"with other source ports")
 
     def enable_fields(self) -> None:
         """
@@ -336,30 +373,61 @@ class SelectionsPanel(wx.Panel):
             if to_index >= wads_list_size:  # in case target position is a filler row
                 to_index = wads_list_size - 1  # constrain target position to wads list
 
-            self.my_profile.wads.insert(to_index, self.my_profile.wads.pop(from_index))
-            mylog.info(f"Moved WAD: {self.my_profile.wads[to_index]} from position: {from_index} "
-                       f"to position: {self.wad_grid.GetRowPos(row)} new WAD list: {self.my_profile.wads}")
+            self.my_profile.move_wad(from_index, to_index)
+            # the list is copied because the record may be written after the next edit
+            mylog.info("Moved WAD: {} from position: {} to position: {} new WAD list: {}",
+                       self.my_profile.wads[to_index], from_index, self.wad_grid.GetRowPos(row),
+                       list(self.my_profile.wads))
+
+        # the WADs list now has the new order, so put the grid rows back in table order
+        self.wad_grid.ResetRowPos()
+        wx.PostEvent(self.main_frame, gui.events.WADsUpdated(first=min(from_index, to_index),
+                                                             last=max(from_index, to_index)))
+
+    def undo(self, event: wx.Event) -> None:
+        """
+        Undo the last change to the profile
+
+        :param event: not used
+        :return: None
+        """
+        if self.my_profile is not None and self.my_profile.undo():
+            self.show_edits()
 
+    def redo(self, event: wx.Event) -> None:
+        """
+        Redo the last undone change to the profile
+
+        :param event: not used
+        :return: None
+        """
+        if self.my_profile is not None and self.my_profile.redo():
+            self.show_edits()
+
+    def show_edits(self) -> None:
+        """
+        Show the edited profile after an undo or redo, post a WADs updated event
+
+        :return: None
+        """
+        # ChangeValue does not post EVT_TEXT, so this does not record another change
+        self.profile_params_control.ChangeValue(self.my_profile.launch_opts)
+        self.profile_name_control.ChangeValue(self.my_profile.name)
         wx.PostEvent(self.main_frame, gui.events.WADsUpdated())
 
+    @traced('gui.refresh_wad_grid')
     def refresh_wad_grid(self, event: wx.Event) -> None:
         """
         Refresh the WADs grid
+        The grid reads from the profile's WADs list, so only the changed rows are redrawn
 
-        :param event: not used
+        :param event: WADsUpdated, optionally with the first and last changed rows
         :return: None
         """
-        mylog.info("Refresh the WAD grid")
-        self.wad_grid.ClearGrid()
-        self.wad_grid.DeleteRows(0, self.wad_grid.GetNumberRows())
-        for row, wad in enumerate(self.my_profile.wads):
-            self.wad_grid.AppendRows(1)
-            self.wad_grid.SetCellValue(row, 0, wad)
-        filler = self.wad_grid_max_displayed_rows - self.wad_grid.GetNumberRows()
-        if filler > 0:
-            self.wad_grid.AppendRows(filler)
-        for row in range(0, self.wad_grid.GetNumberRows()):
-            self.wad_grid.SetReadOnly(row, 0)
-
-        mylog.info(f"WADs: {len(self.my_profile.wads)} Filler: {filler}")
-        self.Layout()  # refresh
+        first = getattr(event, 'first', 0)
+        last = getattr(event, 'last', None)
+        mylog.info("Refresh the WAD grid from row {}", first)
+        self.wad_grid.ClearSelection()
+        self.wad_table.update(self.my_profile.wads, first, last)
+
+        mylog.info("WADs: {}", len(self.my_profile.wads))
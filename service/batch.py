@@ -0,0 +1,157 @@
+import csv
+import glob
+import json
+import os.path
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from logbook import Logger
+
+from service.models import Profile
+from service.serialization import load_yaml
+
+
+mylog = Logger(__name__)
+
+REPORT_FIELDS = ['profile', 'filename', 'params', 'returncode', 'duration', 'started', 'missing_wads', 'error']
+
+
+class BatchJob:
+    """
+    Contains one run of a batch, a profile and the runtime options to launch it with
+    """
+    def __init__(self, filename: str, params: str = '') -> None:
+        """
+        Create a batch job class
+
+        :param filename: profile file path
+        :param params: runtime launch options for this run
+        """
+        self.filename = filename
+        self.params = params
+
+
+def expand_profiles(patterns: list, profiles_folder: str) -> list:
+    """
+    Expand profile names and glob patterns, relative patterns are looked up in the profiles folder
+
+    :param patterns: profile file names or glob patterns
+    :param profiles_folder: profiles directory path
+    :return: list of profile file paths, in pattern order and sorted within each pattern
+    """
+    paths = []
+    for pattern in patterns:
+        if not os.path.isabs(pattern):
+            pattern = os.path.join(profiles_folder, pattern)
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            mylog.warning(f"No profiles match {pattern}")
+        paths.extend(matches)
+    return paths
+
+
+def read_manifest(manifest_file: str, profiles_folder: str) -> list:
+    """
+    Read a batch manifest, a YAML list of runs
+
+    - profile: my-profile-0.yaml  # file name or glob, relative to the profiles folder
+      opts: -timedemo demo1       # optional runtime options
+      repeat: 3                   # optional number of runs
+
+    :param manifest_file: manifest YAML file
+    :param profiles_folder: profiles directory path
+    :return: list of BatchJob
+    """
+    with open(manifest_file, 'r') as manifest_yaml:
+        manifest = load_yaml(manifest_yaml.read()) or []
+
+    jobs = []
+    for run in manifest:
+        if isinstance(run, str):
+            run = {'profile': run}
+        for filename in expand_profiles([run['profile']], profiles_folder):
+            jobs.extend(BatchJob(filename, run.get('opts', '')) for _ in range(run.get('repeat', 1)))
+    return jobs
+
+
+class BatchRunner:
+    """
+    Runs many profiles through a launcher with a limit on how many run at once
+    """
+    def __init__(self, launcher, binary: str, concurrency: int = 1, force: bool = False) -> None:
+        """
+        Create a batch runner class
+
+        :param launcher: Launcher to validate and launch with
+        :param binary: the source port executable
+        :param concurrency: maximum number of source ports running at once
+        :param force: launch profiles with missing WADs anyway
+        """
+        self.launcher = launcher
+        self.binary = binary
+        self.concurrency = max(1, concurrency)
+        self.force = force
+
+    def run_job(self, job: BatchJob, params: str = '') -> dict:
+        """
+        Launch one job and wait for it to finish
+
+        :param job: the job to run
+        :param params: runtime launch options added to every job
+        :return: dict of results
+        """
+        profile = Profile().from_yaml(job.filename)
+        params = ' '.join(p for p in (job.params, params) if p)
+        result = dict.fromkeys(REPORT_FIELDS)
+        result.update({'profile': profile.name, 'filename': job.filename, 'params': params})
+
+        validation = self.launcher.validate(profile)
+        result['missing_wads'] = validation.missing
+        if not validation.ok and not self.force:
+            result['error'] = 'missing WADs'
+            return result
+
+        try:
+            record = self.launcher.launch(profile, self.binary, params=params, capture=True)
+        except OSError as error:
+            mylog.error(error)
+            result['error'] = str(error)
+            return result
+
+        record.done.wait()
+        result.update({'returncode': record.returncode, 'duration': record.duration(), 'started': record.started})
+        return result
+
+    def run(self, jobs: list, params: str = '') -> list:
+        """
+        Run every job, at most concurrency at a time
+
+        :param jobs: list of BatchJob
+        :param params: runtime launch options added to every job
+        :return: list of result dicts, in job order
+        """
+        mylog.info(f"Running {len(jobs)} jobs, {self.concurrency} at a time")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(lambda job: self.run_job(job, params), jobs))
+
+
+def write_report(results: list, report_file: str) -> None:
+    """
+    Write batch results as JSON, or CSV if the report file ends in .csv
+
+    :param results: list of result dicts
+    :param report_file: report file path, - for JSON on stdout
+    :return: None
+    """
+    if report_file == '-':
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    elif report_file.lower().endswith('.csv'):
+        with open(report_file, 'w', newline='') as report:
+            writer = csv.DictWriter(report, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for result in results:
+                writer.writerow({**result, 'missing_wads': ' '.join(result['missing_wads'] or [])})
+    else:
+        with open(report_file, 'w') as report:
+            json.dump(results, report, indent=2)
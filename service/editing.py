@@ -0,0 +1,296 @@
+from logbook import Logger
+
+from service.models import Profile
+
+
+mylog = Logger(__name__)
+
+TEXT_FIELDS = ('name', 'launch_opts')
+
+
+class ProfileEdit:
+    """
+    Edit session for a profile, the profile itself is never changed
+    Every change is recorded in a journal, so checking for unsaved changes is a comparison of two journal positions and
+    any change can be undone or redone
+    The WADs list is shared with the profile until the first WAD edit copies it
+    """
+    def __init__(self, profile: Profile) -> None:
+        """
+        Create a profile edit session
+
+        :param profile: the profile being edited
+        """
+        self.base = profile
+        self.filename = profile.filename
+        self.name = profile.name
+        self.launch_opts = profile.launch_opts
+        self.own_wads = None  # copy of the WADs list, made on the first WAD edit
+        self.journal = []  # (kind, *args) changes, oldest first
+        self.position = 0  # changes before this position are applied, the rest have been undone
+        self.clean_position = 0  # position of the last save
+        self.saved = self.state()  # (name, launch options, WADs) as last saved
+        self.version = 0  # bumped on every change, undo and redo
+
+    @property
+    def wads(self) -> list:
+        """
+        The edited WADs list, treat it as read only and change it through the edit methods
+
+        :return: list of WAD names
+        """
+        return self.base.wads if self.own_wads is None else self.own_wads
+
+    @property
+    def dirty(self) -> bool:
+        """
+        True if there are changes since the profile was opened or last saved
+
+        :return: bool
+        """
+        return self.position != self.clean_position
+
+    @property
+    def can_undo(self) -> bool:
+        """
+        True if there is a change to undo
+
+        :return: bool
+        """
+        return self.position > 0
+
+    @property
+    def can_redo(self) -> bool:
+        """
+        True if there is an undone change to redo
+
+        :return: bool
+        """
+        return self.position < len(self.journal)
+
+    def record(self, change: tuple) -> None:
+        """
+        Apply a change and add it to the journal, dropping any undone changes
+
+        :param change: (kind, *args)
+        :return: None
+        """
+        del self.journal[self.position:]
+        if self.clean_position > self.position:
+            self.clean_position = -1  # the saved state can't be reached any more
+        self.apply(change)
+        self.journal.append(change)
+        self.position += 1
+
+    def set_text(self, field: str, value: str) -> None:
+        """
+        Change the name or the launch options
+        Typing into a field keeps extending the same change, so an undo reverts the whole edit
+
+        :param field: 'name' or 'launch_opts'
+        :param value: the new value
+        :return: None
+        """
+        if field not in TEXT_FIELDS:
+            raise ValueError(f"Not a text field: {field}")
+        old_value = getattr(self, field)
+        if value == old_value:
+            return None
+
+        if self.position == len(self.journal) and self.position > max(self.clean_position, 0):
+            last_change = self.journal[-1]
+            if last_change[0] == field:
+                self.apply((field, old_value, value))
+                if last_change[1] == value:
+                    # back where the edit started, so the edit is no change at all
+                    self.journal.pop()
+                    self.position -= 1
+                else:
+                    self.journal[-1] = (field, last_change[1], value)
+                return None
+        self.record((field, old_value, value))
+
+    def add_wads(self, wads: list) -> int:
+        """
+        Add WADs to the end of the WADs list
+
+        :param wads: WAD names
+        :return: position of the first added WAD
+        """
+        first = len(self.wads)
+        if wads:
+            self.record(('add', first, list(wads)))
+        return first
+
+    def delete_wads(self, rows) -> list:
+        """
+        Delete WADs from the WADs list
+
+        :param rows: positions of the WADs to delete, out of range positions are ignored
+        :return: list of the deleted WAD names
+        """
+        wads = self.wads
+        deleted = [(row, wads[row]) for row in sorted(set(rows)) if 0 <= row < len(wads)]
+        if deleted:
+            self.record(('delete', deleted))
+        return [wad for _, wad in deleted]
+
+    def move_wad(self, from_index: int, to_index: int) -> None:
+        """
+        Move a WAD to another position in the WADs list
+
+        :param from_index: current position of the WAD
+        :param to_index: new position of the WAD
+        :return: None
+        """
+        if from_index != to_index:
+            self.record(('move', from_index, to_index))
+
+    def undo(self) -> str | None:
+        """
+        Revert the last change
+
+        :return: the kind of change that was undone, None if there was nothing to undo
+        """
+        if not self.can_undo:
+            return None
+        self.position -= 1
+        change = self.journal[self.position]
+        self.revert(change)
+        mylog.info(f"Undo {change[0]} on {self.name}")
+        return change[0]
+
+    def redo(self) -> str | None:
+        """
+        Apply the last undone change again
+
+        :return: the kind of change that was redone, None if there was nothing to redo
+        """
+        if not self.can_redo:
+            return None
+        change = self.journal[self.position]
+        self.apply(change)
+        self.position += 1
+        mylog.info(f"Redo {change[0]} on {self.name}")
+        return change[0]
+
+    def writable_wads(self) -> list:
+        """
+        The WADs list to change, copied from the profile the first time
+
+        :return: list of WAD names
+        """
+        if self.own_wads is None:
+            self.own_wads = list(self.base.wads)
+        return self.own_wads
+
+    def apply(self, change: tuple) -> None:
+        """
+        Make a change
+
+        :param change: (kind, *args)
+        :return: None
+        """
+        kind = change[0]
+        if kind in TEXT_FIELDS:
+            setattr(self, kind, change[2])
+        elif kind == 'add':
+            self.writable_wads().extend(change[2])
+        elif kind == 'delete':
+            wads = self.writable_wads()
+            for row, _ in reversed(change[1]):
+                del wads[row]
+        elif kind == 'move':
+            wads = self.writable_wads()
+            wads.insert(change[2], wads.pop(change[1]))
+        self.version += 1
+
+    def revert(self, change: tuple) -> None:
+        """
+        Undo a change
+
+        :param change: (kind, *args)
+        :return: None
+        """
+        kind = change[0]
+        if kind in TEXT_FIELDS:
+            setattr(self, kind, change[1])
+        elif kind == 'add':
+            del self.writable_wads()[change[1]:]
+        elif kind == 'delete':
+            wads = self.writable_wads()
+            for row, wad in change[1]:
+                wads.insert(row, wad)
+        elif kind == 'move':
+            wads = self.writable_wads()
+            wads.insert(change[1], wads.pop(change[2]))
+        self.version += 1
+
+    def mark_clean(self) -> None:
+        """
+        Record that the current state has been saved
+
+        :return: None
+        """
+        self.clean_position = self.position
+        self.saved = self.state()
+
+    def state(self) -> tuple:
+        """
+        The edited values, to compare with a profile
+
+        :return: (name, launch options, tuple of WAD names)
+        """
+        return self.name, self.launch_opts, tuple(self.wads)
+
+    def rebase(self, profile: Profile) -> bool:
+        """
+        Carry the session over to a reloaded copy of the profile being edited, so a save landing on disk or a change
+        to the file while there are unsaved edits never throws the edits and the undo history away
+
+        :param profile: the reloaded profile
+        :return: True if the session carries on, False if a new session should be opened on the profile
+        """
+        if profile.filename != self.filename:
+            return False
+        if (profile.name, profile.launch_opts, tuple(profile.wads)) == self.saved:
+            # the file is as this session last saved it, until the first WAD edit the WADs are the same as well
+            self.base = profile
+            return True
+        if self.dirty:
+            mylog.warning(f"{self.filename} changed on disk, keeping the unsaved changes")
+            return True
+        return False
+
+    def to_profile(self) -> Profile:
+        """
+        Build a profile from the edited values
+
+        :return: Profile
+        """
+        profile = Profile()
+        profile.filename = self.filename
+        profile.name = self.name
+        profile.launch_opts = self.launch_opts
+        profile.wads = list(self.wads)
+        return profile
+
+    def asdict(self) -> dict:
+        """
+        Return the edited profile as a dictionary
+
+        :return: dict
+        """
+        return {'filename': self.filename, 'name': self.name, 'launch_opts': self.launch_opts, 'wads': self.wads}
+
+    def to_yaml(self, output_file: str) -> bool:
+        """
+        Write the edited profile to a YAML file and mark it saved
+
+        :param output_file: YAML file to write to
+        :return: True if the file was written
+        """
+        if not self.to_profile().to_yaml(output_file):
+            return False
+        self.mark_clean()
+        return True
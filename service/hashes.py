@@ -0,0 +1,159 @@
+import hashlib
+import os
+import os.path
+import threading
+import zlib
+
+from logbook import Logger
+
+from service.wads import stat_wads
+
+
+mylog = Logger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_buffers = threading.local()
+
+
+def hash_file(path: str) -> tuple:
+    """
+    SHA-1 and CRC32 of a file in one pass
+    The file is read in fixed size chunks into a buffer that is reused by the calling thread
+
+    :param path: file to hash
+    :return: (sha1 hex digest, crc32)
+    """
+    buffer = getattr(_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _buffers.buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+
+    sha1 = hashlib.sha1()
+    crc32 = 0
+    with open(path, 'rb', buffering=0) as source:
+        while size := source.readinto(buffer):
+            chunk = view[:size]
+            sha1.update(chunk)
+            crc32 = zlib.crc32(chunk, crc32)
+    return sha1.hexdigest(), crc32
+
+
+class WadHashes:
+    """
+    Content hashes of every WAD under a WADs folder, kept in a SQLite database keyed by stat fingerprint
+    Only new or changed files are hashed, so re-running on an unchanged library costs a directory walk
+    """
+    def __init__(self, wads_folder: str, database: str = ':memory:', workers: int | None = None) -> None:
+        """
+        Create a WAD hashes class
+
+        :param wads_folder: WADs directory path
+        :param database: SQLite database path
+        :param workers: number of hashing threads, defaults to the number of CPUs
+        """
+        import sqlite3  # imported here so validating or launching does not pay for it
+
+        self.wads_folder = wads_folder
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.connection = sqlite3.connect(database)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS wad_hashes ('
+            'path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, '
+            'sha1 TEXT NOT NULL, crc32 INTEGER NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS wad_hashes_sha1 ON wad_hashes (sha1)')
+        self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Close the database
+
+        :return: None
+        """
+        self.connection.close()
+
+    def stat_wads(self) -> dict:
+        """
+        Fingerprint every WAD under the WADs folder
+
+        :return: dict of relative path -> (size, mtime_ns)
+        """
+        return stat_wads(self.wads_folder)
+
+    def update(self) -> dict:
+        """
+        Hash the new and changed WADs across a thread pool and forget the deleted ones
+
+        :return: dict of counts of 'hashed', 'unchanged' and 'removed' WADs
+        """
+        from concurrent.futures import ThreadPoolExecutor  # keep it off the launch path, only hashing needs it
+
+        entries = self.stat_wads()
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                 self.connection.execute('SELECT path, size, mtime_ns FROM wad_hashes')}
+
+        stale = [path for path, fingerprint in entries.items() if known.get(path) != fingerprint]
+        removed = [(path,) for path in known if path not in entries]
+
+        rows = []
+        if stale:
+            mylog.info(f"Hashing {len(stale)} WADs with {self.workers} threads")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                paths = [os.path.join(self.wads_folder, path) for path in stale]
+                for path, digests in zip(stale, executor.map(self.try_hash_file, paths)):
+                    if digests is not None:
+                        rows.append((path, *entries[path], *digests))
+
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO wad_hashes VALUES (?, ?, ?, ?, ?)', rows)
+            self.connection.executemany('DELETE FROM wad_hashes WHERE path = ?', removed)
+
+        return {'hashed': len(rows), 'unchanged': len(entries) - len(stale), 'removed': len(removed)}
+
+    @staticmethod
+    def try_hash_file(path: str) -> tuple | None:
+        """
+        Hash a file, logging rather than raising if it can't be read
+
+        :param path: file to hash
+        :return: (sha1, crc32) or None
+        """
+        try:
+            return hash_file(path)
+        except OSError as error:
+            mylog.error(error)
+            return None
+
+    def get(self, wad: str) -> tuple | None:
+        """
+        Look up the hashes of a WAD
+
+        :param wad: WAD path relative to the WADs folder
+        :return: (sha1, crc32) or None if it has not been hashed
+        """
+        return self.connection.execute('SELECT sha1, crc32 FROM wad_hashes WHERE path = ?',
+                                       (os.path.normpath(wad),)).fetchone()
+
+    def find(self, sha1: str) -> list:
+        """
+        Find the WADs with a given SHA-1, for example to check whether a download is already in the library
+
+        :param sha1: hex digest
+        :return: list of WAD paths relative to the WADs folder
+        """
+        return [path for path, in self.connection.execute('SELECT path FROM wad_hashes WHERE sha1 = ? ORDER BY path',
+                                                          (sha1.lower(),))]
+
+    def duplicates(self) -> dict:
+        """
+        Find WADs with identical contents
+
+        :return: dict of sha1 -> sorted list of WAD paths, for every hash shared by more than one WAD
+        """
+        duplicates = {}
+        for sha1, path in self.connection.execute(
+                'SELECT sha1, path FROM wad_hashes WHERE sha1 IN '
+                '(SELECT sha1 FROM wad_hashes GROUP BY sha1 HAVING COUNT(*) > 1) ORDER BY sha1, path'):
+            duplicates.setdefault(sha1, []).append(path)
+        return duplicates
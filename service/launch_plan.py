@@ -0,0 +1,224 @@
+import functools
+import hashlib
+import os
+import os.path
+import shlex
+import tempfile
+import time
+
+from service.persistence import atomic_write
+
+
+# Launch plans, the source port command line of a profile worked out once and reused for every launch
+
+RESPONSE_FILE_FOLDER = os.path.join(tempfile.gettempdir(), 'yawm-response-files')
+RESPONSE_FILE_THRESHOLD = 100  # profiles with more WADs than this pass them in a response file
+RESPONSE_FILE_MAX_AGE = 30 * 24 * 60 * 60  # seconds a response file is kept after its last launch
+
+# options that may be given more than once, a runtime option never replaces these
+REPEATABLE_OPTIONS = frozenset(('-file', '-deh', '-bex', '-exec', '+exec', '+set', '+alias', '+bind'))
+
+
+def is_option(token: str) -> bool:
+    """
+    True if a token starts an option, like -skill or +sv_cheats, rather than being a value like 4 or -1
+
+    :param token: command line token
+    :return: bool
+    """
+    return len(token) > 1 and token[0] in '-+' and not token[1].isdigit()
+
+
+def tokenize(options: str, windows: bool = os.name == 'nt') -> list:
+    """
+    Split launch options into arguments the way a shell would, quotes are removed so that Popen can quote the
+    arguments again
+    On Windows a backslash is a path separator and not an escape character
+
+    :param options: launch options as typed
+    :param windows: keep backslashes
+    :return: list of arguments
+    """
+    lexer = shlex.shlex(options, posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ''
+    if windows:
+        lexer.escape = ''
+    return list(lexer)
+
+
+@functools.lru_cache(maxsize=1024)
+def split_options(options: str, windows: bool = os.name == 'nt') -> tuple:
+    """
+    Tokenize launch options and group every option with its values
+
+        '-skill 4 -warp 1 7' -> (('-skill', '4'), ('-warp', '1', '7'))
+
+    :param options: launch options as typed
+    :param windows: keep backslashes
+    :return: tuple of option groups, each a tuple of tokens
+    """
+    groups = []
+    for token in tokenize(options or '', windows):
+        if is_option(token) or not groups:
+            groups.append([token])
+        else:
+            groups[-1].append(token)
+    return tuple(tuple(group) for group in groups)
+
+
+def option_key(group: tuple) -> str | None:
+    """
+    The name a runtime option replaces a profile option by
+
+    :param group: option group
+    :return: lower case option name, None if the option is never replaced
+    """
+    name = group[0].lower()
+    if not is_option(name) or name in REPEATABLE_OPTIONS:
+        return None
+    return name
+
+
+def merge_options(profile_options: tuple, runtime_options: tuple) -> tuple:
+    """
+    Merge profile and runtime options, the last one wins
+    A profile option given again in the runtime options is dropped, everything else keeps its order and the runtime
+    options go last
+
+    :param profile_options: option groups of the profile
+    :param runtime_options: option groups of the runtime options
+    :return: tuple of tokens
+    """
+    replaced = {option_key(group) for group in runtime_options} - {None}
+    kept = [group for group in profile_options if option_key(group) not in replaced]
+    return tuple(token for group in (*kept, *runtime_options) for token in group)
+
+
+class LaunchPlan:
+    """
+    The command line of a profile, with the WAD paths joined and the launch options tokenized once
+    Plans are cached on everything they are built from, so a changed profile or config gets a new plan
+    """
+    __slots__ = ('binary', 'wads_folder', 'files', 'options', 'argvs', 'response_files')
+
+    def __init__(self, binary: str, wads_folder: str, launch_opts: str, wads: tuple) -> None:
+        """
+        Create a launch plan class
+
+        :param binary: the source port executable
+        :param wads_folder: WADs directory path
+        :param launch_opts: the profile launch options
+        :param wads: the profile WADs, in load order
+        """
+        self.binary = binary
+        self.wads_folder = wads_folder
+        self.files = tuple(os.path.join(wads_folder, wad) for wad in wads)
+        self.options = split_options(launch_opts or '')
+        self.argvs = {}  # (runtime options, response file folder) -> argv
+        self.response_files = {}  # response file folder -> response file path
+
+    def argv(self, params: str = '', response_folder: str | None = None) -> list:
+        """
+        The command line with runtime options merged in
+
+        :param params: the runtime launch options
+        :param response_folder: pass the WADs in a response file kept in this folder rather than on the command line
+        :return: list of arguments
+        """
+        if response_folder and self.files:
+            self.response_file(response_folder)
+        else:
+            response_folder = None
+        argv = self.argvs.get((params, response_folder))
+        if argv is None:
+            if response_folder:
+                prefix = (self.binary, f'@{self.response_files[response_folder]}')
+            elif self.files:
+                prefix = (self.binary, '-file', *self.files)
+            else:
+                prefix = (self.binary,)
+            argv = (*prefix, *merge_options(self.options, split_options(params or '')))
+            if len(self.argvs) < 64:
+                self.argvs[(params, response_folder)] = argv
+        return list(argv)
+
+    def response_file(self, response_folder: str) -> str:
+        """
+        Write the -file list to a response file, unless it is already there
+        Response files are named after a hash of their contents, so profiles with the same WADs share one and a
+        changed WADs list gets a new one
+
+        :param response_folder: directory to keep response files in
+        :return: response file path
+        """
+        path = self.response_files.get(response_folder)
+        if path is not None and touch(path):
+            return path
+
+        contents = '-file\n' + ''.join(f'"{wad_path}"\n' for wad_path in self.files)
+        digest = hashlib.sha1(contents.encode('utf-8')).hexdigest()
+        path = os.path.abspath(os.path.join(response_folder, f'{digest}.rsp'))
+        if not touch(path):
+            os.makedirs(response_folder, exist_ok=True)
+            prune_response_files(response_folder)
+            # a lost response file is written again on the next launch, so it is not worth an fsync
+            atomic_write(path, contents, fsync=False)
+        self.response_files[response_folder] = path
+        return path
+
+
+def touch(path: str) -> bool:
+    """
+    Mark a response file as just used, so it is not pruned while profiles still launch with it
+
+    :param path: response file path
+    :return: False if the file is gone
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        return False
+    return True
+
+
+def prune_response_files(response_folder: str, max_age: float = RESPONSE_FILE_MAX_AGE) -> list:
+    """
+    Remove the response files that no launch has used for longer than the maximum age
+    Called whenever a new response file is written, so the folder doesn't fill up with the WAD lists of old profiles
+
+    :param response_folder: directory response files are kept in
+    :param max_age: seconds since a response file was last used
+    :return: list of removed response file paths
+    """
+    removed = []
+    oldest = time.time() - max_age
+    try:
+        with os.scandir(response_folder) as scan:
+            for entry in scan:
+                if not entry.name.endswith('.rsp'):
+                    continue
+                try:
+                    if entry.stat().st_mtime < oldest:
+                        os.remove(entry.path)
+                        removed.append(entry.path)
+                except OSError:
+                    # another launch removed or is using it, the next prune gets another go
+                    continue
+    except OSError:
+        pass
+    return removed
+
+
+@functools.lru_cache(maxsize=256)
+def launch_plan(binary: str, wads_folder: str, launch_opts: str, wads: tuple) -> LaunchPlan:
+    """
+    The launch plan for a profile, built the first time and reused until anything it is built from changes
+
+    :param binary: the source port executable
+    :param wads_folder: WADs directory path
+    :param launch_opts: the profile launch options
+    :param wads: the profile WADs, in load order
+    :return: LaunchPlan
+    """
+    return LaunchPlan(binary, wads_folder, launch_opts, wads)
@@ -1,10 +1,14 @@
+import os
 import os.path
-from subprocess import Popen
 
-import wx
 from logbook import Logger
 
+from service.launch_plan import RESPONSE_FILE_FOLDER, RESPONSE_FILE_THRESHOLD, LaunchPlan, launch_plan
 from service.models import Profile
+from service.supervisor import LaunchRecord, LaunchSupervisor
+from service.timedemo import TimedemoHistory, is_timedemo, launch_options, parse_timedemo
+from service.tracing import traced
+from service.validation import ValidationResult, WadValidator
 
 
 mylog = Logger(__name__)
@@ -20,30 +24,125 @@ class Launcher:
         """
         self.config = ''
         self.main_frame = None
+        self.close_hook = None
+        self.validator = None
 
         if 'config' in kwargs.keys():
             self.config = kwargs['config']
         if 'main_frame' in kwargs.keys():
             self.main_frame = kwargs['main_frame']
+        if 'close_hook' in kwargs.keys():
+            # the GUI passes in how to close itself, so the service layer never has to import wx
+            self.close_hook = kwargs['close_hook']
 
-    def launch(self, profile: Profile, binary: str, params: str = '') -> None:
+        service_config = self.config.get('service', {}) if self.config else {}
+        self.supervisor = LaunchSupervisor(service_config.get('launch_history'))
+
+        self.timedemo_history = service_config.get('timedemo_history')
+        self._timedemos = None
+        if self.timedemo_history:
+            self.supervisor.listeners.append(self.record_timedemo)
+
+    @property
+    def timedemos(self) -> TimedemoHistory | None:
+        """
+        The timedemo history, opened the first time it is needed
+
+        :return: TimedemoHistory or None if it is not configured
+        """
+        if self._timedemos is None and self.timedemo_history:
+            self._timedemos = TimedemoHistory(self.timedemo_history)
+        return self._timedemos
+
+    def validate(self, profile: Profile) -> ValidationResult:
+        """
+        Check that every WAD in the profile is present before launching
+        The validator is kept between launches so repeat launches only stat the WADs
+
+        :param profile: the profile to validate
+        :return: ValidationResult
+        """
+        wads_folder = self.config['source_port']['wads_folder']
+        hash_files = self.config['service'].get('validate_hashes', False)
+        if (self.validator is None or self.validator.wads_folder != wads_folder or
+                self.validator.hash_files != hash_files):
+            self.validator = WadValidator(wads_folder, hash_files=hash_files)
+        return self.validator.validate(profile.wads)
+
+    def plan(self, profile: Profile, binary: str) -> LaunchPlan:
+        """
+        The launch plan for a profile, cached until the profile, the binary or the WADs folder changes
+
+        :param profile: the profile to launch
+        :param binary: the source port executable
+        :return: LaunchPlan
+        """
+        return launch_plan(binary, self.config['source_port']['wads_folder'], profile.launch_opts or '',
+                           tuple(profile.wads))
+
+    def build_argv(self, profile: Profile, binary: str, params: str = '') -> list:
+        """
+        Build the source port command line as a list of arguments
+        WADs are passed in profile order, runtime options go last and replace the same profile options
+        Profiles with more WADs than service.response_file_threshold pass them in a response file instead
+
+        :param profile: the profile to launch
+        :param binary: the source port executable
+        :param params: the runtime launch options
+        :return: list of arguments
+        """
+        plan = self.plan(profile, binary)
+        service_config = self.config.get('service', {})
+        threshold = service_config.get('response_file_threshold', RESPONSE_FILE_THRESHOLD)
+        if threshold and len(plan.files) > threshold:
+            return plan.argv(params, service_config.get('response_file_folder') or RESPONSE_FILE_FOLDER)
+        return plan.argv(params)
+
+    @traced('launcher.launch')
+    def launch(self, profile: Profile, binary: str, params: str = '', capture: bool = False) -> LaunchRecord:
         """
         Launch the game with passed in launch options
+        The process is supervised in the background, the returned record fills in as it runs
+        Output is only captured for timedemos and when asked for, any other launch returns straight away and leaves the
+        source port writing to nowhere
 
         :param binary: the source port executable
         :param profile: the profile to launch
         :param params: the launch options
-        :return: None
+        :param capture: keep the tail of the output, for a caller that waits for the record
+        :return: LaunchRecord
         """
-        wads_folder = self.config['source_port']['wads_folder']
+        argv = self.build_argv(profile, binary, params)
+        mylog.info(f"Launch argv: {argv}")
+
+        timedemo = is_timedemo(argv)
+        record = self.supervisor.spawn(argv, profile=profile.name, filename=os.path.basename(profile.filename),
+                                       capture=capture or timedemo)
 
-        wads = [os.path.join(wads_folder, wad) for wad in profile.wads]
+        if self.config['service']['auto_close_on_launch'] and self.close_hook:
+            if timedemo:
+                mylog.info("Not closing for a timedemo, its result is read from the output")
+            else:
+                mylog.info(f"Auto close on launch is set: {self.config['service']['auto_close_on_launch']}")
+                self.close_hook()
 
-        launch_path = f"{binary} -file {' '.join(wads)} {profile.launch_opts} {params}"
-        mylog.info(f"Launch path: {launch_path}")
+        return record
+
+    def record_timedemo(self, record: LaunchRecord) -> None:
+        """
+        Supervisor listener, store the result of a finished timedemo run
+
+        :param record: the finished launch record
+        :return: None
+        """
+        if not is_timedemo(record.argv):
+            return None
 
-        Popen(launch_path)
+        result = parse_timedemo([*record.stdout, *record.stderr])
+        if result is None:
+            mylog.warning(f"No timedemo result in the output of {record.profile} (pid {record.pid})")
+            return None
 
-        if self.config['service']['auto_close_on_launch'] and self.main_frame:
-            mylog.info(f"Auto close on launch is set: {self.config['service']['auto_close_on_launch']}")
-            wx.CallAfter(self.main_frame.Destroy)
+        mylog.info(f"Timedemo {record.profile}: {result['fps']:.1f} fps")
+        self.timedemos.add(record.profile, record.filename, record.argv[0], launch_options(record.argv), result,
+                           started=record.started, returncode=record.returncode)
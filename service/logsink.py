@@ -0,0 +1,243 @@
+import queue
+import sys
+import threading
+import time
+
+from logbook import Handler, LogRecord, NOTICE, WARNING, WrapperHandler
+
+
+# Queue backed log handler, records are formatted and written on a background thread in batches
+#
+# Log with a format string and arguments rather than an f-string, so nothing is formatted for a record that is rate
+# limited away, and so every record from one call site shares a key for the rate limit:
+#
+#     mylog.info('Registered new profile: {}', profile.filename)
+
+
+class LogSink(WrapperHandler):
+    """
+    Wraps a logbook handler so logging never writes on the calling thread
+    Records are queued and a background thread formats and writes them in batches with one flush per batch
+    Each message type, a channel, level and format string, is let through a number of times per interval, the rest
+    are counted and summed up in one record when the interval ends
+    """
+    _direct_attrs = frozenset(['handler', 'queue', 'thread', 'batch_size', 'rate_limit', 'interval', 'windows',
+                               'dropped', 'lock'])
+
+    def __init__(self, handler: Handler, batch_size: int = 500, rate_limit: int = 20, interval: float = 1.0,
+                 maxsize: int = 10000) -> None:
+        """
+        Create a log sink class and start its writer thread
+
+        :param handler: the handler to write through, usually a StreamHandler or a FileHandler
+        :param batch_size: most records to write before a flush
+        :param rate_limit: records of one message type let through per interval, 0 lets everything through
+        :param interval: rate limit interval in seconds
+        :param maxsize: most records to queue, records past it are dropped and counted
+        """
+        WrapperHandler.__init__(self, handler)
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.rate_limit = rate_limit
+        self.interval = interval
+        self.windows = {}  # (channel, level, format string) -> [window start, records let through, records held back]
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name='log-sink', daemon=True)
+        self.thread.start()
+
+    def emit(self, record: LogRecord) -> None:
+        """
+        Queue a record unless its message type is over the rate limit, called on the logging thread
+
+        :param record: the record to write
+        :return: None
+        """
+        if self.rate_limit and record.level < NOTICE and not self.allow(record):
+            return None
+        if record.exc_info:
+            # the traceback is gone once the record is closed, so render it now
+            record.formatted_exception
+        self.put(record)
+
+    def allow(self, record: LogRecord) -> bool:
+        """
+        Count a record against the rate limit of its message type
+
+        :param record: the record to count
+        :return: True if the record should be written
+        """
+        key = (record.channel, record.level, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if window is not None and window[2]:
+                    self.put(self.summary_record(key, window[2]))
+                self.windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.rate_limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+    def summary_record(self, key: tuple, count: int) -> LogRecord:
+        """
+        Make the record that stands in for the held back records of a message type
+
+        :param key: (channel, level, format string)
+        :param count: number of records held back
+        :return: LogRecord
+        """
+        channel, level, msg = key
+        return make_record(channel, level, 'Suppressed {} more messages like: {}', count, msg)
+
+    def summarize(self, everything: bool = False) -> None:
+        """
+        Queue a summary for every message type whose interval has ended with records held back
+
+        :param everything: also sum up the intervals that are still open
+        :return: None
+        """
+        now = time.monotonic()
+        with self.lock:
+            for key, window in list(self.windows.items()):
+                if everything or now - window[0] >= self.interval:
+                    if window[2]:
+                        self.put(self.summary_record(key, window[2]))
+                    del self.windows[key]
+
+    def put(self, record: LogRecord | None) -> None:
+        """
+        Queue a record for the writer thread, None stops the thread
+
+        :param record: the record to write
+        :return: None
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        """
+        Writer thread, wait for records, take everything queued up to the batch size and write it
+
+        :return: None
+        """
+        while True:
+            try:
+                record = self.queue.get(timeout=self.interval)
+            except queue.Empty:
+                if self.rate_limit:
+                    self.summarize()
+                continue
+            batch = [record]
+            while record is not None and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+            self.write_batch([record for record in batch if record is not None])
+            for _ in batch:
+                self.queue.task_done()
+            if batch[-1] is None:
+                return None
+
+    def write_batch(self, records: list) -> None:
+        """
+        Format and write a batch of records, stream handlers are flushed once for the whole batch
+
+        :param records: records to write
+        :return: None
+        """
+        if not records:
+            return None
+        handler = self.handler
+        if not hasattr(handler, 'write') or not hasattr(handler, 'flush'):
+            for record in records:
+                handler.handle(record)
+            return None
+
+        lines = []
+        for record in records:
+            try:
+                lines.append((record, handler.encode(handler.format(record))))
+            except Exception:
+                handler.handle_error(record, sys.exc_info())
+        # a timed rotating file handler rolls over when a record's date moves on, which emit would have checked
+        rollover = getattr(handler, 'perform_rollover', None)
+        with handler.lock:
+            try:
+                handler.ensure_stream_is_open()
+                for record, line in lines:
+                    if rollover is not None:
+                        timestamp = handler._get_timestamp(record.time)
+                        if timestamp != handler._timestamp:
+                            handler.flush()
+                            rollover(timestamp)
+                    handler.write(line)
+                handler.flush()
+            except Exception:
+                handler.handle_error(records[-1], sys.exc_info())
+
+    def flush(self) -> None:
+        """
+        Wait for every queued record to be written
+
+        :return: None
+        """
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self) -> None:
+        """
+        Sum up every held back message type, write everything queued, stop the writer thread and close the handler
+
+        :return: None
+        """
+        if self.thread is None:
+            return None
+        self.summarize(everything=True)
+        if self.dropped:
+            self.queue.put(make_record(__name__, WARNING, 'Dropped {} log records, the log queue was full',
+                                       self.dropped))
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.handler.close()
+
+
+def make_record(channel: str, level: int, msg: str, *args) -> LogRecord:
+    """
+    Make a record on the spot for the log sink's own messages
+
+    :param channel: logger name
+    :param level: logbook level
+    :param msg: format string
+    :param args: format arguments
+    :return: LogRecord
+    """
+    record = LogRecord(channel, level, msg, args=args)
+    record.heavy_init()
+    return record
+
+
+def sink_handlers(handlers: list, logger_config: dict) -> list:
+    """
+    Wrap log handlers in log sinks if the logger config asks for queued logging
+
+        logger:
+          queued: true
+          rate_limit: 20
+
+    :param handlers: logbook handlers
+    :param logger_config: the logger section of the config
+    :return: list of handlers
+    """
+    if not logger_config.get('queued', False):
+        return handlers
+    rate_limit = logger_config.get('rate_limit', 20)
+    return [LogSink(handler, rate_limit=rate_limit) for handler in handlers]
@@ -1,18 +1,39 @@
 import os
 import os.path
-from typing import Self
+import pickle
+import sys
+from array import array
+from typing import Iterator, Self
 
-import yaml
 from logbook import Logger
 
+from service.persistence import atomic_write
+from service.serialization import dump_yaml, load_yaml
+from service.tracing import traced
+
 
 mylog = Logger(__name__)
 
+PROFILES_CACHE_VERSION = 1
+
+
+def intern_wads(wads: list) -> list:
+    """
+    Intern WAD names, so a WAD that appears in many profiles is only held in memory once
+
+    :param wads: WAD names
+    :return: list of interned WAD names
+    """
+    return [sys.intern(wad) if type(wad) is str else wad for wad in wads]
+
 
 class Profile:
     """
     Contains profile details
+    Profiles are held by the thousand, so they have slots rather than a __dict__ and do not keep the parsed YAML
     """
+    __slots__ = ('filename', 'name', 'launch_opts', 'wads', 'loaded')
+
     def __init__(self) -> None:
         """
         Create a profile class
@@ -20,8 +41,20 @@ class Profile:
         self.filename = ''
         self.name = ''
         self.launch_opts = ''
-        self.profile = None
         self.wads = []
+        self.loaded = False  # True once populated from a file or a dictionary
+
+    @property
+    def profile(self) -> dict | None:
+        """
+        The profile as it would be read from YAML, rebuilt from the fields rather than stored
+
+        :return: dict or None if the profile has not been populated
+        """
+        if not self.loaded:
+            return None
+        return {key: value for key, value in (('name', self.name), ('launch_opts', self.launch_opts),
+                                              ('wads', self.wads)) if value}
 
     def __eq__(self, another: type):
         """
@@ -36,6 +69,7 @@ class Profile:
                 self.profile == another.profile,
                 self.wads == another.wads)
 
+    @traced('profile.from_yaml')
     def from_yaml(self, source_file: str) -> Self:
         """
         Populate a profile from a YAML file
@@ -49,9 +83,10 @@ class Profile:
             mylog.error(error)
             return self
         else:
-            self.profile = yaml.safe_load(profile_yaml.read())
+            with profile_yaml:
+                source_dict = load_yaml(profile_yaml.read())
             self.filename = source_file
-            self.from_dict(self.profile)
+            self.from_dict(source_dict)
             return self
 
     def from_dict(self, source_dict: dict) -> Self:
@@ -61,7 +96,7 @@ class Profile:
         :param source_dict: dictionary to load from
         :return: Self
         """
-        self.profile = source_dict
+        self.loaded = True
         if 'name' in source_dict.keys():
             self.name = source_dict['name']
 
@@ -69,28 +104,37 @@ class Profile:
             self.launch_opts = source_dict['launch_opts']
 
         if 'wads' in source_dict.keys():
-            self.wads = source_dict['wads']
+            self.wads = intern_wads(source_dict['wads'] or [])
         return self
 
-    def to_yaml(self, output_file: str) -> None:
+    def yaml_dict(self) -> dict:
         """
-        Create a YAML file from a profile
+        The profile as it is written to YAML, empty values are left out and the WADs list is copied
 
-        :param output_file: YAML file to write to
-        :return: None
+        :return: dict
         """
         output = {}
         for k, v in self.asdict().items():
             if v != '':
                 output[k] = v
+        if 'wads' in output:
+            output['wads'] = list(output['wads'])
+        return output
 
+    @traced('profile.to_yaml')
+    def to_yaml(self, output_file: str) -> bool:
+        """
+        Create a YAML file from a profile, the file is replaced in one step so a crash never leaves it truncated
+
+        :param output_file: YAML file to write to
+        :return: True if the file was written
+        """
         try:
-            output_yaml = open(output_file, 'w')
+            atomic_write(output_file, dump_yaml(self.yaml_dict()))
         except OSError as error:
             mylog.error(error)
-            return None
-        else:
-            yaml.dump(output, output_yaml)
+            return False
+        return True
 
     def asdict(self) -> dict:
         """
@@ -101,42 +145,503 @@ class Profile:
         return {'filename': self.filename, 'name': self.name, 'launch_opts': self.launch_opts, 'wads': self.wads}
 
 
+def parse_profiles(paths: list) -> list:
+    """
+    Parse a chunk of profile files, used by the process pool in Profiles.scan
+
+    :param paths: profile file paths
+    :return: list of Profile
+    """
+    return [Profile().from_yaml(path) for path in paths]
+
+
 class Profiles:
     """
-    Contains a list of profiles
+    Contains a list of profiles, indexed by file name
     """
-    def __init__(self, profiles_source: str) -> None:
+    def __init__(self, profiles_source: str, cache_file: str | None = None, workers: int = 0, writer=None) -> None:
         """
         Create a profiles class
 
         :param profiles_source: profiles directory path
+        :param cache_file: optional path of a persisted profiles cache
+        :param workers: number of processes to parse profiles with, 0 or 1 parses them on the calling thread
+        :param writer: optional ProfileWriter to save profiles and the cache in the background
         """
         self.profiles_source = profiles_source
+        self.cache_file = cache_file
+        self.workers = workers
+        self.writer = writer
+        self.cache_dirty = False
         self.profiles = []
+        self.index = {}  # file name -> Profile
+        self.positions = {}  # file name -> position in self.profiles
+        self.fingerprints = {}  # file name -> (mtime_ns, size, inode)
+        self.users = {}  # WAD name -> set of file names of the profiles that load it
 
-    def load(self) -> Self:
+    def get(self, filename: str) -> Profile | None:
+        """
+        Look up a loaded profile by its file name
+
+        :param filename: profile file name, with or without the profiles directory
+        :return: Profile or None
+        """
+        return self.index.get(os.path.basename(filename))
+
+    def stat_profiles(self) -> dict:
+        """
+        Fingerprint every profile file in the profiles directory in a single pass
+
+        :return: dict of file name -> (mtime_ns, size, inode)
+        """
+        entries = {}
+        try:
+            with os.scandir(self.profiles_source) as scan:
+                for entry in scan:
+                    if not entry.name.endswith(('.yaml', '.yml')):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError as error:
+                        mylog.error(error)
+                        continue
+                    entries[entry.name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError as error:
+            mylog.error(error)
+        return entries
+
+    def stat_names(self, names) -> dict:
+        """
+        Fingerprint only the named profile files, files that no longer exist are left out
+
+        :param names: profile file names
+        :return: dict of file name -> (mtime_ns, size, inode)
+        """
+        entries = {}
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.profiles_source, name))
+            except FileNotFoundError:
+                continue
+            except OSError as error:
+                mylog.error(error)
+                continue
+            entries[name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return entries
+
+    def stale(self, entries: dict) -> list:
+        """
+        Find the profile files that are new or have changed since they were last loaded
+
+        :param entries: dict of file name -> fingerprint, as returned by stat_profiles
+        :return: sorted list of file names
+        """
+        return sorted(name for name, fingerprint in entries.items() if self.fingerprints.get(name) != fingerprint)
+
+    def register(self, name: str, fingerprint: tuple, profile: Profile) -> int | None:
+        """
+        Add or replace a profile in the index
+
+        :param name: profile file name
+        :param fingerprint: (mtime_ns, size, inode) of the file the profile was parsed from
+        :param profile: the parsed profile
+        :return: position of the profile in the profiles list, None if nothing changed
+        """
+        old_profile = self.index.get(name)
+        if self.fingerprints.get(name) != fingerprint:
+            self.fingerprints[name] = fingerprint
+            self.cache_dirty = True
+        if old_profile is None:
+            self.index[name] = profile
+            self.positions[name] = len(self.profiles)
+            self.profiles.append(profile)
+            self.index_wads(name, (), profile.wads)
+            mylog.info('Registered new profile: {}', profile.filename)
+            return self.positions[name]
+        elif old_profile.asdict() != profile.asdict():
+            self.index[name] = profile
+            self.profiles[self.positions[name]] = profile
+            self.index_wads(name, old_profile.wads, profile.wads)
+            mylog.info('Registered updated profile: {}', profile.filename)
+            return self.positions[name]
+        return None
+
+    def remove(self, names) -> list:
+        """
+        Remove profiles from the index
+
+        :param names: profile file names to remove
+        :return: list of the removed profile file names
+        """
+        removed = [name for name in names if name in self.index]
+        for name in removed:
+            del self.fingerprints[name]
+            self.cache_dirty = True
+            profile = self.index.pop(name)
+            self.index_wads(name, profile.wads, ())
+            mylog.info('Removed deleted profile: {}', profile.filename)
+        if removed:
+            self.profiles = list(self.index.values())
+            self.positions = {name: position for position, name in enumerate(self.index)}
+        return removed
+
+    def index_wads(self, name: str, old_wads, new_wads) -> None:
+        """
+        Update the WAD reverse index for a profile whose WADs changed
+
+        :param name: profile file name
+        :param old_wads: WADs the profile loaded before
+        :param new_wads: WADs the profile loads now
+        :return: None
+        """
+        old_wads, new_wads = set(old_wads), set(new_wads)
+        for wad in old_wads - new_wads:
+            users = self.users.get(wad)
+            if users is not None:
+                users.discard(name)
+                if not users:
+                    del self.users[wad]
+        for wad in new_wads - old_wads:
+            self.users.setdefault(wad, set()).add(name)
+
+    def uses(self, wad: str) -> list:
+        """
+        Find the profiles that load a WAD
+
+        :param wad: WAD name, as written in the profiles
+        :return: sorted list of profile file names
+        """
+        return sorted(self.users.get(wad, ()))
+
+    def replace_wad(self, old_wad: str, new_wad: str, save: bool = True) -> list:
         """
-        Additively load a list of profiles from a directory
+        Replace a WAD with another in every profile that loads it, for example to move every profile to a new version
+        If a profile already loads the new WAD the old one is just dropped
+
+        :param old_wad: WAD name to replace
+        :param new_wad: WAD name to replace it with
+        :param save: write the changed profiles back to their files, unsaved profiles are reloaded from their files on
+                     the next load
+        :return: sorted list of the changed profile file names
+        """
+        if old_wad == new_wad:
+            return []
+        changed = self.uses(old_wad)
+        for name in changed:
+            old_profile = self.index[name]
+            profile = Profile()
+            profile.filename = old_profile.filename
+            profile.name = old_profile.name
+            profile.launch_opts = old_profile.launch_opts
+            profile.loaded = old_profile.loaded
+            wads = [new_wad if wad == old_wad else wad for wad in old_profile.wads]
+            first = wads.index(new_wad)
+            profile.wads = intern_wads([wad for i, wad in enumerate(wads) if wad != new_wad or i == first])
+
+            fingerprint = self.fingerprints[name]
+            if save and self.writer is not None:
+                # the file is re-parsed once the write lands and changes its fingerprint
+                self.writer.save(profile)
+            elif save and profile.to_yaml(profile.filename):
+                fingerprint = self.stat_names([name]).get(name, fingerprint)
+            else:
+                if save:
+                    mylog.warning(f'Could not save {profile.filename}, it is reloaded from the file on the next load')
+                # nothing was written, so the file no longer matches the profile and is re-parsed on the next load
+                fingerprint = None
+            self.register(name, fingerprint, profile)
+        mylog.info(f'Replaced {old_wad} with {new_wad} in {len(changed)} profiles')
+        return changed
+
+    def prune(self, names) -> list:
+        """
+        Remove any profiles whose files are no longer present
+
+        :param names: file names still present in the profiles directory
+        :return: list of removed profile file names
+        """
+        return self.remove([name for name in self.index if name not in names])
+
+    @traced('profiles.load_cache')
+    def load_cache(self) -> Self:
+        """
+        Seed the index from the persisted profiles cache, if there is one
+        Cached profiles are still validated against the files on the next load
 
         :return: Self
         """
-        # TODO: there is something going on here where profiles directly deleted don't get removed from the list
-        for file in os.listdir(self.profiles_source):
-            if not file.endswith(('.yaml', '.yml')):
+        if not self.cache_file or not os.path.isfile(self.cache_file):
+            return self
+
+        try:
+            with open(self.cache_file, 'rb') as cache:
+                snapshot = pickle.load(cache)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError) as error:
+            mylog.warning(f'Ignoring unreadable profiles cache {self.cache_file}: {error}')
+            return self
+
+        if (not isinstance(snapshot, dict) or snapshot.get('version') != PROFILES_CACHE_VERSION or
+                snapshot.get('source') != os.path.abspath(self.profiles_source)):
+            mylog.info(f'Ignoring stale profiles cache {self.cache_file}')
+            return self
+
+        for name, (fingerprint, source_dict) in snapshot['entries'].items():
+            if name in self.index:
                 continue
-            new_profile = Profile().from_yaml(os.path.join(self.profiles_source, file))
+            profile = Profile().from_dict(source_dict)
+            profile.filename = os.path.join(self.profiles_source, name)
+            self.register(name, fingerprint, profile)
+        self.cache_dirty = False
+
+        mylog.info(f'Profiles restored from cache: {len(self.profiles)}')
+        return self
 
-            for index, old_profile in enumerate(self.profiles):
-                if new_profile.filename == old_profile.filename and new_profile.asdict() != old_profile.asdict():
-                    # this is an existing, updated profile
-                    self.profiles[index] = new_profile
-                    mylog.info(f'Registered updated profile: {new_profile.filename}')
-                    break
+    @traced('profiles.save_cache')
+    def save_cache(self) -> None:
+        """
+        Persist the parsed profiles and their file fingerprints to the profiles cache
+        The cache is replaced in one step so a crash never leaves it truncated, with a writer it is written in the
+        background and repeated saves are coalesced
+
+        :return: None
+        """
+        if not self.cache_file:
+            return None
+
+        snapshot = {
+            'version': PROFILES_CACHE_VERSION,
+            'source': os.path.abspath(self.profiles_source),
+            'entries': {name: (self.fingerprints[name], profile.profile or {}) for name, profile in self.index.items()}
+        }
+
+        if self.writer is not None:
+            self.writer.write(self.cache_file, lambda: pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+            self.cache_dirty = False
+            return None
+
+        try:
+            # the cache can always be rebuilt, so it is not worth an fsync
+            atomic_write(self.cache_file, pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), fsync=False)
+        except OSError as error:
+            mylog.error(error)
+        else:
+            self.cache_dirty = False
+
+    def scan(self, entries: dict, batch_size: int = 100) -> Iterator[list]:
+        """
+        Parse the stale profile files in batches
+        Nothing is registered, so this is safe to run on a worker thread and merge the batches elsewhere
+
+        :param entries: dict of file name -> fingerprint, as returned by stat_profiles
+        :param batch_size: number of profiles per batch
+        :return: iterator of lists of (file name, fingerprint, Profile)
+        """
+        stale = self.stale(entries)
+        if self.workers > 1 and len(stale) > batch_size:
+            yield from self.scan_parallel(entries, stale, batch_size)
+            return
+
+        batch = []
+        for name in stale:
+            batch.append((name, entries[name], Profile().from_yaml(os.path.join(self.profiles_source, name))))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def scan_parallel(self, entries: dict, stale: list, batch_size: int) -> Iterator[list]:
+        """
+        Parse the stale profile files in chunks across a process pool
+        Chunks are yielded in the same sorted order as a serial scan, so the merge is deterministic
+
+        :param entries: dict of file name -> fingerprint, as returned by stat_profiles
+        :param stale: sorted stale file names
+        :param batch_size: number of profiles per chunk
+        :return: iterator of lists of (file name, fingerprint, Profile)
+        """
+        from concurrent.futures import ProcessPoolExecutor  # only pay for multiprocessing when it is used
+
+        chunks = [stale[i:i + batch_size] for i in range(0, len(stale), batch_size)]
+        mylog.info(f'Parsing {len(stale)} profiles across {self.workers} processes')
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            paths = [[os.path.join(self.profiles_source, name) for name in chunk] for chunk in chunks]
+            for chunk, profiles in zip(chunks, executor.map(parse_profiles, paths)):
+                for profile in profiles:
+                    profile.wads = intern_wads(profile.wads)  # unpickled names are fresh copies
+                yield [(name, entries[name], profile) for name, profile in zip(chunk, profiles)]
+
+    @traced('profiles.merge')
+    def merge(self, batch: list) -> list:
+        """
+        Register a batch of parsed profiles
 
-            if new_profile.filename not in [op.filename for op in self.profiles]:
-                # this must be a new profile
-                self.profiles.append(new_profile)
-                mylog.info(f'Registered new profile: {new_profile.filename}')
+        :param batch: list of (file name, fingerprint, Profile), as yielded by scan
+        :return: sorted positions in the profiles list that were added or updated
+        """
+        positions = []
+        for name, fingerprint, profile in batch:
+            position = self.register(name, fingerprint, profile)
+            if position is not None:
+                positions.append(position)
+        return sorted(positions)
+
+    def commit(self, entries: dict) -> list:
+        """
+        Finish a load, prune deleted profiles and persist the cache if anything changed
+
+        :param entries: dict of file name -> fingerprint the load was started from
+        :return: list of removed profile file names
+        """
+        removed = self.prune(entries)
+        if self.cache_dirty:
+            self.save_cache()
 
         mylog.info(f'Profiles registered: {len(self.profiles)}')
+        return removed
+
+    @traced('profiles.load')
+    def load(self) -> Self:
+        """
+        Incrementally load profiles from a directory
+        Only files whose (mtime_ns, size, inode) changed since the last load, or since the cache was written, are parsed
+
+        :return: Self
+        """
+        if not self.index:
+            self.load_cache()
+
+        entries = self.stat_profiles()
+        for batch in self.scan(entries):
+            self.merge(batch)
+        self.commit(entries)
+        return self
+
+    def to_store(self) -> 'ProfileStore':
+        """
+        Copy the profiles into a columnar store, in profiles list order
+
+        :return: ProfileStore
+        """
+        return ProfileStore().extend(self.profiles)
+
+
+class ProfileStore:
+    """
+    Columnar store of profiles, one list or array per field rather than one object per profile
+    WAD names are stored once in a table and each profile's WADs are a run of 4 byte indexes into it, so a library where
+    the same PK3 turns up in hundreds of profiles costs a few bytes per WAD instead of a pointer and a string
+    """
+    def __init__(self) -> None:
+        """
+        Create a profile store class
+        """
+        self.filenames = []
+        self.names = []
+        self.launch_opts = []
+        self.wad_names = []  # distinct WAD names
+        self.wad_ids = {}  # WAD name -> position in wad_names
+        self.wad_starts = array('I')  # first position in wad_refs of each profile's WADs
+        self.wad_counts = array('I')  # number of WADs in each profile
+        self.wad_refs = array('I')  # WAD ids of every profile, back to back
+
+    def __len__(self) -> int:
+        """
+        The number of profiles
+
+        :return: int
+        """
+        return len(self.names)
+
+    def wad_id(self, wad: str) -> int:
+        """
+        The id of a WAD name, adding it to the WAD table if it is new
+
+        :param wad: WAD name
+        :return: position in wad_names
+        """
+        wad_id = self.wad_ids.get(wad)
+        if wad_id is None:
+            wad_id = self.wad_ids[wad] = len(self.wad_names)
+            self.wad_names.append(sys.intern(wad))
+        return wad_id
+
+    def append(self, profile: Profile) -> int:
+        """
+        Add a profile to the end of the store
+
+        :param profile: the profile to add
+        :return: position of the profile
+        """
+        self.filenames.append(profile.filename)
+        self.names.append(profile.name)
+        self.launch_opts.append(sys.intern(profile.launch_opts or ''))
+        self.wad_starts.append(len(self.wad_refs))
+        self.wad_counts.append(len(profile.wads))
+        self.wad_refs.extend(self.wad_id(wad) for wad in profile.wads)
+        return len(self.names) - 1
+
+    def extend(self, profiles: list) -> Self:
+        """
+        Add profiles to the end of the store
+
+        :param profiles: list of Profile
+        :return: Self
+        """
+        for profile in profiles:
+            self.append(profile)
         return self
+
+    def set(self, position: int, profile: Profile) -> None:
+        """
+        Replace a profile
+        The new WADs are appended to the WAD references, the old run is left unused until the store is compacted
+
+        :param position: position of the profile
+        :param profile: the new profile
+        :return: None
+        """
+        self.filenames[position] = profile.filename
+        self.names[position] = profile.name
+        self.launch_opts[position] = sys.intern(profile.launch_opts or '')
+        self.wad_starts[position] = len(self.wad_refs)
+        self.wad_counts[position] = len(profile.wads)
+        self.wad_refs.extend(self.wad_id(wad) for wad in profile.wads)
+
+    def wads(self, position: int) -> list:
+        """
+        The WADs of a profile
+
+        :param position: position of the profile
+        :return: list of WAD names
+        """
+        start = self.wad_starts[position]
+        return [self.wad_names[wad_id] for wad_id in self.wad_refs[start:start + self.wad_counts[position]]]
+
+    def profile(self, position: int) -> Profile:
+        """
+        Build the profile at a position
+
+        :param position: position of the profile
+        :return: Profile
+        """
+        profile = Profile()
+        profile.filename = self.filenames[position]
+        profile.name = self.names[position]
+        profile.launch_opts = self.launch_opts[position]
+        profile.wads = self.wads(position)
+        profile.loaded = True
+        return profile
+
+    def compact(self) -> None:
+        """
+        Drop the WAD references left unused by replaced profiles
+
+        :return: None
+        """
+        wad_refs = array('I')
+        for position in range(len(self.names)):
+            start = self.wad_starts[position]
+            self.wad_starts[position] = len(wad_refs)
+            wad_refs.extend(self.wad_refs[start:start + self.wad_counts[position]])
+        self.wad_refs = wad_refs
@@ -0,0 +1,182 @@
+import atexit
+import os
+import os.path
+import threading
+from typing import Callable, Self
+
+from logbook import Logger
+
+
+mylog = Logger(__name__)
+
+
+def atomic_write(path: str, data: str | bytes, fsync: bool = True) -> None:
+    """
+    Replace a file in one step, so a crash leaves either the old contents or the new ones and never a truncated file
+    The data is written to a temporary file next to the target, flushed to disk and renamed over the target
+
+    :param path: file to write
+    :param data: the new contents, str is written as UTF-8
+    :param fsync: flush the file and its directory to disk, only turn this off for throwaway files
+    :return: None
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(path))
+    temp_file = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            temp.write(data)
+            if fsync:
+                temp.flush()
+                os.fsync(temp.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
+
+    if fsync and os.name == 'posix':
+        # make the rename itself durable
+        directory_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+
+class ProfileWriter:
+    """
+    Write-behind queue for profile and cache files
+    Writes are queued by path and done on a background thread, a path queued again before it is written is only
+    written once with the newest contents, so saving on every edit costs one write per file
+    """
+    def __init__(self, delay: float = 0.5, fsync: bool = True) -> None:
+        """
+        Create a profile writer class
+
+        :param delay: seconds to collect writes for before writing them
+        :param fsync: flush every write to disk
+        """
+        self.delay = delay
+        self.fsync = fsync
+        self.pending = {}  # path -> callable returning the contents
+        self.writing = False
+        self.hurry = False  # skip the delay, set by flush and stop
+        self.writes = 0
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = None
+
+    def start(self) -> Self:
+        """
+        Start writing on a background thread
+        Anything still queued when the interpreter exits is written first
+
+        :return: Self
+        """
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name='profile-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def write(self, path: str, contents: Callable[[], str | bytes]) -> None:
+        """
+        Queue a file to be written, replacing any queued write of the same path
+
+        :param path: file to write
+        :param contents: called on the writer thread to make the contents, it must not read state that is still changing
+        :return: None
+        """
+        with self.condition:
+            self.pending[path] = contents
+            self.condition.notify_all()
+        if self.thread is None:
+            # not started, write straight away
+            self.write_pending()
+
+    def save(self, profile, path: str | None = None) -> None:
+        """
+        Queue a profile to be saved as YAML
+        The profile is copied now, so it can carry on changing while the write is queued
+
+        :param profile: Profile to save
+        :param path: file to save to, defaults to the profile's file name
+        :return: None
+        """
+        from service.serialization import dump_yaml
+
+        output = profile.yaml_dict()
+        self.write(path or profile.filename, lambda: dump_yaml(output))
+
+    def run(self) -> None:
+        """
+        Writer thread, wait for writes, give more writes a moment to arrive and write them
+
+        :return: None
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.stopping)
+                if not self.pending:
+                    return None
+                self.condition.wait_for(lambda: self.hurry or self.stopping, self.delay)
+                self.hurry = False
+            self.write_pending()
+
+    def write_pending(self) -> None:
+        """
+        Write every queued file
+
+        :return: None
+        """
+        with self.condition:
+            pending, self.pending = self.pending, {}
+            self.writing = True
+        try:
+            for path, contents in pending.items():
+                try:
+                    atomic_write(path, contents(), fsync=self.fsync)
+                    self.writes += 1
+                except Exception as error:
+                    mylog.error(f"Could not write {path}: {error}")
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait for every queued write to be done
+
+        :param timeout: seconds to wait at most
+        :return: True if everything was written
+        """
+        if self.thread is None:
+            self.write_pending()
+            return True
+        with self.condition:
+            self.hurry = True
+            self.condition.notify_all()
+            return self.condition.wait_for(lambda: not self.pending and not self.writing, timeout)
+
+    def stop(self) -> None:
+        """
+        Write everything still queued and stop the writer thread
+
+        :return: None
+        """
+        if self.thread is None:
+            return None
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+        atexit.unregister(self.stop)
+        mylog.info(f"Profile writer stopped after {self.writes} writes")
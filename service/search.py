@@ -0,0 +1,126 @@
+import bisect
+
+from logbook import Logger
+
+
+mylog = Logger(__name__)
+
+TRIGRAM_SIZE = 3
+
+
+def search_key(name: str | None) -> str:
+    """
+    Normalise a name for searching and sorting
+
+    :param name: profile name
+    :return: case folded name
+    """
+    return (name or '').casefold()
+
+
+def trigrams(key: str) -> set:
+    """
+    Every run of three characters in a search key
+
+    :param key: normalised name
+    :return: set of trigrams
+    """
+    return {key[i:i + TRIGRAM_SIZE] for i in range(len(key) - TRIGRAM_SIZE + 1)}
+
+
+class NameIndex:
+    """
+    Sorted, searchable index of names by position, for filtering long profile lists as the user types
+    Short queries are prefix matches found by bisecting the sorted names, longer queries are substring matches narrowed
+    down by a trigram index first, so neither scans every name
+    """
+    def __init__(self, names: list | None = None) -> None:
+        """
+        Create a name index class
+
+        :param names: names by position
+        """
+        self.keys = []  # search key by position
+        self.ordered = []  # sorted (search key, position)
+        self.trigrams = {}  # trigram -> set of positions
+        if names:
+            self.build(names)
+
+    def __len__(self) -> int:
+        """
+        The number of indexed names
+
+        :return: int
+        """
+        return len(self.keys)
+
+    def build(self, names: list) -> None:
+        """
+        Rebuild the index from scratch
+
+        :param names: names by position
+        :return: None
+        """
+        self.keys = [search_key(name) for name in names]
+        self.ordered = sorted((key, position) for position, key in enumerate(self.keys))
+        self.trigrams = {}
+        for position, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                self.trigrams.setdefault(trigram, set()).add(position)
+        mylog.debug("Indexed {} names, {} trigrams", len(self.keys), len(self.trigrams))
+
+    def set(self, position: int, name: str | None) -> None:
+        """
+        Add or rename the name at a position
+
+        :param position: position of the name, one past the end appends
+        :param name: the new name
+        :return: None
+        """
+        key = search_key(name)
+        if position < len(self.keys):
+            old_key = self.keys[position]
+            if old_key == key:
+                return None
+            del self.ordered[bisect.bisect_left(self.ordered, (old_key, position))]
+            for trigram in trigrams(old_key):
+                positions = self.trigrams[trigram]
+                positions.discard(position)
+                if not positions:
+                    del self.trigrams[trigram]
+            self.keys[position] = key
+        elif position == len(self.keys):
+            self.keys.append(key)
+        else:
+            raise IndexError(f"Position {position} is past the end of the index ({len(self.keys)})")
+
+        bisect.insort(self.ordered, (key, position))
+        for trigram in trigrams(key):
+            self.trigrams.setdefault(trigram, set()).add(position)
+
+    def search(self, query: str = '') -> list:
+        """
+        Find the positions of the names matching a query, in name order
+        Queries shorter than a trigram match name prefixes, longer queries match anywhere in the name
+
+        :param query: search text, empty matches everything
+        :return: list of positions
+        """
+        query = search_key(query).strip()
+        if not query:
+            return [position for _, position in self.ordered]
+
+        if len(query) < TRIGRAM_SIZE:
+            start = bisect.bisect_left(self.ordered, (query,))
+            end = bisect.bisect_left(self.ordered, (query + '\U0010ffff',), start)
+            return [position for _, position in self.ordered[start:end]]
+
+        # the smallest trigram sets first, so the intersection shrinks as fast as possible
+        candidates = None
+        for positions in sorted((self.trigrams.get(trigram, set()) for trigram in trigrams(query)), key=len):
+            candidates = positions.copy() if candidates is None else candidates & positions
+            if not candidates:
+                return []
+        # trigrams can match out of order, so check the candidates really contain the query
+        return [position for _, position in sorted((self.keys[position], position) for position in candidates
+                                                   if query in self.keys[position])]
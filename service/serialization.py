@@ -0,0 +1,31 @@
+import yaml
+
+
+# PyYAML only ships the C loader and dumper when it was built against libyaml
+if yaml.__with_libyaml__:
+    Loader = yaml.CSafeLoader
+    Dumper = yaml.CSafeDumper
+else:
+    Loader = yaml.SafeLoader
+    Dumper = yaml.SafeDumper
+
+
+def load_yaml(stream) -> object:
+    """
+    Parse YAML with the fastest available safe loader
+
+    :param stream: YAML string, bytes or open file
+    :return: the parsed document
+    """
+    return yaml.load(stream, Loader=Loader)
+
+
+def dump_yaml(data: object, stream=None) -> str | None:
+    """
+    Serialize to YAML with the fastest available safe dumper
+
+    :param data: the document to serialize
+    :param stream: open file to write to, if not given the YAML is returned as a string
+    :return: YAML string if no stream was given, otherwise None
+    """
+    return yaml.dump(data, stream, Dumper=Dumper)
@@ -0,0 +1,285 @@
+import collections
+import json
+import os.path
+import subprocess
+import threading
+import time
+from typing import Self
+
+from logbook import Logger
+
+
+mylog = Logger(__name__)
+
+OUTPUT_TAIL_LINES = 500
+
+
+class LaunchRecord:
+    """
+    Contains the details of one launched source port process
+    """
+    def __init__(self, profile: str = '', argv: list | None = None, filename: str = '') -> None:
+        """
+        Create a launch record class
+
+        :param profile: name of the launched profile
+        :param argv: the command line the process was started with
+        :param filename: file name of the launched profile
+        """
+        self.profile = profile
+        self.filename = filename
+        self.argv = argv or []
+        self.pid = None
+        self.started = None
+        self.first_output = None
+        self.stopped = None
+        self.returncode = None
+        self.stdout = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+        self.stderr = collections.deque(maxlen=OUTPUT_TAIL_LINES)
+        self.done = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """
+        True if the process has been started and has not exited yet
+
+        :return: bool
+        """
+        return self.started is not None and not self.done.is_set()
+
+    @property
+    def crashed(self) -> bool:
+        """
+        True if the process exited with a failure status
+
+        :return: bool
+        """
+        return self.done.is_set() and self.returncode != 0
+
+    def duration(self) -> float | None:
+        """
+        Wall clock run time in seconds
+
+        :return: seconds or None if still running
+        """
+        if self.started is None or self.stopped is None:
+            return None
+        return self.stopped - self.started
+
+    def time_to_first_output(self) -> float | None:
+        """
+        Seconds from spawning to the first line of output, a proxy for the time to the first frame
+
+        :return: seconds or None if nothing was output
+        """
+        if self.started is None or self.first_output is None:
+            return None
+        return self.first_output - self.started
+
+    def summary(self) -> str:
+        """
+        One line description of the launch, with the last line of error output of a crashed launch
+
+        :return: str
+        """
+        if self.running:
+            return f"{self.profile}: pid {self.pid} running"
+        first_output = self.time_to_first_output()
+        duration = self.duration()
+        line = (f"{self.profile}: pid {self.pid} exit {self.returncode} "
+                f"ran {'-' if duration is None else f'{duration:.1f}s'} "
+                f"first output {'-' if first_output is None else f'{first_output:.2f}s'}")
+        if self.crashed:
+            line += ' CRASHED' + (f": {self.stderr[-1]}" if self.stderr else '')
+        return line
+
+    def asdict(self) -> dict:
+        """
+        Return the launch record as a dictionary
+
+        :return: dict
+        """
+        return {'profile': self.profile, 'filename': self.filename, 'argv': self.argv, 'pid': self.pid,
+                'started': self.started, 'first_output': self.first_output, 'stopped': self.stopped,
+                'returncode': self.returncode, 'stdout': list(self.stdout), 'stderr': list(self.stderr)}
+
+    def from_dict(self, source_dict: dict) -> Self:
+        """
+        Populate a launch record from a dictionary
+
+        :param source_dict: dictionary to load from
+        :return: Self
+        """
+        for key in ('profile', 'filename', 'argv', 'pid', 'started', 'first_output', 'stopped', 'returncode'):
+            if key in source_dict:
+                setattr(self, key, source_dict[key])
+        self.stdout.extend(source_dict.get('stdout', []))
+        self.stderr.extend(source_dict.get('stderr', []))
+        if self.stopped is not None:
+            self.done.set()
+        return self
+
+
+class LaunchSupervisor:
+    """
+    Spawns source port processes without blocking and keeps track of them until they exit
+    Each process is watched by daemon threads, so a launch never keeps YAWM running after it is closed
+    The tail of the error output is always kept, to tell why a launch crashed, the much busier standard output only
+    for launches that are waited on
+    """
+    def __init__(self, history_file: str | None = None) -> None:
+        """
+        Create a launch supervisor class
+
+        :param history_file: optional JSON lines file finished launch records are appended to
+        """
+        self.history_file = history_file
+        self.records = []
+        self.lock = threading.Lock()
+        self.listeners = []
+
+    def spawn(self, argv: list, profile: str = '', filename: str = '', capture: bool = False) -> LaunchRecord:
+        """
+        Start a process and supervise it in the background
+
+        :param argv: command line as a list of arguments, no shell is involved
+        :param profile: name of the launched profile
+        :param filename: file name of the launched profile
+        :param capture: also keep the tail of the standard output, only for a caller that waits for the process
+        :return: LaunchRecord, updated in place as the process runs
+        """
+        record = LaunchRecord(profile, list(argv), filename)
+        stdout = subprocess.PIPE if capture else subprocess.DEVNULL
+        process = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=stdout, stderr=subprocess.PIPE)
+        record.started = time.time()
+        record.pid = process.pid
+        mylog.info(f"Launched {profile} as pid {record.pid}")
+
+        with self.lock:
+            self.records.append(record)
+
+        readers = [threading.Thread(target=self.read_output, args=(record, process.stderr, record.stderr),
+                                    name=f'launch-{record.pid}-stderr', daemon=True)]
+        if capture:
+            readers.append(threading.Thread(target=self.read_output, args=(record, process.stdout, record.stdout),
+                                            name=f'launch-{record.pid}-stdout', daemon=True))
+        for reader in readers:
+            reader.start()
+        threading.Thread(target=self.supervise, args=(record, process, readers), name=f'launch-{record.pid}',
+                         daemon=True).start()
+        return record
+
+    @staticmethod
+    def read_output(record: LaunchRecord, stream, lines: collections.deque) -> None:
+        """
+        Supervisor thread, keep the tail of a process output stream
+
+        :param record: the launch record
+        :param stream: the process stdout or stderr pipe
+        :param lines: where to keep the lines
+        :return: None
+        """
+        with stream:
+            for line in stream:
+                if record.first_output is None:
+                    record.first_output = time.time()
+                lines.append(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+
+    def supervise(self, record: LaunchRecord, process: subprocess.Popen, readers: list) -> None:
+        """
+        Supervisor thread, wait for the process to exit and finish its record
+
+        :param record: the launch record
+        :param process: the running process
+        :param readers: the output reader threads
+        :return: None
+        """
+        record.returncode = process.wait()
+        for reader in readers:
+            reader.join()
+        record.stopped = time.time()
+
+        log = mylog.warning if record.returncode != 0 else mylog.info
+        log(f"{record.profile} (pid {record.pid}) exited with {record.returncode} after {record.duration():.1f}s")
+        self.write_history(record)
+        for listener in list(self.listeners):
+            try:
+                listener(record)
+            except Exception as error:
+                mylog.exception(error)
+        record.done.set()
+
+    def write_history(self, record: LaunchRecord) -> None:
+        """
+        Append a finished record to the history file
+
+        :param record: the launch record
+        :return: None
+        """
+        if not self.history_file:
+            return None
+        with self.lock:
+            try:
+                with open(self.history_file, 'a') as history:
+                    history.write(json.dumps(record.asdict()) + '\n')
+            except OSError as error:
+                mylog.error(error)
+
+    def running(self) -> list:
+        """
+        Records of the processes that are still running
+
+        :return: list of LaunchRecord
+        """
+        with self.lock:
+            return [record for record in self.records if record.running]
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Wait for every running process to exit and its record to be finished
+
+        :param timeout: most seconds to wait for, None waits for as long as it takes
+        :return: True if nothing is running any more
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for record in self.running():
+            if not record.done.wait(None if deadline is None else max(deadline - time.monotonic(), 0)):
+                return False
+        return True
+
+    def recent(self, limit: int = 20) -> list:
+        """
+        The most recent launches, finished ones from the history file if there is one and those still running
+
+        :param limit: most records to return
+        :return: list of LaunchRecord, oldest first
+        """
+        with self.lock:
+            records = list(self.records)
+        if self.history_file:
+            finished = self.history(limit)
+        else:
+            finished = [record for record in records if record.done.is_set()]
+        # a record is in the history file a moment before it stops running
+        finished_ids = {(record.pid, record.started) for record in finished}
+        running = [record for record in records if record.running and (record.pid, record.started) not in finished_ids]
+        return (finished + running)[-limit:]
+
+    def history(self, limit: int | None = None) -> list:
+        """
+        Read finished records back from the history file, oldest first
+
+        :param limit: only return the most recent records
+        :return: list of LaunchRecord
+        """
+        if not self.history_file or not os.path.isfile(self.history_file):
+            return []
+        with open(self.history_file, 'r') as history:
+            lines = collections.deque(history, maxlen=limit)
+        records = []
+        for line in lines:
+            try:
+                records.append(LaunchRecord().from_dict(json.loads(line)))
+            except ValueError:
+                continue
+        return records
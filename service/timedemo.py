@@ -0,0 +1,169 @@
+import re
+import threading
+import time
+
+from logbook import Logger
+
+
+mylog = Logger(__name__)
+
+TICRATE = 35
+# GZDoom/Chocolate Doom: "timed 3155 gametics in 1143 realtics (96.5 fps)"
+# PrBoom+: "Timed 3155 gametics in 1143 realtics = 96.5 frames per second"
+TIMEDEMO_RESULT = re.compile(r'(\d+)\s+gametics\s+in\s+(\d+)\s+realtics'
+                             r'(?:\s*(?:\(|=)\s*([\d.]+)\s*(?:fps|frames per second))?', re.IGNORECASE)
+
+
+def parse_timedemo(lines) -> dict | None:
+    """
+    Find the timedemo result in source port output, the last result wins
+
+    :param lines: lines of output
+    :return: dict of gametics, realtics, fps and frame_ms, or None if there was no result
+    """
+    result = None
+    for line in lines:
+        match = TIMEDEMO_RESULT.search(line)
+        if match:
+            result = match
+    if result is None:
+        return None
+
+    gametics, realtics = int(result.group(1)), int(result.group(2))
+    if result.group(3):
+        fps = float(result.group(3))
+    else:
+        fps = gametics * TICRATE / realtics if realtics else 0.0
+    return {'gametics': gametics, 'realtics': realtics, 'fps': fps, 'frame_ms': 1000 / fps if fps else None}
+
+
+def is_timedemo(argv: list) -> bool:
+    """
+    Check whether a command line plays a timedemo
+
+    :param argv: command line as a list of arguments
+    :return: bool
+    """
+    return any(arg.lower() == '-timedemo' for arg in argv)
+
+
+def launch_options(argv: list) -> str:
+    """
+    The options a source port was launched with, without the binary, the -file list and any response file
+
+    :param argv: command line as a list of arguments
+    :return: options string
+    """
+    options = []
+    in_files = False
+    for arg in argv[1:]:
+        if arg.lower() == '-file':
+            in_files = True
+        elif arg.startswith('@'):
+            # a response file holding the -file list
+            in_files = False
+        elif in_files and not arg.startswith(('-', '+')):
+            continue
+        else:
+            in_files = False
+            options.append(arg)
+    return ' '.join(options)
+
+
+class TimedemoHistory:
+    """
+    Contains the timedemo results of every run, kept in a SQLite database
+    """
+    def __init__(self, database: str = ':memory:') -> None:
+        """
+        Create a timedemo history class
+
+        :param database: SQLite database path
+        """
+        import sqlite3  # imported here so a launch without timedemos does not pay for it
+
+        # results arrive from the launch supervisor threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS timedemo_runs ('
+            'id INTEGER PRIMARY KEY, profile TEXT NOT NULL, filename TEXT NOT NULL, binary TEXT NOT NULL, '
+            'options TEXT NOT NULL, started REAL NOT NULL, gametics INTEGER NOT NULL, realtics INTEGER NOT NULL, '
+            'fps REAL NOT NULL, frame_ms REAL, returncode INTEGER)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS timedemo_runs_filename ON timedemo_runs (filename)')
+        self.connection.commit()
+
+    def close(self) -> None:
+        """
+        Close the database
+
+        :return: None
+        """
+        self.connection.close()
+
+    def add(self, profile: str, filename: str, binary: str, options: str, result: dict,
+            started: float | None = None, returncode: int | None = None) -> None:
+        """
+        Store the result of one timedemo run
+
+        :param profile: profile name
+        :param filename: profile file name
+        :param binary: the source port executable
+        :param options: the options it was launched with
+        :param result: dict as returned by parse_timedemo
+        :param started: when the run started, defaults to now
+        :param returncode: the source port exit status
+        :return: None
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO timedemo_runs (profile, filename, binary, options, started, gametics, realtics, fps, '
+                'frame_ms, returncode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (profile, filename, binary, options, started or time.time(), result['gametics'],
+                 result['realtics'], result['fps'], result['frame_ms'], returncode))
+
+    def runs(self, filename: str | None = None, limit: int | None = None) -> list:
+        """
+        Get timedemo runs, newest first
+
+        :param filename: only the runs of this profile file
+        :param limit: maximum number of runs
+        :return: list of dicts
+        """
+        query = 'SELECT profile, filename, binary, options, started, gametics, realtics, fps, frame_ms FROM timedemo_runs'
+        params = []
+        if filename is not None:
+            query += ' WHERE filename = ?'
+            params.append(filename)
+        query += ' ORDER BY started DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+
+        columns = ['profile', 'filename', 'binary', 'options', 'started', 'gametics', 'realtics', 'fps', 'frame_ms']
+        with self.lock:
+            return [dict(zip(columns, row)) for row in self.connection.execute(query, params)]
+
+    def summary(self, filename: str) -> dict | None:
+        """
+        Summarize the timedemo runs of a profile, per source port binary
+
+        :param filename: profile file name
+        :return: dict of binary -> dict of runs, last_fps, best_fps, mean_fps and frame_ms_stdev, or None
+        """
+        import statistics  # only needed for summaries, keep it off the CLI start up path
+
+        summary = {}
+        for run in reversed(self.runs(filename)):
+            summary.setdefault(run['binary'], []).append(run)
+        if not summary:
+            return None
+
+        for binary, runs in summary.items():
+            fps = [run['fps'] for run in runs]
+            frame_ms = [run['frame_ms'] for run in runs if run['frame_ms'] is not None]
+            summary[binary] = {'runs': len(runs), 'last_fps': fps[-1], 'best_fps': max(fps),
+                               'mean_fps': statistics.fmean(fps),
+                               'frame_ms_stdev': statistics.stdev(frame_ms) if len(frame_ms) > 1 else 0.0}
+        return summary
@@ -0,0 +1,266 @@
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable
+
+from logbook import Logger
+
+
+mylog = Logger(__name__)
+
+MAX_TRACE_EVENTS = 100000
+
+
+class NullSpan:
+    """
+    Span used while tracing is off, entering and leaving it does nothing
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> 'NullSpan':
+        """
+        Do nothing
+
+        :return: NullSpan
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Do nothing
+
+        :param exc_info: not used
+        :return: None
+        """
+        return None
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """
+    Times one run of a block of code
+    """
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str) -> None:
+        """
+        Create a span class
+
+        :param tracer: the tracer to record to
+        :param name: span name
+        """
+        self.tracer = tracer
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> 'Span':
+        """
+        Start timing
+
+        :return: Span
+        """
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Stop timing and record the span, whether or not the block raised
+
+        :param exc_info: not used
+        :return: None
+        """
+        self.tracer.record(self.name, self.start, time.perf_counter_ns())
+
+
+class Tracer:
+    """
+    Collects the durations of named spans, off by default
+    While it is off a span is a shared object that does nothing, so the instrumented code pays one attribute check
+    """
+    def __init__(self) -> None:
+        """
+        Create a tracer class
+        """
+        self.enabled = False
+        self.keep_events = False
+        self.lock = threading.Lock()
+        self.stats = {}  # span name -> [count, total ns, min ns, max ns]
+        self.events = []  # (name, start ns, duration ns, thread id) for the trace export
+        self.origin = time.perf_counter_ns()
+
+    def enable(self, keep_events: bool = True) -> None:
+        """
+        Start recording spans
+
+        :param keep_events: keep every span as well as the totals, for the Chrome trace export
+        :return: None
+        """
+        self.keep_events = keep_events
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Stop recording spans, what has been recorded is kept
+
+        :return: None
+        """
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Forget every recorded span
+
+        :return: None
+        """
+        with self.lock:
+            self.stats = {}
+            self.events = []
+            self.origin = time.perf_counter_ns()
+
+    def span(self, name: str) -> Span | NullSpan:
+        """
+        Time a block of code
+
+            with tracer.span('profiles.scan'):
+                ...
+
+        :param name: span name
+        :return: context manager
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def record(self, name: str, start: int, end: int) -> None:
+        """
+        Record a finished span
+
+        :param name: span name
+        :param start: perf_counter_ns at the start
+        :param end: perf_counter_ns at the end
+        :return: None
+        """
+        duration = end - start
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                self.stats[name] = [1, duration, duration, duration]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                if duration < stats[2]:
+                    stats[2] = duration
+                if duration > stats[3]:
+                    stats[3] = duration
+            if self.keep_events and len(self.events) < MAX_TRACE_EVENTS:
+                self.events.append((name, start, duration, threading.get_ident()))
+
+    def summary(self) -> list:
+        """
+        Totals of every span, the most time first
+
+        :return: list of dicts of name, count, total_ms, mean_ms, min_ms and max_ms
+        """
+        with self.lock:
+            stats = [(name, *values) for name, values in self.stats.items()]
+        return [{'name': name, 'count': count, 'total_ms': total / 1e6, 'mean_ms': total / count / 1e6,
+                 'min_ms': low / 1e6, 'max_ms': high / 1e6}
+                for name, count, total, low, high in sorted(stats, key=lambda row: row[2], reverse=True)]
+
+    def format_summary(self) -> str:
+        """
+        Totals of every span as a table
+
+        :return: str
+        """
+        rows = self.summary()
+        width = max([len(row['name']) for row in rows] + [4])
+        lines = [f"{'span':<{width}} {'count':>8} {'total ms':>10} {'mean ms':>9} {'min ms':>9} {'max ms':>9}"]
+        for row in rows:
+            lines.append(f"{row['name']:<{width}} {row['count']:>8} {row['total_ms']:>10.2f} {row['mean_ms']:>9.3f} "
+                         f"{row['min_ms']:>9.3f} {row['max_ms']:>9.3f}")
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> dict:
+        """
+        Every recorded span in the Chrome trace event format, for chrome://tracing or Perfetto
+
+        :return: dict
+        """
+        pid = os.getpid()
+        with self.lock:
+            events = list(self.events)
+            origin = self.origin
+        return {'traceEvents': [{'name': name, 'ph': 'X', 'ts': (start - origin) / 1000, 'dur': duration / 1000,
+                                 'pid': pid, 'tid': tid} for name, start, duration, tid in events],
+                'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, trace_file: str) -> None:
+        """
+        Write every recorded span to a Chrome trace JSON file
+
+        :param trace_file: file to write to
+        :return: None
+        """
+        with open(trace_file, 'w') as trace:
+            json.dump(self.chrome_trace(), trace)
+        mylog.info(f"Wrote {len(self.events)} spans to {trace_file}")
+
+    def log_summary(self, logger: Logger = mylog) -> None:
+        """
+        Send the totals of every span to the logbook handlers
+
+        :param logger: logger to log through
+        :return: None
+        """
+        for row in self.summary():
+            logger.info(f"span {row['name']}: {row['count']} calls, {row['total_ms']:.2f} ms total, "
+                        f"{row['mean_ms']:.3f} ms mean, {row['max_ms']:.3f} ms max")
+
+
+tracer = Tracer()
+
+
+def traced(name: str | None = None) -> Callable:
+    """
+    Decorator, time every call of a function while tracing is on
+
+    :param name: span name, defaults to the function's qualified name
+    :return: decorator
+    """
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                tracer.record(span_name, start, time.perf_counter_ns())
+        return wrapper
+    return decorator
+
+
+def report(trace_file: str | None = None, stream=None) -> None:
+    """
+    Report on everything traced, for --profile-startup
+
+    :param trace_file: optional Chrome trace JSON file to write
+    :param stream: optional open file to print the summary table to
+    :return: None
+    """
+    tracer.log_summary()
+    if stream is not None:
+        print(tracer.format_summary(), file=stream)
+    if trace_file:
+        try:
+            tracer.write_chrome_trace(trace_file)
+        except OSError as error:
+            mylog.error(error)
@@ -0,0 +1,146 @@
+import os
+import os.path
+
+from logbook import Logger
+
+from service.hashes import hash_file
+
+
+mylog = Logger(__name__)
+
+
+class ValidationResult:
+    """
+    Contains the outcome of validating a profile's WADs
+    """
+    def __init__(self) -> None:
+        """
+        Create a validation result class
+        """
+        self.missing = []
+        self.changed = []
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if every WAD is present, changed WADs are only a warning
+
+        :return: bool
+        """
+        return not self.missing
+
+    def summary(self) -> str:
+        """
+        Describe the problems found
+
+        :return: str
+        """
+        lines = [f"Missing WAD: {wad}" for wad in self.missing]
+        lines.extend(f"Changed WAD: {wad}" for wad in self.changed)
+        return '\n'.join(lines)
+
+
+class WadValidator:
+    """
+    Checks that the WADs a profile references exist before launching
+    The WADs folder listing and each file's fingerprint are memoized, so a repeat launch costs a few stat calls
+    """
+    def __init__(self, wads_folder: str, hash_files: bool = False) -> None:
+        """
+        Create a WAD validator
+
+        :param wads_folder: WADs directory path
+        :param hash_files: also compare file contents when a WAD's size or mtime changes
+        """
+        self.wads_folder = wads_folder
+        self.hash_files = hash_files
+        self.folder_mtime_ns = None
+        self.listing = {}  # file name -> (size, mtime_ns) from the last scandir pass
+        self.memo = {}  # path -> (size, mtime_ns, digest) from the last validation
+
+    def scan_folder(self) -> None:
+        """
+        Refresh the WADs folder listing in a single scandir pass, only if the folder itself changed
+
+        :return: None
+        """
+        try:
+            folder_mtime_ns = os.stat(self.wads_folder).st_mtime_ns
+        except OSError as error:
+            mylog.error(error)
+            self.folder_mtime_ns = None
+            self.listing = {}
+            return None
+
+        if folder_mtime_ns == self.folder_mtime_ns:
+            return None
+
+        listing = {}
+        with os.scandir(self.wads_folder) as scan:
+            for entry in scan:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        listing[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    continue
+        self.listing = listing
+        self.folder_mtime_ns = folder_mtime_ns
+
+    def fingerprint(self, wad: str, fresh_listing: bool) -> tuple | None:
+        """
+        Get the (size, mtime_ns) of a WAD
+
+        :param wad: WAD path relative to the WADs folder
+        :param fresh_listing: the listing was just rebuilt, so its stats can be trusted without another stat
+        :return: (size, mtime_ns) or None if the WAD does not exist
+        """
+        if fresh_listing and wad in self.listing:
+            return self.listing[wad]
+        # anything else (sub folders, case insensitive file systems, in place edits) needs its own stat
+        try:
+            stat = os.stat(os.path.join(self.wads_folder, wad))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def validate(self, wads: list) -> ValidationResult:
+        """
+        Check a list of WADs against the WADs folder
+
+        :param wads: WAD paths relative to the WADs folder, as used in profiles
+        :return: ValidationResult
+        """
+        result = ValidationResult()
+        previous_mtime_ns = self.folder_mtime_ns
+        self.scan_folder()
+        fresh_listing = self.folder_mtime_ns != previous_mtime_ns
+
+        for wad in wads:
+            path = os.path.join(self.wads_folder, wad)
+            fingerprint = self.fingerprint(wad, fresh_listing)
+            if fingerprint is None:
+                result.missing.append(wad)
+                self.memo.pop(path, None)
+                continue
+
+            memo = self.memo.get(path)
+            if memo is not None and memo[:2] == fingerprint:
+                continue
+
+            digest = None
+            if self.hash_files:
+                try:
+                    digest, _ = hash_file(path)
+                except OSError as error:
+                    mylog.error(error)
+                    result.missing.append(wad)
+                    continue
+
+            if memo is not None and (digest is None or digest != memo[2]):
+                result.changed.append(wad)
+            self.memo[path] = (*fingerprint, digest)
+
+        if not result.ok or result.changed:
+            mylog.warning(f"WAD validation problems:\n{result.summary()}")
+        return result
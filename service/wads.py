@@ -0,0 +1,360 @@
+import mmap
+import os
+import os.path
+import pickle
+import re
+import struct
+import zipfile
+from typing import Self
+
+from logbook import Logger
+
+from service.persistence import atomic_write
+
+
+mylog = Logger(__name__)
+
+WAD_INDEX_VERSION = 1
+WAD_HEADER = struct.Struct('<4sii')  # identification, number of lumps, directory offset
+WAD_LUMP = struct.Struct('<ii8s')  # lump offset, lump size, lump name
+WAD_EXTENSIONS = ('.wad', '.iwad', '.pwad')
+PK3_EXTENSIONS = ('.pk3', '.pk7', '.ipk3', '.zip')
+MAP_NAME = re.compile(r'^(MAP\d\d|E\dM\d)$')
+
+
+class WadFormatError(Exception):
+    """
+    Raised when a WAD header or directory is malformed
+    """
+
+
+def lump_name(raw: bytes) -> str:
+    """
+    Decode an 8 byte, NUL padded lump name
+
+    :param raw: raw lump name
+    :return: upper case lump name
+    """
+    return raw.split(b'\0', 1)[0].decode('ascii', errors='replace').upper()
+
+
+def read_wad_directory(buffer) -> tuple:
+    """
+    Unpack a WAD header and lump directory without touching any lump data
+
+    :param buffer: the WAD file contents, usually an mmap
+    :return: (identification, list of (offset, size, name))
+    """
+    if len(buffer) < WAD_HEADER.size:
+        raise WadFormatError('file is too small to be a WAD')
+
+    identification, lump_count, directory_offset = WAD_HEADER.unpack_from(buffer, 0)
+    if identification not in (b'IWAD', b'PWAD'):
+        raise WadFormatError(f'unknown WAD identification {identification!r}')
+    if lump_count < 0 or directory_offset < 0 or directory_offset + lump_count * WAD_LUMP.size > len(buffer):
+        raise WadFormatError('WAD directory is truncated')
+
+    lumps = [(offset, size, lump_name(name)) for offset, size, name in
+             WAD_LUMP.iter_unpack(buffer[directory_offset:directory_offset + lump_count * WAD_LUMP.size])]
+    return identification.decode('ascii'), lumps
+
+
+def stat_wads(wads_folder: str) -> dict:
+    """
+    Fingerprint every WAD and PK3 under a folder in one scandir pass per directory
+    A file that can't be read, like a broken link or a file deleted during the scan, is left out
+
+    :param wads_folder: WADs directory path
+    :return: dict of path relative to the folder -> (size, mtime_ns)
+    """
+    entries = {}
+    folders = [wads_folder]
+    while folders:
+        folder = folders.pop()
+        try:
+            with os.scandir(folder) as scan:
+                for entry in scan:
+                    try:
+                        if entry.is_dir():
+                            folders.append(entry.path)
+                        elif entry.name.lower().endswith(WAD_EXTENSIONS + PK3_EXTENSIONS):
+                            stat = entry.stat()
+                            entries[os.path.relpath(entry.path, wads_folder)] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError as error:
+                        mylog.warning(f"Skipping {entry.path}: {error}")
+        except OSError as error:
+            mylog.error(error)
+    return entries
+
+
+class WadFile:
+    """
+    Read only, memory mapped WAD
+    Lumps are returned as memoryview slices of the map, so nothing is copied until the caller asks for bytes
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Open a WAD and read its lump directory
+
+        :param path: WAD file to open
+        """
+        self.path = path
+        self.mmap = None
+        self.view = None
+        with open(path, 'rb') as wad_file:
+            if os.fstat(wad_file.fileno()).st_size == 0:
+                raise WadFormatError('file is empty')
+            self.mmap = mmap.mmap(wad_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self.kind, self.lumps = read_wad_directory(self.mmap)
+        except WadFormatError:
+            self.mmap.close()
+            raise
+        self.view = memoryview(self.mmap)
+
+        # like the engine, a later lump replaces an earlier one with the same name
+        self.lump_index = {name: index for index, (_, _, name) in enumerate(self.lumps)}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.lumps)
+
+    def __contains__(self, name: str) -> bool:
+        return name.upper() in self.lump_index
+
+    def __getitem__(self, name: str) -> memoryview:
+        """
+        Get a lump by name
+
+        :param name: lump name, case insensitive
+        :return: memoryview of the lump data
+        """
+        return self.lump_at(self.lump_index[name.upper()])
+
+    def get(self, name: str) -> memoryview | None:
+        """
+        Get a lump by name if it exists
+
+        :param name: lump name, case insensitive
+        :return: memoryview of the lump data or None
+        """
+        index = self.lump_index.get(name.upper())
+        return None if index is None else self.lump_at(index)
+
+    def lump_at(self, index: int) -> memoryview:
+        """
+        Get a lump by its position in the directory, needed for map lumps which share names like THINGS
+
+        :param index: lump number
+        :return: memoryview of the lump data
+        """
+        offset, size, name = self.lumps[index]
+        if offset < 0 or size < 0 or offset + size > len(self.view):
+            raise WadFormatError(f'lump {name} is outside the file')
+        return self.view[offset:offset + size]
+
+    def names(self) -> list:
+        """
+        Names of every lump in directory order
+
+        :return: list of lump names
+        """
+        return [name for _, _, name in self.lumps]
+
+    def close(self) -> None:
+        """
+        Unmap the WAD, every lump memoryview handed out must have been released first
+
+        :return: None
+        """
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+
+
+class WadInfo:
+    """
+    Contains the indexed details of a WAD or PK3
+    """
+    def __init__(self) -> None:
+        """
+        Create a WAD info class
+        """
+        self.path = ''
+        self.kind = ''
+        self.size = 0
+        self.mtime_ns = 0
+        self.lump_count = 0
+        self.maps = []
+        self.error = ''
+
+    def from_file(self, path: str) -> Self:
+        """
+        Populate the WAD info from a WAD or PK3 file, only the directory is read
+
+        :param path: WAD or PK3 file to read
+        :return: Self
+        """
+        self.path = path
+        try:
+            stat = os.stat(path)
+            self.size = stat.st_size
+            self.mtime_ns = stat.st_mtime_ns
+            if path.lower().endswith(PK3_EXTENSIONS):
+                self.read_pk3()
+            else:
+                self.read_wad()
+        except (OSError, ValueError, WadFormatError, zipfile.BadZipFile) as error:
+            mylog.error(f"Could not index {path}: {error}")
+            self.error = str(error)
+        return self
+
+    def read_wad(self) -> None:
+        """
+        Read the lump directory of a WAD through a memory map
+
+        :return: None
+        """
+        with WadFile(self.path) as wad_file:
+            self.kind = wad_file.kind
+            self.lump_count = len(wad_file)
+            self.maps = [name for name in wad_file.names() if MAP_NAME.match(name)]
+
+    def read_pk3(self) -> None:
+        """
+        Read the central directory of a PK3, maps are the WADs in its maps/ folder
+
+        :return: None
+        """
+        with zipfile.ZipFile(self.path) as pk3_file:
+            entries = [entry for entry in pk3_file.infolist() if not entry.is_dir()]
+        self.kind = 'PK3'
+        self.lump_count = len(entries)
+        self.maps = []
+        for entry in entries:
+            folder, _, filename = entry.filename.replace('\\', '/').rpartition('/')
+            stem, _, extension = filename.rpartition('.')
+            if folder.lower() == 'maps' and extension.lower() == 'wad' and MAP_NAME.match(stem.upper()):
+                self.maps.append(stem.upper())
+
+    def asdict(self) -> dict:
+        """
+        Return the WAD info as a dictionary
+
+        :return: dict
+        """
+        return {'path': self.path, 'kind': self.kind, 'size': self.size, 'mtime_ns': self.mtime_ns,
+                'lump_count': self.lump_count, 'maps': self.maps, 'error': self.error}
+
+
+class WadIndex:
+    """
+    Contains the indexed WADs and PK3s in a WADs folder, keyed by their path relative to the folder
+    """
+    def __init__(self, wads_folder: str, cache_file: str | None = None) -> None:
+        """
+        Create a WAD index class
+
+        :param wads_folder: WADs directory path
+        :param cache_file: optional path of a persisted WAD index
+        """
+        self.wads_folder = wads_folder
+        self.cache_file = cache_file
+        self.wads = {}  # relative path -> WadInfo
+
+    def get(self, wad: str) -> WadInfo | None:
+        """
+        Look up an indexed WAD
+
+        :param wad: WAD path relative to the WADs folder, as used in profiles
+        :return: WadInfo or None
+        """
+        return self.wads.get(os.path.normpath(wad))
+
+    def total_size(self) -> int:
+        """
+        Total size in bytes of every indexed WAD
+
+        :return: int
+        """
+        return sum(info.size for info in self.wads.values())
+
+    def stat_wads(self) -> dict:
+        """
+        Fingerprint every WAD and PK3 under the WADs folder
+
+        :return: dict of relative path -> (size, mtime_ns)
+        """
+        return stat_wads(self.wads_folder)
+
+    def load_cache(self) -> None:
+        """
+        Seed the index from the persisted WAD index, if there is one
+
+        :return: None
+        """
+        if not self.cache_file or not os.path.isfile(self.cache_file):
+            return None
+
+        try:
+            with open(self.cache_file, 'rb') as cache:
+                snapshot = pickle.load(cache)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError) as error:
+            mylog.warning(f'Ignoring unreadable WAD index {self.cache_file}: {error}')
+            return None
+
+        if (isinstance(snapshot, dict) and snapshot.get('version') == WAD_INDEX_VERSION and
+                snapshot.get('source') == os.path.abspath(self.wads_folder)):
+            self.wads = snapshot['wads']
+
+    def save_cache(self) -> None:
+        """
+        Persist the WAD index
+
+        :return: None
+        """
+        if not self.cache_file:
+            return None
+
+        snapshot = {'version': WAD_INDEX_VERSION, 'source': os.path.abspath(self.wads_folder), 'wads': self.wads}
+        try:
+            atomic_write(self.cache_file, pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), fsync=False)
+        except OSError as error:
+            mylog.error(error)
+
+    def load(self) -> Self:
+        """
+        Incrementally index the WADs folder
+        Only files whose (size, mtime_ns) changed since they were last indexed are read
+
+        :return: Self
+        """
+        if not self.wads:
+            self.load_cache()
+
+        entries = self.stat_wads()
+        changed = False
+        for wad, (size, mtime_ns) in entries.items():
+            info = self.wads.get(wad)
+            if info is None or (info.size, info.mtime_ns) != (size, mtime_ns):
+                self.wads[wad] = WadInfo().from_file(os.path.join(self.wads_folder, wad))
+                changed = True
+
+        for wad in [wad for wad in self.wads if wad not in entries]:
+            del self.wads[wad]
+            changed = True
+
+        if changed:
+            self.save_cache()
+
+        mylog.info(f'WADs indexed: {len(self.wads)}')
+        return self
@@ -0,0 +1,228 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable
+
+from logbook import Logger
+
+
+mylog = Logger(__name__)
+
+# inotify(7) event masks
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def load_inotify() -> ctypes.CDLL | None:
+    """
+    Find inotify in the C library, only available on Linux
+
+    :return: libc or None if inotify is not available
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class DirectoryWatcher:
+    """
+    Watch a directory for changed files and report them in debounced bursts
+    Uses inotify on Linux and falls back to polling the directory everywhere else
+    """
+    def __init__(self, path: str, callback: Callable[[set], None], **kwargs) -> None:
+        """
+        Create a directory watcher
+
+        :param path: directory to watch
+        :param callback: called from the watcher thread with the set of changed file names
+        :param kwargs: suffixes, debounce, poll_interval, use_inotify
+        """
+        self.path = path
+        self.callback = callback
+        self.suffixes = kwargs.get('suffixes', ('.yaml', '.yml'))
+        self.debounce = kwargs.get('debounce', 0.25)
+        self.poll_interval = kwargs.get('poll_interval', 1.0)
+        self.libc = load_inotify() if kwargs.get('use_inotify', True) else None
+
+        self.backend = None
+        self.pending = set()
+        self.last_change = 0.0
+        self.stopping = threading.Event()
+        self.thread = None
+        self.inotify_fd = -1
+        self.snapshot = {}
+
+    def start(self) -> None:
+        """
+        Start watching on a background thread
+
+        :return: None
+        """
+        if self.libc is not None and self.start_inotify():
+            self.backend = 'inotify'
+            target = self.run_inotify
+        else:
+            self.backend = 'polling'
+            self.snapshot = self.scan()
+            target = self.run_polling
+
+        mylog.info(f"Watching {self.path} for changes using {self.backend}")
+        self.stopping.clear()
+        self.thread = threading.Thread(target=target, name='directory-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop watching, any pending changes are dropped
+
+        :return: None
+        """
+        self.stopping.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        if self.inotify_fd >= 0:
+            os.close(self.inotify_fd)
+            self.inotify_fd = -1
+
+    def changed(self, names) -> None:
+        """
+        Record changed file names, they are reported once the directory has been quiet for the debounce period
+
+        :param names: changed file names
+        :return: None
+        """
+        names = {name for name in names if name.endswith(self.suffixes)}
+        if names:
+            self.pending.update(names)
+            self.last_change = time.monotonic()
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Report the pending changes if the debounce period has passed
+
+        :param force: report the pending changes regardless of the debounce period
+        :return: None
+        """
+        if self.pending and (force or time.monotonic() - self.last_change >= self.debounce):
+            names, self.pending = self.pending, set()
+            mylog.debug("Changed files in {}: {}", self.path, len(names))
+            try:
+                self.callback(names)
+            except Exception as error:
+                mylog.exception(error)
+
+    def start_inotify(self) -> bool:
+        """
+        Create the inotify instance and watch the directory
+
+        :return: True if inotify is watching the directory
+        """
+        fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            mylog.warning(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+            return False
+        if self.libc.inotify_add_watch(fd, os.fsencode(self.path), WATCH_MASK) < 0:
+            mylog.warning(f"inotify_add_watch failed for {self.path}: {os.strerror(ctypes.get_errno())}")
+            os.close(fd)
+            return False
+        self.inotify_fd = fd
+        return True
+
+    def run_inotify(self) -> None:
+        """
+        Watcher thread, read inotify events until stopped
+
+        :return: None
+        """
+        while not self.stopping.is_set():
+            timeout = self.debounce if self.pending else 0.5
+            try:
+                readable, _, _ = select.select([self.inotify_fd], [], [], timeout)
+            except (OSError, ValueError):
+                break  # the descriptor was closed under us
+            if readable:
+                try:
+                    data = os.read(self.inotify_fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    break
+                self.changed(self.parse_events(data))
+            self.flush()
+
+    def parse_events(self, data: bytes) -> set:
+        """
+        Unpack a buffer of inotify events
+
+        :param data: bytes read from the inotify descriptor
+        :return: set of file names named by the events
+        """
+        names = set()
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were dropped, fall back to comparing every file
+                names.update(self.scan())
+            elif name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def scan(self) -> dict:
+        """
+        Fingerprint the watched files in a single pass
+
+        :return: dict of file name -> (mtime_ns, size, inode)
+        """
+        snapshot = {}
+        try:
+            with os.scandir(self.path) as scan:
+                for entry in scan:
+                    if not entry.name.endswith(self.suffixes):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError as error:
+            mylog.error(error)
+        return snapshot
+
+    def run_polling(self) -> None:
+        """
+        Watcher thread, compare directory snapshots until stopped
+
+        :return: None
+        """
+        while not self.stopping.wait(min(self.poll_interval, self.debounce) if self.pending else self.poll_interval):
+            snapshot = self.scan()
+            self.changed(name for name in snapshot.keys() | self.snapshot.keys()
+                         if snapshot.get(name) != self.snapshot.get(name))
+            self.snapshot = snapshot
+            self.flush()
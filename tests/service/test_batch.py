@@ -0,0 +1,129 @@
+from tempfile import TemporaryDirectory
+import csv
+import json
+import os.path
+
+from service.batch import BatchJob, BatchRunner, expand_profiles, read_manifest, write_report
+from service.models import Profile
+from service.serialization import dump_yaml
+from service.validation import ValidationResult
+
+
+class FakeRecord:
+    """
+    Stands in for a finished LaunchRecord
+    """
+    def __init__(self, returncode: int) -> None:
+        self.returncode = returncode
+        self.started = 1.0
+        self.done = self
+
+    def wait(self) -> bool:
+        return True
+
+    def duration(self) -> float:
+        return 2.0
+
+
+class FakeLauncher:
+    """
+    Stands in for a Launcher, records what it was asked to launch
+    """
+    def __init__(self) -> None:
+        self.launched = []
+
+    def validate(self, profile: Profile) -> ValidationResult:
+        result = ValidationResult()
+        result.missing = [wad for wad in profile.wads if wad.startswith('missing')]
+        return result
+
+    def launch(self, profile: Profile, binary: str, params: str = '', capture: bool = False) -> FakeRecord:
+        self.launched.append((profile.name, binary, params))
+        return FakeRecord(0 if profile.name != 'Broken' else 1)
+
+
+class TestBatch:
+    """
+    A test batch class for batch mode tests
+    """
+    def test_expand_profiles(self):
+        """
+        Expand profile names and globs relative to the profiles folder
+        """
+        with TemporaryDirectory() as test_dir:
+            for name in ['b.yaml', 'a.yaml', 'c.yml']:
+                Profile().from_dict({'name': name}).to_yaml(os.path.join(test_dir, name))
+
+            assert expand_profiles(['*.yaml', 'c.yml', 'missing.yaml'], test_dir) == [
+                os.path.join(test_dir, 'a.yaml'), os.path.join(test_dir, 'b.yaml'), os.path.join(test_dir, 'c.yml')]
+
+    def test_read_manifest(self):
+        """
+        Read the runs from a manifest
+        """
+        with TemporaryDirectory() as test_dir:
+            for name in ['a.yaml', 'b.yaml']:
+                Profile().from_dict({'name': name}).to_yaml(os.path.join(test_dir, name))
+            manifest_file = os.path.join(test_dir, 'manifest.yaml')
+            with open(manifest_file, 'w') as manifest_yaml:
+                dump_yaml([{'profile': 'a.yaml', 'opts': '-timedemo demo1', 'repeat': 2}, 'b.yaml'], manifest_yaml)
+
+            jobs = read_manifest(manifest_file, test_dir)
+
+            assert [(os.path.basename(job.filename), job.params) for job in jobs] == [
+                ('a.yaml', '-timedemo demo1'), ('a.yaml', '-timedemo demo1'), ('b.yaml', '')]
+
+    def test_batch_runner(self):
+        """
+        Run every job and collect the results in job order
+        """
+        with TemporaryDirectory() as test_dir:
+            profiles = {'ok.yaml': {'name': 'Ok', 'wads': ['my-wad-0.wad']},
+                        'broken.yaml': {'name': 'Broken'},
+                        'missing.yaml': {'name': 'Missing', 'wads': ['missing.wad']}}
+            for name, profile_dict in profiles.items():
+                Profile().from_dict(profile_dict).to_yaml(os.path.join(test_dir, name))
+
+            launcher = FakeLauncher()
+            jobs = [BatchJob(os.path.join(test_dir, name), '-timedemo demo1') for name in profiles]
+            results = BatchRunner(launcher, 'gzdoom', concurrency=2).run(jobs, params='-nosound')
+
+            assert [(r['profile'], r['returncode'], r['error']) for r in results] == [
+                ('Ok', 0, None), ('Broken', 1, None), ('Missing', None, 'missing WADs')]
+            assert results[0]['duration'] == 2.0
+            assert results[2]['missing_wads'] == ['missing.wad']
+            assert sorted(launcher.launched) == [('Broken', 'gzdoom', '-timedemo demo1 -nosound'),
+                                                 ('Ok', 'gzdoom', '-timedemo demo1 -nosound')]
+
+    def test_batch_runner_force(self):
+        """
+        Launch a profile with missing WADs anyway when forced
+        """
+        with TemporaryDirectory() as test_dir:
+            Profile().from_dict({'name': 'Missing', 'wads': ['missing.wad']}).to_yaml(
+                os.path.join(test_dir, 'missing.yaml'))
+
+            launcher = FakeLauncher()
+            results = BatchRunner(launcher, 'gzdoom', force=True).run([BatchJob(os.path.join(test_dir, 'missing.yaml'))])
+
+            assert [(r['profile'], r['returncode'], r['error']) for r in results] == [('Missing', 0, None)]
+            assert results[0]['missing_wads'] == ['missing.wad']
+            assert launcher.launched == [('Missing', 'gzdoom', '')]
+
+    def test_write_report(self):
+        """
+        Write JSON and CSV reports
+        """
+        with TemporaryDirectory() as test_dir:
+            results = [{'profile': 'Ok', 'filename': 'ok.yaml', 'params': '', 'returncode': 0, 'duration': 2.0,
+                        'started': 1.0, 'missing_wads': [], 'error': None}]
+
+            write_report(results, os.path.join(test_dir, 'report.json'))
+            write_report(results, os.path.join(test_dir, 'report.csv'))
+
+            with open(os.path.join(test_dir, 'report.json')) as report:
+                assert json.load(report) == results
+            with open(os.path.join(test_dir, 'report.csv'), newline='') as report:
+                rows = list(csv.DictReader(report))
+            assert rows[0]['profile'] == 'Ok'
+            assert rows[0]['returncode'] == '0'
@@ -0,0 +1,136 @@
+from tempfile import TemporaryDirectory
+import os.path
+
+from service.editing import ProfileEdit
+from service.models import Profile
+
+
+class TestProfileEdit:
+    """
+    A test profile edit class for ProfileEdit class tests
+    """
+    def test_new_edit(self):
+        """
+        Open an edit session without copying the WADs list
+        """
+        profile = Profile().from_dict({'name': 'Test Profile', 'wads': ['my-wad-0.wad']})
+
+        edit = ProfileEdit(profile)
+
+        assert not edit.dirty
+        assert edit.wads is profile.wads
+        assert edit.asdict() == profile.asdict()
+
+    def test_edit_wads(self):
+        """
+        Add, move and delete WADs on a copy of the WADs list
+        """
+        profile = Profile().from_dict({'wads': ['my-wad-0.wad', 'my-wad-1.wad']})
+        edit = ProfileEdit(profile)
+
+        assert edit.add_wads(['my-pak-0.pk3']) == 2
+        edit.move_wad(2, 0)
+        assert edit.delete_wads([1, 5]) == ['my-wad-0.wad']
+
+        assert edit.dirty
+        assert edit.wads == ['my-pak-0.pk3', 'my-wad-1.wad']
+        assert profile.wads == ['my-wad-0.wad', 'my-wad-1.wad']
+
+    def test_undo_redo(self):
+        """
+        Undo every change back to the saved state and redo them again
+        """
+        edit = ProfileEdit(Profile().from_dict({'name': 'Test Profile', 'wads': ['my-wad-0.wad', 'my-wad-1.wad']}))
+        edit.add_wads(['my-pak-0.pk3'])
+        edit.delete_wads([0, 2])
+        edit.move_wad(0, 0)
+        edit.set_text('name', 'Renamed')
+
+        assert edit.undo() == 'name'
+        assert edit.undo() == 'delete'
+        assert edit.undo() == 'add'
+        assert edit.undo() is None
+        assert not edit.dirty
+        assert edit.wads == ['my-wad-0.wad', 'my-wad-1.wad']
+
+        assert edit.redo() == 'add'
+        assert edit.redo() == 'delete'
+        assert edit.redo() == 'name'
+        assert edit.redo() is None
+        assert edit.wads == ['my-wad-1.wad']
+        assert edit.name == 'Renamed'
+
+    def test_set_text(self):
+        """
+        Typing into a field is one change, and typing it back is no change
+        """
+        edit = ProfileEdit(Profile().from_dict({'launch_opts': '-skill 4'}))
+
+        for value in ('-skill 4 -', '-skill 4 -f', '-skill 4 -fast'):
+            edit.set_text('launch_opts', value)
+        assert len(edit.journal) == 1
+
+        edit.set_text('launch_opts', '-skill 4')
+        assert not edit.dirty
+        assert edit.journal == []
+
+    def test_save(self):
+        """
+        Saving marks the edit clean, undoing past the save makes it dirty again
+        """
+        with TemporaryDirectory() as test_dir:
+            edit = ProfileEdit(Profile().from_dict({'name': 'Test Profile'}))
+            edit.add_wads(['my-wad-0.wad'])
+
+            edit.to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
+
+            assert not edit.dirty
+            assert Profile().from_yaml(os.path.join(test_dir, 'test_profile.yaml')).wads == ['my-wad-0.wad']
+            edit.undo()
+            assert edit.dirty
+            edit.redo()
+            assert not edit.dirty
+
+    def test_rebase_after_save(self):
+        """
+        Keep the edits made after a save, and the undo history, when the saved file is reloaded
+        """
+        with TemporaryDirectory() as test_dir:
+            profile_file = os.path.join(test_dir, 'test_profile.yaml')
+            Profile().from_dict({'name': 'Test Profile', 'wads': ['my-wad-0.wad']}).to_yaml(profile_file)
+            edit = ProfileEdit(Profile().from_yaml(profile_file))
+            edit.add_wads(['my-wad-1.wad'])
+            edit.to_yaml(profile_file)
+
+            edit.set_text('name', 'Renamed')
+            edit.move_wad(1, 0)
+            reloaded = Profile().from_yaml(profile_file)
+
+            assert edit.rebase(reloaded)
+            assert edit.base is reloaded
+            assert edit.dirty
+            assert edit.state() == ('Renamed', '', ('my-wad-1.wad', 'my-wad-0.wad'))
+            assert edit.undo() == 'move'
+            assert edit.undo() == 'name'
+            assert not edit.dirty
+            assert edit.undo() == 'add'
+            assert edit.wads == ['my-wad-0.wad']
+
+    def test_rebase_changed_file(self):
+        """
+        Open a new session on a file changed elsewhere unless there are unsaved edits, and never on another file
+        """
+        with TemporaryDirectory() as test_dir:
+            profile_file = os.path.join(test_dir, 'test_profile.yaml')
+            Profile().from_dict({'name': 'Test Profile', 'wads': ['my-wad-0.wad']}).to_yaml(profile_file)
+            edit = ProfileEdit(Profile().from_yaml(profile_file))
+            Profile().from_dict({'name': 'Changed Profile', 'wads': ['my-wad-0.wad']}).to_yaml(profile_file)
+            changed = Profile().from_yaml(profile_file)
+
+            assert not edit.rebase(changed)
+            edit.set_text('launch_opts', '-fast')
+            assert edit.rebase(changed)
+            assert edit.state() == ('Test Profile', '-fast', ('my-wad-0.wad',))
+            other = Profile().from_dict({'name': 'Test Profile', 'wads': ['my-wad-0.wad']})
+            other.filename = os.path.join(test_dir, 'other_profile.yaml')
+            assert not edit.rebase(other)
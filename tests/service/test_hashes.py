@@ -0,0 +1,74 @@
+from tempfile import TemporaryDirectory
+import hashlib
+import os
+import os.path
+import zlib
+
+from service.hashes import WadHashes, hash_file
+
+
+def write_file(path: str, data: bytes) -> None:
+    """
+    Write a small file
+    """
+    with open(path, 'wb') as test_file:
+        test_file.write(data)
+
+
+class TestWadHashes:
+    """
+    A test WAD hashes class for WadHashes class tests
+    """
+    def test_hash_file(self):
+        """
+        Hash a file larger than the read buffer
+        """
+        with TemporaryDirectory() as test_dir:
+            data = os.urandom(3 * 1024 * 1024 + 17)
+            wad_path = os.path.join(test_dir, 'my-wad-0.wad')
+            write_file(wad_path, data)
+
+            assert hash_file(wad_path) == (hashlib.sha1(data).hexdigest(), zlib.crc32(data))
+
+    def test_update(self):
+        """
+        Hash every WAD under the WADs folder and find duplicates
+        """
+        with TemporaryDirectory() as test_dir:
+            os.mkdir(os.path.join(test_dir, 'mods'))
+            write_file(os.path.join(test_dir, 'my-wad-0.wad'), b'wad')
+            write_file(os.path.join(test_dir, 'mods', 'my-wad-copy.wad'), b'wad')
+            write_file(os.path.join(test_dir, 'my-pak-0.pk3'), b'pk3')
+            write_file(os.path.join(test_dir, 'readme.txt'), b'wad')
+
+            hashes = WadHashes(test_dir, workers=2)
+            counts = hashes.update()
+
+            wad_sha1 = hashlib.sha1(b'wad').hexdigest()
+            assert counts == {'hashed': 3, 'unchanged': 0, 'removed': 0}
+            assert hashes.get('my-pak-0.pk3') == (hashlib.sha1(b'pk3').hexdigest(), zlib.crc32(b'pk3'))
+            assert hashes.find(wad_sha1) == [os.path.join('mods', 'my-wad-copy.wad'), 'my-wad-0.wad']
+            assert hashes.duplicates() == {wad_sha1: [os.path.join('mods', 'my-wad-copy.wad'), 'my-wad-0.wad']}
+            hashes.close()
+
+    def test_update_incremental(self):
+        """
+        Only hash new and changed WADs, forget deleted ones, and keep the hashes between runs
+        """
+        with TemporaryDirectory() as test_dir, TemporaryDirectory() as db_dir:
+            database = os.path.join(db_dir, 'wads.db')
+            write_file(os.path.join(test_dir, 'my-wad-0.wad'), b'wad')
+            write_file(os.path.join(test_dir, 'my-wad-1.wad'), b'wad')
+            write_file(os.path.join(test_dir, 'my-wad-2.wad'), b'wad')
+            WadHashes(test_dir, database).update()
+
+            write_file(os.path.join(test_dir, 'my-wad-1.wad'), b'changed wad')
+            os.remove(os.path.join(test_dir, 'my-wad-2.wad'))
+
+            hashes = WadHashes(test_dir, database)
+
+            assert hashes.update() == {'hashed': 1, 'unchanged': 1, 'removed': 1}
+            assert hashes.update() == {'hashed': 0, 'unchanged': 2, 'removed': 0}
+            assert hashes.get('my-wad-1.wad')[0] == hashlib.sha1(b'changed wad').hexdigest()
+            assert hashes.get('my-wad-2.wad') is None
+            hashes.close()
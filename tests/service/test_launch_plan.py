@@ -0,0 +1,143 @@
+from tempfile import TemporaryDirectory
+import os
+import os.path
+import time
+
+from service.launch_plan import RESPONSE_FILE_MAX_AGE, LaunchPlan, launch_plan, merge_options, split_options
+from service.launcher import Launcher
+from service.models import Profile
+
+
+class TestLaunchPlan:
+    """
+    A test launch plan class for LaunchPlan class tests
+    """
+    def test_split_options(self):
+        """
+        Group every option with its values, negative numbers are values
+        """
+        assert split_options('-skill 4 -warp 1 7 +sv_cheats 1 -turbo -1') == (
+            ('-skill', '4'), ('-warp', '1', '7'), ('+sv_cheats', '1'), ('-turbo', '-1'))
+        assert split_options('') == ()
+
+    def test_split_quoted_options(self):
+        """
+        Remove the quotes around a value and keep the backslashes of a Windows path
+        """
+        assert split_options('+name "Doom Guy" -deh "C:\\Doom Patches\\my-patch.deh"', windows=True) == (
+            ('+name', 'Doom Guy'), ('-deh', 'C:\\Doom Patches\\my-patch.deh'))
+        assert split_options('-iwad C:\\IWADs\\doom2.wad', windows=True) == (('-iwad', 'C:\\IWADs\\doom2.wad'),)
+        assert split_options("+name 'Doom Guy' -deh my\\ patch.deh", windows=False) == (
+            ('+name', 'Doom Guy'), ('-deh', 'my patch.deh'))
+
+    def test_merge_options(self):
+        """
+        Runtime options replace the same profile options, repeatable options are kept
+        """
+        profile_options = split_options('-skill 4 -fast -deh my-patch.deh')
+        runtime_options = split_options('-SKILL 2 -deh other-patch.deh -warp 7')
+
+        assert merge_options(profile_options, runtime_options) == (
+            '-fast', '-deh', 'my-patch.deh', '-SKILL', '2', '-deh', 'other-patch.deh', '-warp', '7')
+
+    def test_argv(self):
+        """
+        Build the command line with the WADs in profile order and remember it per runtime options
+        """
+        plan = LaunchPlan('gzdoom', 'my-folder', '-skill 4', ('my-wad-1.wad', 'my-wad-0.wad'))
+
+        argv = plan.argv('-skill 3')
+
+        assert argv == ['gzdoom', '-file', os.path.join('my-folder', 'my-wad-1.wad'),
+                        os.path.join('my-folder', 'my-wad-0.wad'), '-skill', '3']
+        argv.append('-changed')
+        assert plan.argv('-skill 3') == argv[:-1]
+        assert LaunchPlan('gzdoom', 'my-folder', '', ()).argv() == ['gzdoom']
+
+    def test_launcher_plan(self):
+        """
+        Reuse the plan of an unchanged profile and make a new one when the profile or the config changes
+        """
+        config = {
+            'source_port': {
+                'wads_folder': 'my-folder'
+            }
+        }
+        launcher = Launcher(config=config)
+        profile = Profile().from_dict({'launch_opts': '-skill 4', 'wads': ['my-wad-0.wad']})
+        plan = launcher.plan(profile, 'gzdoom')
+
+        assert launcher.plan(Profile().from_dict(profile.asdict()), 'gzdoom') is plan
+        assert launch_plan('gzdoom', 'my-folder', '-skill 4', ('my-wad-0.wad',)) is plan
+
+        profile.wads.append('my-wad-1.wad')
+        assert launcher.plan(profile, 'gzdoom') is not plan
+        config['source_port']['wads_folder'] = 'other-folder'
+        assert launcher.plan(profile, 'gzdoom').files[0] == os.path.join('other-folder', 'my-wad-0.wad')
+
+    def test_response_file(self):
+        """
+        Pass the WADs in a response file named after its contents and write it again if it goes missing
+        """
+        with TemporaryDirectory() as test_dir:
+            plan = LaunchPlan('gzdoom', 'my folder', '-skill 4', ('my-wad-0.wad', 'my-pak-0.pk3'))
+
+            argv = plan.argv('-warp 7', response_folder=test_dir)
+
+            assert argv[0] == 'gzdoom' and argv[1].startswith('@') and argv[2:] == ['-skill', '4', '-warp', '7']
+            response_file = argv[1][1:]
+            with open(response_file) as rsp:
+                assert rsp.read().splitlines() == ['-file', f'"{os.path.join("my folder", "my-wad-0.wad")}"',
+                                                   f'"{os.path.join("my folder", "my-pak-0.pk3")}"']
+            same_wads = LaunchPlan('gzdoom', 'my folder', '', ('my-wad-0.wad', 'my-pak-0.pk3'))
+            assert same_wads.response_file(test_dir) == response_file
+
+            os.remove(response_file)
+            assert plan.argv('-warp 7', response_folder=test_dir) == argv
+            assert os.path.isfile(response_file)
+
+    def test_response_file_pruning(self):
+        """
+        Remove response files unused for longer than the maximum age when a new one is written, and keep used ones
+        """
+        with TemporaryDirectory() as test_dir:
+            used = LaunchPlan('gzdoom', 'my-folder', '', ('my-wad-0.wad',))
+            used_file = used.response_file(test_dir)
+            unused_file = LaunchPlan('gzdoom', 'my-folder', '', ('my-wad-1.wad',)).response_file(test_dir)
+            other_file = os.path.join(test_dir, 'notes.txt')
+            open(other_file, 'w').close()
+            long_ago = time.time() - RESPONSE_FILE_MAX_AGE - 60
+            for path in (used_file, unused_file, other_file):
+                os.utime(path, (long_ago, long_ago))
+
+            assert used.argv(response_folder=test_dir)[1] == f'@{used_file}'
+            new_file = LaunchPlan('gzdoom', 'my-folder', '', ('my-wad-2.wad',)).response_file(test_dir)
+
+            assert sorted(os.listdir(test_dir)) == sorted(os.path.basename(path)
+                                                          for path in (used_file, new_file, other_file))
+
+    def test_launcher_response_file_threshold(self):
+        """
+        Only use a response file for profiles with more WADs than the threshold
+        """
+        with TemporaryDirectory() as test_dir:
+            config = {
+                'source_port': {
+                    'wads_folder': 'my-folder'
+                },
+                'service': {
+                    'response_file_threshold': 2,
+                    'response_file_folder': test_dir
+                }
+            }
+            launcher = Launcher(config=config)
+            small = Profile().from_dict({'wads': ['my-wad-0.wad', 'my-wad-1.wad']})
+            large = Profile().from_dict({'wads': ['my-wad-0.wad', 'my-wad-1.wad', 'my-wad-2.wad']})
+
+            assert launcher.build_argv(small, 'gzdoom')[1] == '-file'
+            assert launcher.build_argv(large, 'gzdoom')[1].startswith(f'@{test_dir}')
+
+            del config['service']['response_file_threshold']
+            assert launcher.build_argv(large, 'gzdoom')[1] == '-file'
+            many = Profile().from_dict({'wads': [f'my-wad-{i}.wad' for i in range(101)]})
+            assert launcher.build_argv(many, 'gzdoom')[1].startswith(f'@{test_dir}')
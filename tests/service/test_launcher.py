@@ -1,9 +1,9 @@
 from tempfile import TemporaryDirectory
 import os.path
-
-import yaml
+import sys
 
 from service.launcher import Launcher
+from service.models import Profile
 
 
 class TestLauncher:
@@ -33,3 +33,84 @@ class TestLauncher:
 
         assert launcher.config == config
         assert launcher.main_frame == main_frame
+
+    def test_launcher_validate(self):
+        """
+        Report the missing WADs in a profile
+        """
+        with TemporaryDirectory() as test_dir:
+            with open(os.path.join(test_dir, 'my-wad-0.wad'), 'w') as wad_file:
+                wad_file.write('wad')
+
+            config = {
+                'source_port': {
+                    'wads_folder': test_dir
+                },
+                'service': {}
+            }
+            profile = Profile().from_dict({'wads': ['my-wad-0.wad', 'my-pak-0.pk3']})
+
+            result = Launcher(config=config).validate(profile)
+
+            assert result.missing == ['my-pak-0.pk3']
+
+    def test_launcher_build_argv(self):
+        """
+        Build the command line as a list of arguments with the runtime options last
+        """
+        config = {
+            'source_port': {
+                'wads_folder': 'my-folder'
+            }
+        }
+        profile = Profile().from_dict({'launch_opts': '-skill 4', 'wads': ['my-wad-0.wad', 'my-pak-0.pk3']})
+
+        argv = Launcher(config=config).build_argv(profile, 'gzdoom', params='-warp 7')
+
+        assert argv == ['gzdoom', '-file', os.path.join('my-folder', 'my-wad-0.wad'),
+                        os.path.join('my-folder', 'my-pak-0.pk3'), '-skill', '4', '-warp', '7']
+
+    def test_launcher_record_timedemo(self):
+        """
+        Store the timedemo result of a supervised launch
+        """
+        with TemporaryDirectory() as test_dir:
+            config = {
+                'source_port': {
+                    'wads_folder': test_dir
+                },
+                'service': {
+                    'auto_close_on_launch': False,
+                    'timedemo_history': os.path.join(test_dir, 'timedemos.db')
+                }
+            }
+            profile = Profile().from_dict({'name': 'Test Profile'})
+            profile.filename = os.path.join(test_dir, 'test_profile.yaml')
+            launcher = Launcher(config=config)
+
+            record = launcher.launch(profile, sys.executable,
+                                     params="-c \"print('timed 3155 gametics in 1143 realtics (96.5 fps)')\" -timedemo")
+
+            assert record.done.wait(10)
+            assert launcher.timedemos.runs('test_profile.yaml')[0]['fps'] == 96.5
+            launcher.timedemos.close()
+
+    def test_launcher_close_hook(self):
+        """
+        Call the close hook after launching when auto close is set
+        """
+        config = {
+            'source_port': {
+                'wads_folder': 'my-folder'
+            },
+            'service': {
+                'auto_close_on_launch': True
+            }
+        }
+        closed = []
+        launcher = Launcher(config=config, close_hook=lambda: closed.append(True))
+
+        record = launcher.launch(Profile(), sys.executable, params='-c pass')
+
+        assert record.done.wait(10)
+        assert closed == [True]
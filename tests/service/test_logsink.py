@@ -0,0 +1,112 @@
+from io import StringIO
+from tempfile import TemporaryDirectory
+import os.path
+
+from logbook import FileHandler, Logger, StreamHandler, TestHandler as RecordingHandler
+
+from service.logsink import LogSink, sink_handlers
+
+
+class CountingFileHandler(FileHandler):
+    """
+    File handler that counts its flushes
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        """
+        Create a counting file handler class
+        """
+        self.flushes = 0
+        FileHandler.__init__(self, *args, **kwargs)
+
+    def flush(self) -> None:
+        """
+        Count and flush
+
+        :return: None
+        """
+        self.flushes += 1
+        FileHandler.flush(self)
+
+
+class TestLogSink:
+    """
+    A test log sink class for LogSink class tests
+    """
+    def test_batched_writes(self):
+        """
+        Write every record from the writer thread with far fewer flushes than records
+        """
+        with TemporaryDirectory() as test_dir:
+            log_file = os.path.join(test_dir, 'test-log')
+            file_handler = CountingFileHandler(log_file, format_string='{record.level_name}: {record.message}')
+            sink = LogSink(file_handler, rate_limit=0)
+            logger = Logger('test')
+
+            # hold the writer thread up so the records pile up in the queue
+            with sink.applicationbound(), file_handler.lock:
+                for i in range(1000):
+                    logger.info('Registered new profile: {}', i)
+            sink.close()
+
+            with open(log_file) as log:
+                lines = log.read().splitlines()
+            assert len(lines) == 1000
+            assert lines[-1] == 'INFO: Registered new profile: 999'
+            assert file_handler.flushes < 10
+
+    def test_rate_limit(self):
+        """
+        Hold back repeats of one message type past the limit and sum them up in one record
+        """
+        test_handler = RecordingHandler()
+        sink = LogSink(test_handler, rate_limit=5, interval=60)
+        logger = Logger('test')
+
+        with sink.applicationbound():
+            for i in range(100):
+                logger.info('Registered new profile: {}', i)
+            logger.info('Profiles registered: {}', 100)
+            logger.warning('Warnings are never held back: {}', 1)
+            logger.warning('Warnings are never held back: {}', 2)
+        sink.close()
+
+        messages = [record.message for record in test_handler.records]
+        assert messages[:5] == [f'Registered new profile: {i}' for i in range(5)]
+        assert 'Profiles registered: 100' in messages
+        assert len([message for message in messages if message.startswith('Warnings')]) == 2
+        assert messages[-1] == 'Suppressed 95 more messages like: Registered new profile: {}'
+
+    def test_deferred_formatting(self):
+        """
+        Never format a record that is held back
+        """
+        class Argument:
+            formatted = 0
+
+            def __format__(self, spec):
+                Argument.formatted += 1
+                return 'argument'
+
+        stream = StringIO()
+        sink = LogSink(StreamHandler(stream, format_string='{record.message}'), rate_limit=1, interval=60)
+        logger = Logger('test')
+
+        with sink.applicationbound():
+            for _ in range(10):
+                logger.info('Argument: {}', Argument())
+        sink.close()
+
+        assert Argument.formatted == 1
+        assert stream.getvalue().splitlines()[0] == 'Argument: argument'
+
+    def test_sink_handlers(self):
+        """
+        Only wrap the handlers when the logger config asks for queued logging
+        """
+        handler = RecordingHandler()
+
+        assert sink_handlers([handler], {'level': 0}) == [handler]
+        sinks = sink_handlers([handler], {'level': 0, 'queued': True, 'rate_limit': 3})
+        assert isinstance(sinks[0], LogSink)
+        assert sinks[0].rate_limit == 3
+        sinks[0].close()
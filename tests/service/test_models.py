@@ -3,7 +3,7 @@ import os.path
 
 import yaml
 
-from service.models import Profile, Profiles
+from service.models import Profile, Profiles, ProfileStore, parse_profiles
 
 
 class TestProfile:
@@ -134,6 +134,16 @@ class TestProfile:
 
         assert profile.asdict() == profile_dict
 
+    def test_profile_slots_and_interned_wads(self):
+        """
+        Profiles have no __dict__ and share WAD name strings
+        """
+        profile = Profile().from_dict({'wads': [''.join(['my-wad', '-0.wad'])]})
+        another_profile = Profile().from_dict({'wads': [''.join(['my-wad', '-0.wad'])]})
+
+        assert not hasattr(profile, '__dict__')
+        assert profile.wads[0] is another_profile.wads[0]
+
 
 class TestProfiles:
     """
@@ -231,35 +241,324 @@ class TestProfiles:
             assert profiles.profiles_source == test_dir
             assert profiles.profiles == [profile_yml, updated_profile_yml]
 
-    # TODO: deal with this mess later
-    # def test_profiles_deleted_profile(self):
-    #     """
-    #     Do not load a deleted profile after profiles have already been loaded
-    #     """
-    #     with TemporaryDirectory() as test_dir:
-    #         profile_dict = {
-    #             'name': 'Test Profile',
-    #             'launch_opts': 'my-opt',
-    #             'wads': ['my-wad-0.wad', 'my-pak-0.pk3']
-    #         }
-    #
-    #         updated_profile_dict = {
-    #             'name': 'Another Test Profile',
-    #             'launch_opts': 'another-my-opt',
-    #             'wads': ['my-wad-0.wad', 'my-pak-0.pk3', 'my-pak-1.pk3']
-    #         }
-    #
-    #         profile_yaml = Profile().from_dict(profile_dict)
-    #         profile_yaml.to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
-    #
-    #         profile_yml = Profile().from_dict(profile_dict)
-    #         profile_yml.to_yaml(os.path.join(test_dir, 'test_profile.yml'))
-    #
-    #         profiles = Profiles(test_dir).load()
-    #
-    #         os.remove(os.path.join(test_dir, 'test_profile.yml'))
-    #
-    #         profiles.load()
-    #
-    #         assert profiles.profiles_source == test_dir
-    #         assert profiles.profiles == [profile_yaml, profile_yml]
+    def test_profiles_deleted_profile(self):
+        """
+        Do not load a deleted profile after profiles have already been loaded
+        """
+        with TemporaryDirectory() as test_dir:
+            profile_dict = {
+                'name': 'Test Profile',
+                'launch_opts': 'my-opt',
+                'wads': ['my-wad-0.wad', 'my-pak-0.pk3']
+            }
+
+            profile_yaml = Profile().from_dict(profile_dict)
+            profile_yaml.to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
+
+            profile_yml = Profile().from_dict(profile_dict)
+            profile_yml.to_yaml(os.path.join(test_dir, 'test_profile.yml'))
+
+            profiles = Profiles(test_dir).load()
+
+            os.remove(os.path.join(test_dir, 'test_profile.yml'))
+
+            profiles.load()
+
+            assert profiles.profiles_source == test_dir
+            assert len(profiles.profiles) == 1
+            assert profiles.get('test_profile.yml') is None
+            assert profiles.get('test_profile.yaml').filename == os.path.join(test_dir, 'test_profile.yaml')
+
+    def test_profiles_load_unchanged_profile(self):
+        """
+        Do not re-parse a profile whose file has not changed
+        """
+        with TemporaryDirectory() as test_dir:
+            profile_dict = {
+                'name': 'Test Profile',
+                'launch_opts': 'my-opt',
+                'wads': ['my-wad-0.wad', 'my-pak-0.pk3']
+            }
+
+            profile_yaml = Profile().from_dict(profile_dict)
+            profile_yaml.to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
+
+            profiles = Profiles(test_dir).load()
+            loaded_profile = profiles.get('test_profile.yaml')
+
+            profiles.load()
+
+            assert profiles.get('test_profile.yaml') is loaded_profile
+            assert profiles.stale(profiles.stat_profiles()) == []
+
+    def test_profiles_get(self):
+        """
+        Look up a loaded profile by file name or path
+        """
+        with TemporaryDirectory() as test_dir:
+            profile_path = os.path.join(test_dir, 'test_profile.yaml')
+            Profile().from_dict({'name': 'Test Profile'}).to_yaml(profile_path)
+
+            profiles = Profiles(test_dir).load()
+
+            assert profiles.get('test_profile.yaml').name == 'Test Profile'
+            assert profiles.get(profile_path) is profiles.get('test_profile.yaml')
+            assert profiles.get('missing.yaml') is None
+
+    def test_profiles_load_from_cache(self, monkeypatch):
+        """
+        Restore unchanged profiles from the profiles cache without parsing any YAML
+        """
+        with TemporaryDirectory() as test_dir, TemporaryDirectory() as cache_dir:
+            profile_dict = {
+                'name': 'Test Profile',
+                'launch_opts': 'my-opt',
+                'wads': ['my-wad-0.wad', 'my-pak-0.pk3']
+            }
+            cache_file = os.path.join(cache_dir, 'profiles.cache')
+
+            Profile().from_dict(profile_dict).to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
+            Profiles(test_dir, cache_file=cache_file).load()
+
+            assert os.path.isfile(cache_file)
+
+            def from_yaml(*args, **kwargs):
+                raise AssertionError('profile should have come from the cache')
+
+            monkeypatch.setattr(Profile, 'from_yaml', from_yaml)
+            profiles = Profiles(test_dir, cache_file=cache_file).load()
+
+            cached_profile = profiles.get('test_profile.yaml')
+            assert cached_profile.filename == os.path.join(test_dir, 'test_profile.yaml')
+            assert cached_profile.name == 'Test Profile'
+            assert cached_profile.launch_opts == 'my-opt'
+            assert cached_profile.wads == ['my-wad-0.wad', 'my-pak-0.pk3']
+
+    def test_profiles_load_stale_cache(self):
+        """
+        Re-parse profiles that changed or were deleted after the profiles cache was written
+        """
+        with TemporaryDirectory() as test_dir, TemporaryDirectory() as cache_dir:
+            cache_file = os.path.join(cache_dir, 'profiles.cache')
+
+            Profile().from_dict({'name': 'Test Profile'}).to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
+            Profile().from_dict({'name': 'Test Profile'}).to_yaml(os.path.join(test_dir, 'test_profile.yml'))
+            Profiles(test_dir, cache_file=cache_file).load()
+
+            Profile().from_dict({'name': 'Updated Test Profile'}).to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
+            os.remove(os.path.join(test_dir, 'test_profile.yml'))
+
+            profiles = Profiles(test_dir, cache_file=cache_file).load()
+
+            assert len(profiles.profiles) == 1
+            assert profiles.get('test_profile.yaml').name == 'Updated Test Profile'
+
+    def test_profiles_load_corrupt_cache(self):
+        """
+        Ignore an unreadable profiles cache and load from the profiles directory
+        """
+        with TemporaryDirectory() as test_dir, TemporaryDirectory() as cache_dir:
+            cache_file = os.path.join(cache_dir, 'profiles.cache')
+            with open(cache_file, 'wb') as cache:
+                cache.write(b'not a pickle')
+
+            Profile().from_dict({'name': 'Test Profile'}).to_yaml(os.path.join(test_dir, 'test_profile.yaml'))
+
+            profiles = Profiles(test_dir, cache_file=cache_file).load()
+
+            assert profiles.get('test_profile.yaml').name == 'Test Profile'
+
+    def test_profiles_scan_and_merge(self):
+        """
+        Parse stale profiles in batches without registering them, then merge the batches
+        """
+        with TemporaryDirectory() as test_dir:
+            for i in range(5):
+                Profile().from_dict({'name': f'Test Profile {i}'}).to_yaml(os.path.join(test_dir, f'profile-{i}.yaml'))
+
+            profiles = Profiles(test_dir)
+            entries = profiles.stat_profiles()
+            batches = list(profiles.scan(entries, batch_size=2))
+
+            assert [len(batch) for batch in batches] == [2, 2, 1]
+            assert profiles.profiles == []
+
+            positions = [position for batch in batches for position in profiles.merge(batch)]
+            profiles.commit(entries)
+
+            assert positions == [0, 1, 2, 3, 4]
+            assert [p.name for p in profiles.profiles] == [f'Test Profile {i}' for i in range(5)]
+            assert list(profiles.scan(profiles.stat_profiles())) == []
+
+    def test_profiles_load_parallel(self):
+        """
+        Load profiles across a process pool in the same order as a serial load
+        """
+        with TemporaryDirectory() as test_dir:
+            for i in range(7):
+                Profile().from_dict({'name': f'Test Profile {i}'}).to_yaml(os.path.join(test_dir, f'profile-{i}.yaml'))
+
+            serial_profiles = Profiles(test_dir).load()
+
+            parallel_profiles = Profiles(test_dir, workers=2)
+            entries = parallel_profiles.stat_profiles()
+            for batch in parallel_profiles.scan(entries, batch_size=3):
+                parallel_profiles.merge(batch)
+            parallel_profiles.commit(entries)
+
+            assert [p.asdict() for p in parallel_profiles.profiles] == [p.asdict() for p in serial_profiles.profiles]
+            assert parallel_profiles.fingerprints == serial_profiles.fingerprints
+
+    def test_parse_profiles(self):
+        """
+        Parse a chunk of profile files
+        """
+        with TemporaryDirectory() as test_dir:
+            paths = [os.path.join(test_dir, f'profile-{i}.yaml') for i in range(2)]
+            for i, path in enumerate(paths):
+                Profile().from_dict({'name': f'Test Profile {i}'}).to_yaml(path)
+
+            assert [p.name for p in parse_profiles(paths)] == ['Test Profile 0', 'Test Profile 1']
+
+    def test_profiles_stat_names_and_remove(self):
+        """
+        Apply only the named profile files, removing the ones that no longer exist
+        """
+        with TemporaryDirectory() as test_dir:
+            for i in range(3):
+                Profile().from_dict({'name': f'Test Profile {i}'}).to_yaml(os.path.join(test_dir, f'profile-{i}.yaml'))
+
+            profiles = Profiles(test_dir).load()
+
+            Profile().from_dict({'name': 'Updated Test Profile'}).to_yaml(os.path.join(test_dir, 'profile-1.yaml'))
+            os.remove(os.path.join(test_dir, 'profile-2.yaml'))
+
+            names = {'profile-1.yaml', 'profile-2.yaml'}
+            entries = profiles.stat_names(names)
+
+            assert set(entries) == {'profile-1.yaml'}
+
+            for batch in profiles.scan(entries):
+                profiles.merge(batch)
+
+            assert profiles.remove(names - entries.keys()) == ['profile-2.yaml']
+            assert [p.name for p in profiles.profiles] == ['Test Profile 0', 'Updated Test Profile']
+            assert profiles.positions == {'profile-0.yaml': 0, 'profile-1.yaml': 1}
+
+    def test_profiles_uses(self):
+        """
+        Keep track of which profiles load each WAD as profiles are loaded, updated and deleted
+        """
+        with TemporaryDirectory() as test_dir:
+            Profile().from_dict({'wads': ['my-wad-0.wad', 'my-pak-0.pk3']}).to_yaml(
+                os.path.join(test_dir, 'profile-0.yaml'))
+            Profile().from_dict({'wads': ['my-pak-0.pk3']}).to_yaml(os.path.join(test_dir, 'profile-1.yaml'))
+
+            profiles = Profiles(test_dir).load()
+
+            assert profiles.uses('my-pak-0.pk3') == ['profile-0.yaml', 'profile-1.yaml']
+            assert profiles.uses('my-wad-0.wad') == ['profile-0.yaml']
+            assert profiles.uses('my-wad-1.wad') == []
+
+            Profile().from_dict({'wads': ['my-wad-1.wad']}).to_yaml(os.path.join(test_dir, 'profile-0.yaml'))
+            os.utime(os.path.join(test_dir, 'profile-0.yaml'), ns=(1, 1))
+            os.remove(os.path.join(test_dir, 'profile-1.yaml'))
+            profiles.load()
+
+            assert profiles.uses('my-pak-0.pk3') == []
+            assert profiles.uses('my-wad-1.wad') == ['profile-0.yaml']
+            assert profiles.users == {'my-wad-1.wad': {'profile-0.yaml'}}
+
+    def test_profiles_replace_wad(self):
+        """
+        Replace a WAD in every profile that loads it and save the profiles
+        """
+        with TemporaryDirectory() as test_dir:
+            Profile().from_dict({'wads': ['my-wad-0.wad', 'my-pak-0.pk3']}).to_yaml(
+                os.path.join(test_dir, 'profile-0.yaml'))
+            Profile().from_dict({'wads': ['my-pak-1.pk3', 'my-pak-0.pk3']}).to_yaml(
+                os.path.join(test_dir, 'profile-1.yaml'))
+            profiles = Profiles(test_dir).load()
+
+            changed = profiles.replace_wad('my-pak-0.pk3', 'my-pak-1.pk3')
+
+            assert changed == ['profile-0.yaml', 'profile-1.yaml']
+            assert profiles.get('profile-0.yaml').wads == ['my-wad-0.wad', 'my-pak-1.pk3']
+            assert profiles.get('profile-1.yaml').wads == ['my-pak-1.pk3']
+            assert profiles.uses('my-pak-0.pk3') == []
+            assert profiles.uses('my-pak-1.pk3') == ['profile-0.yaml', 'profile-1.yaml']
+            assert Profile().from_yaml(os.path.join(test_dir, 'profile-0.yaml')).wads == ['my-wad-0.wad', 'my-pak-1.pk3']
+            assert profiles.stale(profiles.stat_profiles()) == []
+
+    def test_profiles_replace_wad_without_saving(self):
+        """
+        Replace a WAD in memory only and reload the unchanged file on the next load
+        """
+        with TemporaryDirectory() as test_dir:
+            Profile().from_dict({'wads': ['my-wad-0.wad', 'my-pak-0.pk3']}).to_yaml(
+                os.path.join(test_dir, 'profile-0.yaml'))
+            profiles = Profiles(test_dir).load()
+
+            assert profiles.replace_wad('my-pak-0.pk3', 'my-pak-1.pk3', save=False) == ['profile-0.yaml']
+            assert profiles.get('profile-0.yaml').wads == ['my-wad-0.wad', 'my-pak-1.pk3']
+            assert profiles.stale(profiles.stat_profiles()) == ['profile-0.yaml']
+            assert profiles.cache_dirty
+
+            profiles.load()
+
+            assert profiles.get('profile-0.yaml').wads == ['my-wad-0.wad', 'my-pak-0.pk3']
+            assert profiles.uses('my-pak-1.pk3') == []
+            assert profiles.stale(profiles.stat_profiles()) == []
+
+    def test_profiles_replace_wad_failed_save(self):
+        """
+        Reload a profile whose file could not be written on the next load
+        """
+        with TemporaryDirectory() as test_dir:
+            Profile().from_dict({'wads': ['my-wad-0.wad', 'my-pak-0.pk3']}).to_yaml(
+                os.path.join(test_dir, 'profile-0.yaml'))
+            profiles = Profiles(test_dir).load()
+            profiles.get('profile-0.yaml').filename = os.path.join(test_dir, 'missing-folder', 'profile-0.yaml')
+
+            assert profiles.replace_wad('my-pak-0.pk3', 'my-pak-1.pk3') == ['profile-0.yaml']
+            assert profiles.stale(profiles.stat_profiles()) == ['profile-0.yaml']
+
+            profiles.load()
+
+            assert profiles.get('profile-0.yaml').wads == ['my-wad-0.wad', 'my-pak-0.pk3']
+
+
+class TestProfileStore:
+    """
+    A test profile store class for ProfileStore class tests
+    """
+    def test_store_round_trip(self):
+        """
+        Store profiles in columns and build them back
+        """
+        profiles = [Profile().from_dict({'name': 'Test Profile 0', 'launch_opts': '-skill 4',
+                                         'wads': ['my-wad-0.wad', 'my-pak-0.pk3']}),
+                    Profile().from_dict({'name': 'Test Profile 1', 'wads': ['my-pak-0.pk3']})]
+
+        store = ProfileStore().extend(profiles)
+
+        assert len(store) == 2
+        assert store.wad_names == ['my-wad-0.wad', 'my-pak-0.pk3']
+        assert list(store.wad_refs) == [0, 1, 1]
+        assert store.profile(0).asdict() == profiles[0].asdict()
+        assert store.profile(1).asdict() == profiles[1].asdict()
+
+    def test_store_set_and_compact(self):
+        """
+        Replace a profile and drop its old WAD references
+        """
+        store = ProfileStore().extend([Profile().from_dict({'name': 'Test Profile 0', 'wads': ['my-wad-0.wad']}),
+                                       Profile().from_dict({'name': 'Test Profile 1', 'wads': ['my-wad-1.wad']})])
+
+        store.set(0, Profile().from_dict({'name': 'Updated Test Profile', 'wads': ['my-wad-1.wad', 'my-wad-2.wad']}))
+        store.compact()
+
+        assert store.names == ['Updated Test Profile', 'Test Profile 1']
+        assert store.wads(0) == ['my-wad-1.wad', 'my-wad-2.wad']
+        assert store.wads(1) == ['my-wad-1.wad']
+        assert list(store.wad_refs) == [1, 2, 1]
@@ -0,0 +1,78 @@
+from tempfile import TemporaryDirectory
+import os
+
+from service.models import Profile
+from service.persistence import ProfileWriter, atomic_write
+
+
+class TestAtomicWrite:
+    """
+    A test atomic write class for atomic_write tests
+    """
+    def test_atomic_write(self):
+        """
+        Replace a file and leave no temporary file behind
+        """
+        with TemporaryDirectory() as test_dir:
+            path = os.path.join(test_dir, 'test.yaml')
+            atomic_write(path, 'old')
+            atomic_write(path, b'new')
+
+            with open(path, 'rb') as test_file:
+                assert test_file.read() == b'new'
+            assert os.listdir(test_dir) == ['test.yaml']
+
+    def test_atomic_write_failure(self):
+        """
+        Keep the old contents if the new ones can't be made
+        """
+        with TemporaryDirectory() as test_dir:
+            path = os.path.join(test_dir, 'test.yaml')
+            atomic_write(path, 'old')
+
+            try:
+                atomic_write(path, object())
+            except TypeError:
+                pass
+
+            with open(path, 'r') as test_file:
+                assert test_file.read() == 'old'
+            assert os.listdir(test_dir) == ['test.yaml']
+
+
+class TestProfileWriter:
+    """
+    A test profile writer class for ProfileWriter class tests
+    """
+    def test_writer_coalesces_saves(self):
+        """
+        Write a profile saved many times once, with its last contents
+        """
+        with TemporaryDirectory() as test_dir:
+            path = os.path.join(test_dir, 'test_profile.yaml')
+            writer = ProfileWriter(delay=0.1).start()
+            profile = Profile().from_dict({'name': 'Test Profile', 'wads': []})
+            for i in range(20):
+                profile.wads.append(f'my-wad-{i}.wad')
+                writer.save(profile, path)
+            profile.wads.append('not-saved.wad')
+
+            assert writer.flush(10)
+            writer.stop()
+
+            assert writer.writes == 1
+            assert Profile().from_yaml(path).wads == [f'my-wad-{i}.wad' for i in range(20)]
+
+    def test_writer_stop_flushes(self):
+        """
+        Write everything still queued when the writer stops
+        """
+        with TemporaryDirectory() as test_dir:
+            writer = ProfileWriter(delay=60).start()
+            for i in range(3):
+                writer.save(Profile().from_dict({'name': f'Test Profile {i}'}), os.path.join(test_dir, f'{i}.yaml'))
+
+            writer.stop()
+
+            assert writer.writes == 3
+            assert sorted(os.listdir(test_dir)) == ['0.yaml', '1.yaml', '2.yaml']
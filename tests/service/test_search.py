@@ -0,0 +1,59 @@
+from service.search import NameIndex
+
+
+class TestNameIndex:
+    """
+    A test name index class for NameIndex class tests
+    """
+    def test_search_everything(self):
+        """
+        An empty query returns every position in name order
+        """
+        index = NameIndex(['Sunlust', 'Ancient Aliens', 'eviternity', None])
+
+        assert index.search('') == [3, 1, 2, 0]
+
+    def test_search_prefix(self):
+        """
+        Short queries match name prefixes, ignoring case
+        """
+        index = NameIndex(['Sunlust', 'Ancient Aliens', 'sigil', 'Eviternity'])
+
+        assert index.search('s') == [2, 0]
+        assert index.search('AN') == [1]
+        assert index.search('x') == []
+
+    def test_search_substring(self):
+        """
+        Longer queries match anywhere in the name
+        """
+        index = NameIndex(['Sunlust', 'Ancient Aliens', 'Alien Vendetta', 'Eviternity'])
+
+        assert index.search('lien') == [2, 1]
+        assert index.search('ter') == [3]
+        assert index.search('nlu') == [0]
+        assert index.search('aliens vendetta') == []
+
+    def test_search_trigrams_out_of_order(self):
+        """
+        A name with every trigram of the query but not the query itself does not match
+        """
+        index = NameIndex(['abcxbcd'])
+
+        assert index.search('abcd') == []
+        assert index.search('bcxb') == [0]
+
+    def test_set(self):
+        """
+        Rename and append names without rebuilding the index
+        """
+        index = NameIndex(['Sunlust', 'Ancient Aliens'])
+
+        index.set(0, 'Sigil')
+        index.set(2, 'Alien Vendetta')
+
+        assert len(index) == 3
+        assert index.search('') == [2, 1, 0]
+        assert index.search('sun') == []
+        assert index.search('sig') == [0]
+        assert index.search('lien') == [2, 1]
@@ -0,0 +1,59 @@
+from tempfile import TemporaryDirectory
+import os.path
+
+import yaml
+
+from service.serialization import Dumper, Loader, dump_yaml, load_yaml
+
+
+class TestSerialization:
+    """
+    A test serialization class for YAML serialization tests
+    """
+    def test_loader_and_dumper(self):
+        """
+        Use the C loader and dumper when PyYAML was built with libyaml
+        """
+        if yaml.__with_libyaml__:
+            assert Loader is yaml.CSafeLoader
+            assert Dumper is yaml.CSafeDumper
+        else:
+            assert Loader is yaml.SafeLoader
+            assert Dumper is yaml.SafeDumper
+
+    def test_round_trip(self):
+        """
+        Dump to a YAML file and load it back
+        """
+        with TemporaryDirectory() as test_dir:
+            document = {
+                'name': 'Test Profile',
+                'launch_opts': 'my-opt',
+                'wads': ['my-wad-0.wad', 'my-pak-0.pk3']
+            }
+
+            yaml_path = os.path.join(test_dir, 'test.yaml')
+            with open(yaml_path, 'w') as yaml_file:
+                dump_yaml(document, yaml_file)
+
+            with open(yaml_path, 'r') as yaml_file:
+                assert load_yaml(yaml_file.read()) == document
+
+    def test_dump_to_string(self):
+        """
+        Dump to a string when no stream is given, matching the pure Python dumper
+        """
+        document = {'wads': ['my-wad-0.wad'], 'name': 'Test Profile'}
+
+        assert dump_yaml(document) == yaml.safe_dump(document)
+
+    def test_load_is_safe(self):
+        """
+        Refuse to construct arbitrary python objects
+        """
+        try:
+            load_yaml('!!python/object/apply:os.getcwd []')
+        except yaml.YAMLError:
+            pass
+        else:
+            raise AssertionError('unsafe YAML tag was loaded')
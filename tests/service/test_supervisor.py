@@ -0,0 +1,120 @@
+from tempfile import TemporaryDirectory
+import os.path
+import signal
+import sys
+import threading
+
+from service.supervisor import LaunchRecord, LaunchSupervisor
+
+
+class TestLaunchSupervisor:
+    """
+    A test launch supervisor class for LaunchSupervisor class tests
+    """
+    def test_spawn(self):
+        """
+        Supervise a process that exits cleanly
+        """
+        supervisor = LaunchSupervisor()
+        record = supervisor.spawn([sys.executable, '-c', 'print("hello")'], profile='Test Profile', capture=True)
+
+        assert record.done.wait(10)
+        assert record.profile == 'Test Profile'
+        assert record.pid is not None
+        assert record.returncode == 0
+        assert not record.crashed
+        assert list(record.stdout) == ['hello']
+        assert record.duration() >= 0
+        assert record.time_to_first_output() >= 0
+        assert supervisor.running() == []
+
+    def test_spawn_without_capture(self):
+        """
+        Keep only the error output of a launch nobody waits for and supervise it on daemon threads
+        """
+        supervisor = LaunchSupervisor()
+        record = supervisor.spawn([sys.executable, '-c',
+                                   'import sys, time; print("hello"); time.sleep(0.2); sys.exit("boom")'])
+
+        threads = [thread for thread in threading.enumerate() if thread.name.startswith(f'launch-{record.pid}')]
+        assert sorted(thread.name for thread in threads) == [f'launch-{record.pid}', f'launch-{record.pid}-stderr']
+        assert all(thread.daemon for thread in threads)
+        assert supervisor.wait(10)
+        assert record.crashed
+        assert list(record.stdout) == []
+        assert list(record.stderr) == ['boom']
+        assert record.time_to_first_output() >= 0
+        assert record.summary().endswith(' CRASHED: boom')
+
+    def test_spawn_crashed(self):
+        """
+        Capture the error output of a process that fails
+        """
+        supervisor = LaunchSupervisor()
+        record = supervisor.spawn([sys.executable, '-c', 'import sys; sys.exit("boom")'], capture=True)
+
+        assert record.done.wait(10)
+        assert record.returncode == 1
+        assert record.crashed
+        assert list(record.stderr) == ['boom']
+
+    def test_history(self):
+        """
+        Append finished records to the history file and read them back
+        """
+        with TemporaryDirectory() as test_dir:
+            history_file = os.path.join(test_dir, 'launches.jsonl')
+            supervisor = LaunchSupervisor(history_file)
+            written = threading.Semaphore(0)
+            supervisor.listeners.append(lambda record: written.release())
+
+            for i in range(3):
+                supervisor.spawn([sys.executable, '-c', f'print({i})'], profile=f'Test Profile {i}', capture=True)
+                assert written.acquire(timeout=10)
+
+            history = supervisor.history(2)
+
+            assert [record.profile for record in history] == ['Test Profile 1', 'Test Profile 2']
+            assert list(history[1].stdout) == ['2']
+            assert history[1].returncode == 0
+            assert history[1].done.is_set()
+
+    def test_recent(self):
+        """
+        List the finished launches from the history file followed by the running ones
+        """
+        with TemporaryDirectory() as test_dir:
+            supervisor = LaunchSupervisor(os.path.join(test_dir, 'launches.jsonl'))
+            finished = supervisor.spawn([sys.executable, '-c', 'pass'], profile='Test Profile 0')
+            assert supervisor.wait(10)
+            running = supervisor.spawn([sys.executable, '-c', 'import time; time.sleep(10)'], profile='Test Profile 1')
+
+            try:
+                recent = supervisor.recent()
+
+                assert [record.profile for record in recent] == ['Test Profile 0', 'Test Profile 1']
+                assert recent[0].pid == finished.pid and recent[1] is running
+                assert recent[1].summary() == f'Test Profile 1: pid {running.pid} running'
+                assert [record.profile for record in supervisor.recent(1)] == ['Test Profile 1']
+                assert not supervisor.wait(0.1)
+            finally:
+                os.kill(running.pid, signal.SIGTERM)
+            assert supervisor.wait(10)
+
+    def test_record_round_trip(self):
+        """
+        Rebuild a launch record from its dictionary
+        """
+        record = LaunchRecord('Test Profile', ['gzdoom', '-file', 'my-wad-0.wad'])
+        record.pid = 123
+        record.started = 10.0
+        record.first_output = 10.5
+        record.stopped = 12.0
+        record.returncode = 0
+        record.stdout.append('hello')
+
+        rebuilt = LaunchRecord().from_dict(record.asdict())
+
+        assert rebuilt.asdict() == record.asdict()
+        assert rebuilt.duration() == 2.0
+        assert rebuilt.time_to_first_output() == 0.5
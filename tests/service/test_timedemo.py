@@ -0,0 +1,75 @@
+from service.timedemo import TimedemoHistory, is_timedemo, launch_options, parse_timedemo
+
+
+class TestTimedemo:
+    """
+    A test timedemo class for timedemo parsing and history tests
+    """
+    def test_parse_gzdoom(self):
+        """
+        Parse a GZDoom style timedemo result
+        """
+        result = parse_timedemo(['Execution could not continue.', 'timed 3155 gametics in 1143 realtics (96.5 fps)'])
+
+        assert result['gametics'] == 3155
+        assert result['realtics'] == 1143
+        assert result['fps'] == 96.5
+        assert round(result['frame_ms'], 3) == round(1000 / 96.5, 3)
+
+    def test_parse_prboom(self):
+        """
+        Parse a PrBoom+ style timedemo result
+        """
+        result = parse_timedemo(['Timed 3155 gametics in 1143 realtics = 96.5 frames per second'])
+
+        assert result['fps'] == 96.5
+
+    def test_parse_without_fps(self):
+        """
+        Work out the FPS from the tics when the source port does not print it
+        """
+        result = parse_timedemo(['3500 gametics in 700 realtics'])
+
+        assert result['fps'] == 175.0
+
+    def test_parse_no_result(self):
+        """
+        Return nothing when there is no timedemo result
+        """
+        assert parse_timedemo(['GZDoom g4.11.3', 'W_Init: Init WADfiles.']) is None
+
+    def test_launch_options(self):
+        """
+        Drop the binary, -file list and response file from a command line
+        """
+        argv = ['gzdoom', '-file', 'my-wad-0.wad', 'my-pak-0.pk3', '-skill', '4', '-timedemo', 'demo1']
+
+        assert is_timedemo(argv)
+        assert not is_timedemo(['gzdoom', '-skill', '4'])
+        assert launch_options(argv) == '-skill 4 -timedemo demo1'
+        assert launch_options(['gzdoom', '@/tmp/wads.rsp', '-skill', '4']) == '-skill 4'
+
+    def test_history(self):
+        """
+        Store runs and summarize them per source port
+        """
+        history = TimedemoHistory()
+        for fps in [90.0, 100.0, 95.0]:
+            history.add('Test Profile', 'test_profile.yaml', 'gzdoom', '-timedemo demo1',
+                        {'gametics': 3500, 'realtics': 1000, 'fps': fps, 'frame_ms': 1000 / fps})
+        history.add('Test Profile', 'test_profile.yaml', 'dsda-doom', '-timedemo demo1',
+                    {'gametics': 3500, 'realtics': 500, 'fps': 245.0, 'frame_ms': 1000 / 245.0})
+        history.add('Other Profile', 'other_profile.yaml', 'gzdoom', '-timedemo demo1',
+                    {'gametics': 3500, 'realtics': 500, 'fps': 60.0, 'frame_ms': 1000 / 60.0})
+
+        summary = history.summary('test_profile.yaml')
+
+        assert len(history.runs()) == 5
+        assert len(history.runs('test_profile.yaml', limit=2)) == 2
+        assert summary['gzdoom']['runs'] == 3
+        assert summary['gzdoom']['last_fps'] == 95.0
+        assert summary['gzdoom']['best_fps'] == 100.0
+        assert summary['gzdoom']['mean_fps'] == 95.0
+        assert summary['dsda-doom']['runs'] == 1
+        assert history.summary('missing.yaml') is None
+        history.close()
@@ -0,0 +1,79 @@
+from tempfile import TemporaryDirectory
+import json
+import os.path
+
+from service.tracing import NULL_SPAN, Tracer, traced, tracer
+
+
+class TestTracer:
+    """
+    A test tracer class for Tracer class tests
+    """
+    def test_disabled(self):
+        """
+        Record nothing while tracing is off
+        """
+        test_tracer = Tracer()
+
+        with test_tracer.span('test') as span:
+            pass
+
+        assert span is NULL_SPAN
+        assert test_tracer.summary() == []
+
+    def test_span(self):
+        """
+        Count and time spans by name
+        """
+        test_tracer = Tracer()
+        test_tracer.enable()
+
+        for _ in range(3):
+            with test_tracer.span('test'):
+                pass
+        test_tracer.record('other', 0, 5000000)
+
+        summary = test_tracer.summary()
+        assert [row['name'] for row in summary] == ['other', 'test']
+        assert summary[0] == {'name': 'other', 'count': 1, 'total_ms': 5.0, 'mean_ms': 5.0, 'min_ms': 5.0,
+                              'max_ms': 5.0}
+        assert summary[1]['count'] == 3
+        assert 'other' in test_tracer.format_summary()
+
+    def test_chrome_trace(self):
+        """
+        Write recorded spans as Chrome trace events
+        """
+        with TemporaryDirectory() as test_dir:
+            test_tracer = Tracer()
+            test_tracer.enable()
+            with test_tracer.span('test'):
+                pass
+
+            trace_file = os.path.join(test_dir, 'trace.json')
+            test_tracer.write_chrome_trace(trace_file)
+
+            with open(trace_file, 'r') as trace:
+                events = json.load(trace)['traceEvents']
+            assert len(events) == 1
+            assert events[0]['name'] == 'test'
+            assert events[0]['ph'] == 'X'
+
+    def test_traced(self):
+        """
+        Time calls of a decorated function only while the shared tracer is on
+        """
+        @traced('test.function')
+        def function(value):
+            return value * 2
+
+        assert function(1) == 2
+        assert all(row['name'] != 'test.function' for row in tracer.summary())
+
+        tracer.enable()
+        try:
+            assert function(2) == 4
+        finally:
+            tracer.disable()
+
+        assert [row['count'] for row in tracer.summary() if row['name'] == 'test.function'] == [1]
@@ -0,0 +1,96 @@
+from tempfile import TemporaryDirectory
+import os
+import os.path
+
+from service.validation import WadValidator
+
+
+def write_file(path: str, data: bytes) -> None:
+    """
+    Write a small file
+    """
+    with open(path, 'wb') as test_file:
+        test_file.write(data)
+
+
+class TestWadValidator:
+    """
+    A test WAD validator class for WadValidator class tests
+    """
+    def test_validate_missing(self):
+        """
+        Report WADs that are not in the WADs folder
+        """
+        with TemporaryDirectory() as test_dir:
+            write_file(os.path.join(test_dir, 'my-wad-0.wad'), b'wad')
+
+            result = WadValidator(test_dir).validate(['my-wad-0.wad', 'my-pak-0.pk3'])
+
+            assert not result.ok
+            assert result.missing == ['my-pak-0.pk3']
+            assert result.changed == []
+
+    def test_validate_sub_folder(self):
+        """
+        Find WADs in sub folders of the WADs folder
+        """
+        with TemporaryDirectory() as test_dir:
+            os.mkdir(os.path.join(test_dir, 'mods'))
+            write_file(os.path.join(test_dir, 'mods', 'my-pak-0.pk3'), b'pk3')
+
+            result = WadValidator(test_dir).validate([os.path.join('mods', 'my-pak-0.pk3')])
+
+            assert result.ok
+
+    def test_validate_changed(self):
+        """
+        Report WADs that changed since the last validation
+        """
+        with TemporaryDirectory() as test_dir:
+            wad_path = os.path.join(test_dir, 'my-wad-0.wad')
+            write_file(wad_path, b'wad')
+            validator = WadValidator(test_dir)
+
+            assert validator.validate(['my-wad-0.wad']).changed == []
+            assert validator.validate(['my-wad-0.wad']).changed == []
+
+            write_file(wad_path, b'changed wad')
+
+            assert validator.validate(['my-wad-0.wad']).changed == ['my-wad-0.wad']
+            assert validator.validate(['my-wad-0.wad']).changed == []
+
+    def test_validate_hashes(self):
+        """
+        Only report touched WADs as changed if their contents changed when hashing
+        """
+        with TemporaryDirectory() as test_dir:
+            wad_path = os.path.join(test_dir, 'my-wad-0.wad')
+            write_file(wad_path, b'wad')
+            validator = WadValidator(test_dir, hash_files=True)
+            validator.validate(['my-wad-0.wad'])
+
+            stat = os.stat(wad_path)
+            os.utime(wad_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+            assert validator.validate(['my-wad-0.wad']).changed == []
+
+            write_file(wad_path, b'waz')
+
+            assert validator.validate(['my-wad-0.wad']).changed == ['my-wad-0.wad']
+
+    def test_validate_memoized(self, monkeypatch):
+        """
+        Do not list the WADs folder again if it has not changed
+        """
+        with TemporaryDirectory() as test_dir:
+            write_file(os.path.join(test_dir, 'my-wad-0.wad'), b'wad')
+            validator = WadValidator(test_dir)
+            validator.validate(['my-wad-0.wad'])
+
+            def scandir(*args, **kwargs):
+                raise AssertionError('WADs folder should not be listed again')
+
+            with monkeypatch.context() as patch:
+                patch.setattr(os, 'scandir', scandir)
+
+                assert validator.validate(['my-wad-0.wad']).ok
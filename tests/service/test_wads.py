@@ -0,0 +1,187 @@
+from tempfile import TemporaryDirectory
+import os.path
+import struct
+import zipfile
+
+import pytest
+
+from service.wads import WadFile, WadFormatError, WadIndex, WadInfo, stat_wads
+
+
+def make_wad(path: str, lumps: list, identification: bytes = b'PWAD') -> None:
+    """
+    Write a WAD with the given (name, data) lumps
+    """
+    data = b''.join(lump for _, lump in lumps)
+    directory = b''
+    offset = 12
+    for name, lump in lumps:
+        directory += struct.pack('<ii8s', offset, len(lump), name.encode('ascii'))
+        offset += len(lump)
+    with open(path, 'wb') as wad_file:
+        wad_file.write(struct.pack('<4sii', identification, len(lumps), 12 + len(data)) + data + directory)
+
+
+def make_pk3(path: str, names: list) -> None:
+    """
+    Write a PK3 containing the given file names
+    """
+    with zipfile.ZipFile(path, 'w') as pk3_file:
+        for name in names:
+            pk3_file.writestr(name, b'data')
+
+
+class TestWadFile:
+    """
+    A test WAD file class for WadFile class tests
+    """
+    def test_wad_file_lumps(self):
+        """
+        Read lumps by name and position without copying them
+        """
+        with TemporaryDirectory() as test_dir:
+            wad_path = os.path.join(test_dir, 'test.wad')
+            make_wad(wad_path, [('MAP01', b''), ('THINGS', b'1234'), ('TITLEPIC', b'5678'), ('things', b'abcd')])
+
+            with WadFile(wad_path) as wad_file:
+                titlepic = wad_file['titlepic']
+
+                assert isinstance(titlepic, memoryview)
+                assert titlepic.tobytes() == b'5678'
+                assert wad_file.kind == 'PWAD'
+                assert len(wad_file) == 4
+                assert wad_file.names() == ['MAP01', 'THINGS', 'TITLEPIC', 'THINGS']
+                assert wad_file['THINGS'].tobytes() == b'abcd'  # the last lump with a name wins
+                assert wad_file.lump_at(1).tobytes() == b'1234'
+                assert 'MAPINFO' not in wad_file
+                assert wad_file.get('MAPINFO') is None
+
+                titlepic.release()
+
+            assert wad_file.mmap is None
+
+    def test_wad_file_not_a_wad(self):
+        """
+        Refuse to open a file that is not a WAD
+        """
+        with TemporaryDirectory() as test_dir:
+            wad_path = os.path.join(test_dir, 'test.wad')
+            with open(wad_path, 'wb') as wad_file:
+                wad_file.write(b'PK\x03\x04 not a WAD at all')
+
+            try:
+                WadFile(wad_path)
+            except WadFormatError:
+                pass
+            else:
+                raise AssertionError('WadFormatError not raised')
+
+
+class TestWadInfo:
+    """
+    A test WAD info class for WadInfo class tests
+    """
+    def test_wad_info_from_wad(self):
+        """
+        Index a PWAD's lump directory
+        """
+        with TemporaryDirectory() as test_dir:
+            wad_path = os.path.join(test_dir, 'test.wad')
+            make_wad(wad_path, [('MAP01', b''), ('THINGS', b'1234'), ('E1M1', b''), ('TITLEPIC', b'5678')])
+
+            info = WadInfo().from_file(wad_path)
+
+            assert info.path == wad_path
+            assert info.kind == 'PWAD'
+            assert info.size == os.path.getsize(wad_path)
+            assert info.lump_count == 4
+            assert info.maps == ['MAP01', 'E1M1']
+            assert info.error == ''
+
+    def test_wad_info_from_pk3(self):
+        """
+        Index a PK3's central directory
+        """
+        with TemporaryDirectory() as test_dir:
+            pk3_path = os.path.join(test_dir, 'test.pk3')
+            make_pk3(pk3_path, ['maps/map01.wad', 'maps/E2M3.wad', 'maps/readme.txt', 'sprites/a.png'])
+
+            info = WadInfo().from_file(pk3_path)
+
+            assert info.kind == 'PK3'
+            assert info.lump_count == 4
+            assert info.maps == ['MAP01', 'E2M3']
+
+    def test_wad_info_truncated(self):
+        """
+        Record an error for a WAD with a truncated directory
+        """
+        with TemporaryDirectory() as test_dir:
+            wad_path = os.path.join(test_dir, 'broken.wad')
+            with open(wad_path, 'wb') as wad_file:
+                wad_file.write(struct.pack('<4sii', b'PWAD', 100, 12))
+
+            info = WadInfo().from_file(wad_path)
+
+            assert info.lump_count == 0
+            assert info.error != ''
+
+
+class TestWadIndex:
+    """
+    A test WAD index class for WadIndex class tests
+    """
+    def test_wad_index_load(self):
+        """
+        Index every WAD and PK3 in a WADs folder, including sub folders
+        """
+        with TemporaryDirectory() as test_dir:
+            os.mkdir(os.path.join(test_dir, 'mods'))
+            make_wad(os.path.join(test_dir, 'test.wad'), [('MAP01', b'')])
+            make_pk3(os.path.join(test_dir, 'mods', 'test.pk3'), ['maps/map02.wad'])
+            with open(os.path.join(test_dir, 'readme.txt'), 'w') as readme:
+                readme.write('not a WAD')
+
+            index = WadIndex(test_dir).load()
+
+            assert set(index.wads) == {'test.wad', os.path.join('mods', 'test.pk3')}
+            assert index.get('test.wad').maps == ['MAP01']
+            assert index.get('mods/test.pk3').maps == ['MAP02']
+            assert index.total_size() == (os.path.getsize(os.path.join(test_dir, 'test.wad')) +
+                                          os.path.getsize(os.path.join(test_dir, 'mods', 'test.pk3')))
+
+    def test_stat_wads_broken_link(self):
+        """
+        Leave out a WAD that can't be read instead of giving up on the whole folder
+        """
+        with TemporaryDirectory() as test_dir:
+            make_wad(os.path.join(test_dir, 'test.wad'), [('MAP01', b'')])
+            try:
+                os.symlink(os.path.join(test_dir, 'deleted.wad'), os.path.join(test_dir, 'broken.wad'))
+            except OSError:
+                pytest.skip('symbolic links are not allowed here')
+
+            assert list(stat_wads(test_dir)) == ['test.wad']
+
+    def test_wad_index_incremental(self):
+        """
+        Only re-index changed WADs and drop deleted ones, restoring the rest from the cache
+        """
+        with TemporaryDirectory() as test_dir, TemporaryDirectory() as cache_dir:
+            cache_file = os.path.join(cache_dir, 'wads.cache')
+            make_wad(os.path.join(test_dir, 'a.wad'), [('MAP01', b'')])
+            make_wad(os.path.join(test_dir, 'b.wad'), [('MAP01', b'')])
+            make_wad(os.path.join(test_dir, 'c.wad'), [('MAP01', b'')])
+            WadIndex(test_dir, cache_file=cache_file).load()
+
+            make_wad(os.path.join(test_dir, 'b.wad'), [('MAP01', b''), ('MAP02', b'')])
+            os.remove(os.path.join(test_dir, 'c.wad'))
+
+            index = WadIndex(test_dir, cache_file=cache_file)
+            index.load_cache()
+            cached_a = index.get('a.wad')
+            index.load()
+
+            assert set(index.wads) == {'a.wad', 'b.wad'}
+            assert index.get('a.wad') is cached_a
+            assert index.get('b.wad').maps == ['MAP01', 'MAP02']
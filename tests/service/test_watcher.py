@@ -0,0 +1,80 @@
+from tempfile import TemporaryDirectory
+import os.path
+import threading
+
+import pytest
+
+from service.watcher import DirectoryWatcher, load_inotify
+
+
+def write_file(path: str, text: str) -> None:
+    """
+    Write a small file
+    """
+    with open(path, 'w') as test_file:
+        test_file.write(text)
+
+
+class TestDirectoryWatcher:
+    """
+    A test directory watcher class for DirectoryWatcher class tests
+    """
+    def watch_changes(self, test_dir: str, use_inotify: bool) -> list:
+        """
+        Make a burst of changes in a watched directory and collect what gets reported
+        """
+        reported = []
+        done = threading.Event()
+
+        def callback(names):
+            reported.append(names)
+            done.set()
+
+        write_file(os.path.join(test_dir, 'deleted.yaml'), 'name: deleted')
+        watcher = DirectoryWatcher(test_dir, callback, debounce=0.2, poll_interval=0.05, use_inotify=use_inotify)
+        watcher.start()
+        try:
+            for i in range(20):
+                write_file(os.path.join(test_dir, f'profile-{i}.yaml'), f'name: profile {i}')
+            write_file(os.path.join(test_dir, 'ignored.txt'), 'not a profile')
+            os.remove(os.path.join(test_dir, 'deleted.yaml'))
+
+            assert done.wait(5)
+        finally:
+            watcher.stop()
+        return reported
+
+    def test_polling_watcher(self):
+        """
+        Report a burst of changes from the polling backend
+        """
+        with TemporaryDirectory() as test_dir:
+            reported = self.watch_changes(test_dir, use_inotify=False)
+
+            changed = set().union(*reported)
+            assert changed == {f'profile-{i}.yaml' for i in range(20)} | {'deleted.yaml'}
+
+    def test_inotify_watcher(self):
+        """
+        Report a burst of changes from the inotify backend in a single debounced callback
+        """
+        if load_inotify() is None:
+            pytest.skip('inotify is not available')
+
+        with TemporaryDirectory() as test_dir:
+            reported = self.watch_changes(test_dir, use_inotify=True)
+
+            assert len(reported) == 1
+            assert reported[0] == {f'profile-{i}.yaml' for i in range(20)} | {'deleted.yaml'}
+
+    def test_stop_without_changes(self):
+        """
+        Stop a watcher that never saw a change
+        """
+        with TemporaryDirectory() as test_dir:
+            watcher = DirectoryWatcher(test_dir, lambda names: None, poll_interval=0.05)
+            watcher.start()
+            watcher.stop()
+
+            assert watcher.thread is None
+            assert watcher.inotify_fd == -1
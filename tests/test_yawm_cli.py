@@ -0,0 +1,76 @@
+from tempfile import TemporaryDirectory
+import os
+import os.path
+import subprocess
+import sys
+
+import yaml
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAUNCH_SCRIPT = """
+import sys
+import time
+import logbook, yaml
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import yawm_cli
+import service.launcher
+print(time.perf_counter() - start)
+status = yawm_cli.main(['-p', 'test_profile.yaml', '--cli_opts=-c pass', '--wait'])
+print(status, sorted(module for module in sys.modules if module.split('.')[0] in ('wx', 'gui')))
+"""
+
+
+def import_times(stderr: str) -> dict:
+    """
+    Cumulative import times of the top level imports in python -X importtime output
+
+    :param stderr: the output
+    :return: dict of module name -> microseconds
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.startswith(' ') and not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestYawmCli:
+    """
+    A test CLI class for yawm_cli tests
+    """
+    def test_launch_does_not_import_wx(self):
+        """
+        Launch a profile through the CLI without loading wx or the GUI, importing the launch path within 100 ms
+        Logbook and PyYAML are imported before the clock starts, their import time is outside the CLI's control
+        """
+        with TemporaryDirectory() as test_dir:
+            os.mkdir(os.path.join(test_dir, 'profiles'))
+            with open(os.path.join(test_dir, 'profiles', 'test_profile.yaml'), 'w') as profile_yaml:
+                yaml.safe_dump({'name': 'Test Profile', 'wads': []}, profile_yaml)
+            with open(os.path.join(test_dir, 'config.yaml'), 'w') as config_yaml:
+                yaml.safe_dump({'service': {'profiles_folder': 'profiles', 'auto_close_on_launch': True},
+                                'source_port': {'binary': sys.executable, 'wads_folder': 'wads'}}, config_yaml)
+
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', LAUNCH_SCRIPT.format(root=ROOT)],
+                                    cwd=test_dir, capture_output=True, text=True)
+
+            assert result.returncode == 0, result.stderr
+            assert result.stdout.splitlines()[-1] == '0 []'
+            imported = import_times(result.stderr)
+            assert 'service.launcher' in imported
+            assert not {name for name in imported if name.split('.')[0] in ('wx', 'gui')}
+
+            # time the imports without -X importtime, the best of a few runs so a busy machine doesn't fail the check
+            import_seconds = []
+            for _ in range(3):
+                result = subprocess.run([sys.executable, '-c', LAUNCH_SCRIPT.format(root=ROOT)], cwd=test_dir,
+                                        capture_output=True, text=True)
+                import_seconds.append(float(result.stdout.splitlines()[0]))
+
+        assert min(import_seconds) < 0.1
@@ -1,11 +1,14 @@
+import argparse
 import os.path
 import sys
 
-import yaml
 from logbook import Logger, NestedSetup, StreamHandler, TimedRotatingFileHandler
 
 from gui.app import WADManagerApp
 from gui.main_frame import MainFrame
+from service.logsink import sink_handlers
+from service.serialization import load_yaml
+from service.tracing import report, tracer
 
 
 mylog = Logger(__name__)
@@ -13,10 +16,18 @@ mylog = Logger(__name__)
 
 # ready for launch
 if __name__ == "__main__":
+    argp = argparse.ArgumentParser()
+    argp.add_argument('--profile-startup', type=str, nargs='?', const='', metavar='TRACE_FILE',
+                      help='time loading, refreshing, saving and launching and print a report on exit, optionally '
+                           'also write a Chrome trace')
+    args = argp.parse_args()
+    if args.profile_startup is not None:
+        tracer.enable()
+
     with open('config.yaml', 'rt') as config_yaml:
-        config = yaml.safe_load(config_yaml.read())
+        config = load_yaml(config_yaml.read())
 
-    log_setup = NestedSetup([
+    log_handlers = sink_handlers([
             StreamHandler(sys.stdout, level=config['logger']['level'], bubble=False),
             TimedRotatingFileHandler(
                     os.path.abspath('yawm-log'),
@@ -24,13 +35,29 @@ if __name__ == "__main__":
                     backup_count=3,
                     bubble=True,
                     date_format='%Y-%m-%d')
-        ]
+        ],
+        config['logger']
     )
+    log_setup = NestedSetup(log_handlers)
 
     # bind the logs to the thread
     with log_setup:
         mylog.info("Starting YAWM application")
         app = WADManagerApp()
 
-        main_frame = MainFrame(None, title=app.appName, config=config)
+        with tracer.span('gui.main_frame'):
+            main_frame = MainFrame(None, title=app.appName, config=config)
+        supervisor = main_frame.controls_panel.launcher.supervisor
         app.MainLoop()
+
+        # the window closes on launch, finish recording the launches that are still running before exiting
+        if supervisor.history_file and supervisor.running():
+            mylog.info("Waiting for the running launches to exit to record them")
+            supervisor.wait()
+
+        if args.profile_startup is not None:
+            report(args.profile_startup or None, sys.stderr)
+
+    # write out anything still queued
+    for handler in log_handlers:
+        handler.close()
@@ -1,33 +1,246 @@
 import argparse
 import os.path
-
-import yaml
-
-from service.launcher import Launcher
-from service.models import Profile
+import sys
 
 """
 CLI inteface, for real DOOMers
+
+Only argparse is imported up front, everything else is imported when the chosen action needs it, so the CLI starts
+quickly and never loads wx
 """
 
-argp = argparse.ArgumentParser()
-argp.add_argument('-p', '--profile', type=str, required=True)
-argp.add_argument('-c', '--cli_opts', type=str, nargs='?')
-args = argp.parse_args()
 
-with open('config.yaml', 'r') as config_yaml:
-    config = yaml.safe_load(config_yaml.read())
+def parse_args(argv: list | None = None) -> argparse.Namespace:
+    """
+    Parse the command line
+
+    :param argv: arguments, defaults to sys.argv
+    :return: argparse.Namespace
+    """
+    argp = argparse.ArgumentParser()
+    action = argp.add_mutually_exclusive_group(required=True)
+    action.add_argument('-p', '--profile', type=str)
+    action.add_argument('--hash-wads', action='store_true', help='hash the WADs folder and report duplicate WADs')
+    action.add_argument('--launches', type=int, metavar='N', help='show the last N supervised launches')
+    action.add_argument('-b', '--batch', type=str, nargs='+', metavar='PROFILE', help='run profiles or globs in turn')
+    action.add_argument('-m', '--manifest', type=str, help='run the profiles and options listed in a manifest')
+    action.add_argument('-t', '--timedemos', type=str, nargs='?', const='', metavar='PROFILE',
+                        help='show the timedemo history, optionally of one profile')
+    action.add_argument('-u', '--uses', type=str, metavar='WAD', help='list the profiles that load a WAD')
+    action.add_argument('--replace-wad', type=str, nargs=2, metavar=('OLD', 'NEW'),
+                        help='replace a WAD with another in every profile that loads it')
+    argp.add_argument('-c', '--cli_opts', type=str, nargs='?')
+    argp.add_argument('-f', '--force', action='store_true', help='launch even if WADs are missing')
+    argp.add_argument('-w', '--wait', action='store_true', help='wait for the source port to exit and report on it')
+    argp.add_argument('-j', '--jobs', type=int, default=1, help='batch runs to have running at once')
+    argp.add_argument('-r', '--report', type=str, default='-', help='batch report file, .json or .csv (default stdout)')
+    argp.add_argument('--profile-startup', type=str, nargs='?', const='', metavar='TRACE_FILE',
+                      help='time loading, saving and launching and print a report on exit, optionally also write a '
+                           'Chrome trace')
+    return argp.parse_args(argv)
+
+
+def hash_wads(config: dict) -> int:
+    """
+    Hash the WADs folder and report duplicate WADs
+
+    :param config: YAWM config
+    :return: exit status
+    """
+    from service.hashes import WadHashes
+
+    wad_hashes = WadHashes(config['source_port']['wads_folder'], config['service'].get('wad_hashes', 'wads.db'))
+    counts = wad_hashes.update()
+    print(f"Hashed: {counts['hashed']} Unchanged: {counts['unchanged']} Removed: {counts['removed']}")
+    for sha1, paths in wad_hashes.duplicates().items():
+        print(f"Duplicate WADs ({sha1}): {', '.join(paths)}")
+    wad_hashes.close()
+    return 0
+
+
+def load_profiles(config: dict):
+    """
+    Load every profile, through the profiles cache if there is one
+
+    :param config: YAWM config
+    :return: Profiles
+    """
+    from service.models import Profiles
+
+    return Profiles(config['service']['profiles_folder'],
+                    cache_file=config['service'].get('profiles_cache'),
+                    workers=config['service'].get('load_workers', 0)).load()
+
+
+def show_uses(config: dict, wad: str) -> int:
+    """
+    Show the profiles that load a WAD
+
+    :param config: YAWM config
+    :param wad: WAD name
+    :return: exit status, 1 if no profile loads it
+    """
+    profiles = load_profiles(config)
+    names = profiles.uses(wad)
+    for name in names:
+        print(f"{profiles.get(name).name} ({name})")
+    return 0 if names else 1
+
+
+def replace_wad(config: dict, old_wad: str, new_wad: str) -> int:
+    """
+    Replace a WAD with another in every profile that loads it
+
+    :param config: YAWM config
+    :param old_wad: WAD name to replace
+    :param new_wad: WAD name to replace it with
+    :return: exit status
+    """
+    profiles = load_profiles(config)
+    changed = profiles.replace_wad(old_wad, new_wad)
+    if profiles.cache_dirty:
+        profiles.save_cache()
+    for name in changed:
+        print(f"Updated {profiles.get(name).name} ({name})")
+    return 0
+
+
+def show_launches(launcher, count: int) -> int:
+    """
+    Show the most recent supervised launches
+
+    :param launcher: Launcher
+    :param count: number of launches to show
+    :return: exit status
+    """
+    for record in launcher.supervisor.history(count):
+        print(record.summary())
+    return 0
+
+
+def show_timedemos(launcher, filename: str) -> int:
+    """
+    Show the timedemo history
+
+    :param launcher: Launcher
+    :param filename: only show the runs of this profile file, empty for every profile
+    :return: exit status
+    """
+    if launcher.timedemos is None:
+        print('Set service.timedemo_history in config.yaml to record timedemos', file=sys.stderr)
+        return 1
+    for run in launcher.timedemos.runs(filename or None):
+        print(f"{run['profile']} ({run['filename']}): {run['fps']:.1f} fps "
+              f"{run['gametics']} gametics in {run['realtics']} realtics [{run['binary']} {run['options']}]")
+    return 0
+
+
+def run_batch(launcher, config: dict, args: argparse.Namespace) -> int:
+    """
+    Run a batch of profiles and write a report
+
+    :param launcher: Launcher
+    :param config: YAWM config
+    :param args: parsed command line
+    :return: exit status
+    """
+    from service.batch import BatchJob, BatchRunner, expand_profiles, read_manifest, write_report
+
+    if args.manifest:
+        jobs = read_manifest(args.manifest, config['service']['profiles_folder'])
+    else:
+        jobs = [BatchJob(filename) for filename in expand_profiles(args.batch, config['service']['profiles_folder'])]
+    runner = BatchRunner(launcher, config['source_port']['binary'], concurrency=args.jobs, force=args.force)
+    results = runner.run(jobs, params=args.cli_opts or '')
+    write_report(results, args.report)
+    return 0 if all(result['returncode'] == 0 for result in results) else 1
+
+
+def launch_profile(launcher, config: dict, args: argparse.Namespace) -> int:
+    """
+    Validate and launch a single profile
+
+    :param launcher: Launcher
+    :param config: YAWM config
+    :param args: parsed command line
+    :return: exit status
+    """
+    from service.models import Profile
+
+    profile = Profile().from_yaml(os.path.join(config['service']['profiles_folder'], args.profile))
+
+    if args.cli_opts is None:
+        args.cli_opts = ''
+
+    validation = launcher.validate(profile)
+    if validation.summary():
+        print(validation.summary(), file=sys.stderr)
+    if not validation.ok and not args.force:
+        return 1
+
+    record = launcher.launch(profile, config['source_port']['binary'], params=args.cli_opts, capture=args.wait)
+
+    if args.wait:
+        record.done.wait()
+        print(f"{record.profile}: pid {record.pid} exit {record.returncode} ran {record.duration():.1f}s")
+        if record.crashed:
+            print('\n'.join(record.stderr), file=sys.stderr)
+        return record.returncode
+    return 0
+
+
+def main(argv: list | None = None) -> int:
+    """
+    Run the CLI
+
+    :param argv: arguments, defaults to sys.argv
+    :return: exit status
+    """
+    args = parse_args(argv)
+    if args.profile_startup is None:
+        return run(args)
+
+    from service.tracing import report, tracer
+
+    tracer.enable()
+    try:
+        with tracer.span('cli.run'):
+            return run(args)
+    finally:
+        report(args.profile_startup or None, sys.stderr)
+
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Run the chosen action
+
+    :param args: parsed command line
+    :return: exit status
+    """
+    from service.serialization import load_yaml
+
+    with open('config.yaml', 'r') as config_yaml:
+        config = load_yaml(config_yaml.read())
+
+    if args.hash_wads:
+        return hash_wads(config)
+    if args.uses is not None:
+        return show_uses(config, args.uses)
+    if args.replace_wad:
+        return replace_wad(config, *args.replace_wad)
+
+    from service.launcher import Launcher
 
-launcher = Launcher(config=config, main_frame=False)
-profile = Profile().from_yaml(os.path.join(config['service']['profiles_folder'], args.profile))
+    launcher = Launcher(config=config, main_frame=False)
 
-if args.cli_opts is None:
-    args.cli_opts = ''
+    if args.launches is not None:
+        return show_launches(launcher, args.launches)
+    if args.timedemos is not None:
+        return show_timedemos(launcher, args.timedemos)
+    if args.batch or args.manifest:
+        return run_batch(launcher, config, args)
+    return launch_profile(launcher, config, args)
 
-launch_options = {
-    'binary': config['source_port']['binary'],
-    'params': args.cli_opts,
-    'profile': profile
-}
 
-launcher.launch(profile, config['source_port']['binary'], params=args.cli_opts)
+if __name__ == "__main__":
+    sys.exit(main())